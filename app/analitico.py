@@ -0,0 +1,294 @@
+"""
+Agregações do dashboard em DuckDB (opcional) ou pandas.
+
+As funções recebem DataFrames (o snapshot de stg_transacoes/fact_salario em
+cache, ou Parquet local) e devolvem exatamente o mesmo resultado nos dois
+motores: mesmas colunas, tipos e ordem. Valores monetários são somados em
+centavos inteiros, então a soma não depende da ordem das linhas e coincide
+com o SUM(numeric) do Postgres.
+
+O DuckDB é o extra "analitico" (`uv sync --extra analitico`); sem ele, ou se
+uma consulta falhar, o cálculo cai para o pandas. Para comparar os motores
+offline, sobre os Parquet do cache em disco:
+
+    uv run python app/analitico.py .cache/snapshots --repeticoes 5
+"""
+import argparse
+import importlib.util
+import threading
+import time
+import pandas as pd
+from helpers import logger
+
+# Extra opcional "analitico". O import em si fica para a primeira consulta:
+# custa ~80 ms e a maioria das execuções (login, formulários) não agrega nada.
+_DUCKDB_INSTALADO = importlib.util.find_spec("duckdb") is not None
+
+BACKENDS_ANALITICOS = ("postgres", "duckdb", "pandas")
+_DIMENSOES = ("dsc_tipotransacao", "dsc_categoriatransacao", "dsc_subcategoriatransacao")
+
+# Banco DuckDB em memória do processo; cada consulta abre um cursor próprio (abrir
+# um banco novo custa ~20 ms, um cursor ~1 ms) e os DataFrames registrados nele
+# ficam visíveis só para aquele cursor.
+_banco_duckdb = None
+_lock_duckdb = threading.Lock()
+
+# --- Chave inteira de mês ---
+# Os recortes do dashboard usam `mes` = ano * 12 + (mês - 1): intervalos de
+# meses viram comparações de inteiros e "n meses atrás" é uma subtração.
+
+def chave_mes(data):
+    """Chave inteira do mês de uma data (ano * 12 + mês - 1)."""
+    return data.year * 12 + data.month - 1
+
+def rotulo_mes(chave):
+    """Rótulo 'YYYY-MM' de uma chave de mês."""
+    return f"{chave // 12:04d}-{chave % 12 + 1:02d}"
+
+def com_chave_mes(df):
+    """Acrescenta a coluna `mes` (Int64, nula onde ano_mes é nulo) logo após ano_mes."""
+    ano_mes = df["ano_mes"].astype("string")
+    mes = pd.to_numeric(ano_mes.str[:4]) * 12 + pd.to_numeric(ano_mes.str[5:7]) - 1
+    df = df.drop(columns="mes", errors="ignore")
+    df.insert(df.columns.get_loc("ano_mes") + 1, "mes", mes.astype("Int64"))
+    return df
+
+def duckdb_disponivel():
+    return _DUCKDB_INSTALADO
+
+def _executar(backend, funcao_duckdb, funcao_pandas, *args):
+    """Roda no DuckDB quando pedido e disponível; senão (ou em caso de erro), no pandas."""
+    if backend == "duckdb" and _DUCKDB_INSTALADO:
+        try:
+            return funcao_duckdb(*args)
+        except Exception:
+            logger.exception("Erro na agregação em DuckDB; usando pandas")
+    return funcao_pandas(*args)
+
+def _consultar_duckdb(consulta, params=None, **tabelas):
+    """Executa a consulta num cursor DuckDB com os DataFrames registrados como tabelas."""
+    global _banco_duckdb
+    import duckdb
+
+    with _lock_duckdb:
+        if _banco_duckdb is None:
+            _banco_duckdb = duckdb.connect()
+        cursor = _banco_duckdb.cursor()
+    with cursor:
+        for nome, df in tabelas.items():
+            cursor.register(nome, df)
+        return cursor.execute(consulta, params).df()
+
+def _centavos(serie):
+    return (serie.astype("float64") * 100).round().fillna(0).astype("int64")
+
+def _validar_dimensao(dimensao):
+    if dimensao not in _DIMENSOES:
+        raise ValueError(f"Dimensão inválida: {dimensao!r} (use {', '.join(_DIMENSOES)})")
+    return dimensao
+
+# --- Cubo mensal (mês x tipo x categoria x subcategoria) ---
+
+def _cubo_mensal_duckdb(df_transacoes):
+    return _consultar_duckdb("""
+        SELECT
+            strftime(dt_datatransacao, '%Y-%m') AS ano_mes,
+            CAST(dsc_tipotransacao AS VARCHAR) AS dsc_tipotransacao,
+            CAST(dsc_categoriatransacao AS VARCHAR) AS dsc_categoriatransacao,
+            CAST(dsc_subcategoriatransacao AS VARCHAR) AS dsc_subcategoriatransacao,
+            CAST(SUM(CAST(round(coalesce(vl_transacao, 0) * 100) AS BIGINT)) AS DOUBLE) / 100 AS vl_transacao,
+            COUNT(*) AS qt_transacoes
+        FROM transacoes
+        GROUP BY 1, 2, 3, 4
+        ORDER BY 1, 2, 3, 4
+    """, transacoes=df_transacoes)
+
+def _cubo_mensal_pandas(df_transacoes):
+    chaves = ["ano_mes", *_DIMENSOES]
+    df = pd.DataFrame({
+        "ano_mes": pd.to_datetime(df_transacoes["dt_datatransacao"]).dt.strftime("%Y-%m"),
+        **{d: df_transacoes[d].astype(object) for d in _DIMENSOES},
+        "centavos": _centavos(df_transacoes["vl_transacao"]),
+    })
+    df_cubo = df.groupby(chaves, dropna=False, sort=True).agg(
+        vl_transacao=("centavos", "sum"), qt_transacoes=("centavos", "size")
+    ).reset_index()
+    df_cubo["vl_transacao"] = df_cubo["vl_transacao"] / 100
+    return df_cubo.astype({c: object for c in chaves})
+
+def cubo_mensal(df_transacoes, backend="duckdb"):
+    """
+    Agrega as transações por mês × tipo × categoria × subcategoria.
+
+    Mesmo formato de consultar_agregado_mensal: ano_mes ('YYYY-MM'), mes
+    (chave inteira, ver chave_mes), dsc_*, vl_transacao (soma) e
+    qt_transacoes, ordenado pelas chaves.
+    """
+    if df_transacoes.empty:
+        return com_chave_mes(pd.DataFrame(columns=["ano_mes", *_DIMENSOES, "vl_transacao", "qt_transacoes"]))
+    return com_chave_mes(_executar(backend, _cubo_mensal_duckdb, _cubo_mensal_pandas, df_transacoes))
+
+# --- Salário mensal ---
+
+def _salario_mensal_duckdb(df_salario):
+    return _consultar_duckdb("""
+        SELECT
+            strftime(dt_recebimento, '%Y-%m') AS ano_mes,
+            CAST(SUM(CAST(round(coalesce(vl_salario, 0) * 100) AS BIGINT)) AS DOUBLE) / 100 AS vl_salario
+        FROM salarios
+        GROUP BY 1
+        ORDER BY 1
+    """, salarios=df_salario)
+
+def _salario_mensal_pandas(df_salario):
+    df = pd.DataFrame({
+        "ano_mes": pd.to_datetime(df_salario["dt_recebimento"]).dt.strftime("%Y-%m").astype(object),
+        "centavos": _centavos(df_salario["vl_salario"]),
+    })
+    df_mensal = df.groupby("ano_mes", dropna=False, sort=True)["centavos"].sum().reset_index(name="vl_salario")
+    df_mensal["vl_salario"] = df_mensal["vl_salario"] / 100
+    return df_mensal
+
+def salario_mensal(df_salario, backend="duckdb"):
+    """Soma mensal de fact_salario (ano_mes, mes, vl_salario), como consultar_salario_mensal."""
+    if df_salario.empty:
+        return com_chave_mes(pd.DataFrame(columns=["ano_mes", "vl_salario"]))
+    return com_chave_mes(_executar(backend, _salario_mensal_duckdb, _salario_mensal_pandas, df_salario))
+
+# --- Recortes do cubo usados pelos gráficos ---
+
+def _filtro_meses(mes_inicio, mes_fim):
+    """Condições SQL (DuckDB) e parâmetros do intervalo [mes_inicio, mes_fim]; None = sem limite."""
+    condicoes, params = [], {}
+    if mes_inicio is not None:
+        condicoes.append("AND mes >= $mes_inicio")
+        params["mes_inicio"] = int(mes_inicio)
+    if mes_fim is not None:
+        condicoes.append("AND mes <= $mes_fim")
+        params["mes_fim"] = int(mes_fim)
+    return " ".join(condicoes), params or None
+
+def _recortar_meses(df_cubo, mes_inicio, mes_fim):
+    if mes_inicio is not None:
+        df_cubo = df_cubo[df_cubo["mes"] >= mes_inicio]
+    if mes_fim is not None:
+        df_cubo = df_cubo[df_cubo["mes"] <= mes_fim]
+    return df_cubo
+
+def _somar_por_mes_duckdb(df_cubo, dimensao, mes_inicio, mes_fim):
+    filtro, params = _filtro_meses(mes_inicio, mes_fim)
+    return _consultar_duckdb(f"""
+        SELECT
+            CAST(ano_mes AS VARCHAR) AS ano_mes,
+            CAST(mes AS BIGINT) AS mes,
+            CAST("{dimensao}" AS VARCHAR) AS "{dimensao}",
+            CAST(SUM(CAST(round(vl_transacao * 100) AS BIGINT)) AS DOUBLE) / 100 AS vl_transacao
+        FROM cubo
+        WHERE ano_mes IS NOT NULL AND "{dimensao}" IS NOT NULL {filtro}
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+    """, params, cubo=df_cubo)
+
+def _somar_por_mes_pandas(df_cubo, dimensao, mes_inicio, mes_fim):
+    df = _recortar_meses(df_cubo, mes_inicio, mes_fim)
+    df = df.assign(centavos=_centavos(df["vl_transacao"]))
+    df_soma = df.groupby(["ano_mes", "mes", dimensao], sort=True)["centavos"].sum().reset_index(name="vl_transacao")
+    df_soma["vl_transacao"] = df_soma["vl_transacao"] / 100
+    return df_soma.astype({"ano_mes": object, "mes": "int64", dimensao: object})
+
+def somar_por_mes(df_cubo, dimensao, mes_inicio=None, mes_fim=None, backend="duckdb"):
+    """Soma do cubo por (ano_mes, mes, dimensão), opcionalmente só nas chaves de mês de mes_inicio a mes_fim (inclusive)."""
+    dimensao = _validar_dimensao(dimensao)
+    if df_cubo.empty:
+        return pd.DataFrame(columns=["ano_mes", "mes", dimensao, "vl_transacao"])
+    return _executar(backend, _somar_por_mes_duckdb, _somar_por_mes_pandas, df_cubo, dimensao, mes_inicio, mes_fim)
+
+def _somar_por_ano_duckdb(df_cubo, dimensao, tipo):
+    return _consultar_duckdb(f"""
+        SELECT
+            CAST(mes // 12 AS VARCHAR) AS "Ano",
+            CAST("{dimensao}" AS VARCHAR) AS "{dimensao}",
+            CAST(SUM(CAST(round(vl_transacao * 100) AS BIGINT)) AS DOUBLE) / 100 AS vl_transacao
+        FROM cubo
+        WHERE dsc_tipotransacao = $tipo AND mes IS NOT NULL AND "{dimensao}" IS NOT NULL
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """, {"tipo": tipo}, cubo=df_cubo)
+
+def _somar_por_ano_pandas(df_cubo, dimensao, tipo):
+    df = df_cubo[(df_cubo["dsc_tipotransacao"] == tipo) & df_cubo["mes"].notna()]
+    df = df.assign(Ano=(df["mes"] // 12).astype(str), centavos=_centavos(df["vl_transacao"]))
+    df_soma = df.groupby(["Ano", dimensao], sort=True)["centavos"].sum().reset_index(name="vl_transacao")
+    df_soma["vl_transacao"] = df_soma["vl_transacao"] / 100
+    return df_soma.astype({"Ano": object, dimensao: object})
+
+def somar_por_ano(df_cubo, dimensao, tipo="Despesas", backend="duckdb"):
+    """Soma anual do cubo por dimensão para um tipo de transação (Ano como texto 'YYYY')."""
+    dimensao = _validar_dimensao(dimensao)
+    if df_cubo.empty:
+        return pd.DataFrame(columns=["Ano", dimensao, "vl_transacao"])
+    return _executar(backend, _somar_por_ano_duckdb, _somar_por_ano_pandas, df_cubo, dimensao, tipo)
+
+# --- Comparação offline (Parquet local) ---
+
+def comparar_backends(df_transacoes, df_salario=None, repeticoes=5):
+    """
+    Mede cada agregação nos motores duckdb e pandas e confere se os resultados são idênticos.
+
+    Retorna {agregacao: {"duckdb_ms", "pandas_ms", "identicos"}} (mediana das repetições).
+    """
+    if not _DUCKDB_INSTALADO:
+        raise RuntimeError("DuckDB não instalado (uv sync --extra analitico)")
+
+    df_cubo = com_chave_mes(_cubo_mensal_pandas(df_transacoes))
+    ultimo_mes = df_cubo["mes"].max()
+    agregacoes = {
+        "cubo_mensal": (_cubo_mensal_duckdb, _cubo_mensal_pandas, (df_transacoes,)),
+        "por_mes_categoria": (_somar_por_mes_duckdb, _somar_por_mes_pandas,
+                              (df_cubo, "dsc_categoriatransacao", ultimo_mes - 12, ultimo_mes)),
+        "por_ano_subcategoria": (_somar_por_ano_duckdb, _somar_por_ano_pandas,
+                                 (df_cubo, "dsc_subcategoriatransacao", "Despesas")),
+    }
+    if df_salario is not None and not df_salario.empty:
+        agregacoes["salario_mensal"] = (_salario_mensal_duckdb, _salario_mensal_pandas, (df_salario,))
+
+    resultado = {}
+    for nome, (funcao_duckdb, funcao_pandas, args) in agregacoes.items():
+        tempos = {}
+        saidas = {}
+        for motor, funcao in (("duckdb", funcao_duckdb), ("pandas", funcao_pandas)):
+            amostras = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                saidas[motor] = funcao(*args)
+                amostras.append((time.perf_counter() - inicio) * 1000)
+            tempos[motor] = round(sorted(amostras)[len(amostras) // 2], 2)
+        resultado[nome] = {
+            "duckdb_ms": tempos["duckdb"],
+            "pandas_ms": tempos["pandas"],
+            "identicos": saidas["duckdb"].equals(saidas["pandas"]),
+        }
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara as agregações do dashboard em DuckDB e pandas (offline).")
+    parser.add_argument("diretorio", help="diretório com stg_transacoes.parquet (e opcionalmente fact_salario.parquet)")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    df_transacoes = pd.read_parquet(f"{args.diretorio}/stg_transacoes.parquet")
+    try:
+        df_salario = pd.read_parquet(f"{args.diretorio}/fact_salario.parquet")
+    except FileNotFoundError:
+        df_salario = None
+
+    print(f"{len(df_transacoes)} transações")
+    divergencias = 0
+    for nome, medidas in comparar_backends(df_transacoes, df_salario, args.repeticoes).items():
+        print(f"{nome:<22} duckdb {medidas['duckdb_ms']:>9} ms   pandas {medidas['pandas_ms']:>9} ms   "
+              f"{'idênticos' if medidas['identicos'] else 'DIVERGENTES'}")
+        divergencias += not medidas["identicos"]
+    return 1 if divergencias else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
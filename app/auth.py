@@ -2,7 +2,6 @@
 import bcrypt
 import streamlit as st
 from helpers import logger
-from db import get_connection
 
 def gerar_hash_senha(senha):
     """Gera um hash bcrypt (string) a partir de uma senha em texto plano."""
@@ -61,6 +60,9 @@ def autenticar_usuario(login, senha):
     bcrypt e migração automática de senhas legadas (texto plano).
     Retorna {id_usuario, nome_completo, login} em caso de sucesso, ou {}.
     """
+    # Importado só no envio do formulário: a tela de login não carrega db (pandas, SQLAlchemy).
+    from db import get_connection
+
     conn = None
     usuario_info = {}
     try:
@@ -125,7 +127,6 @@ def login_page():
                     st.session_state.id_usuario_logado = usuario_info["id_usuario"]
                     st.session_state.login = usuario_info["login"]
                     st.session_state.nome_completo = usuario_info["nome_completo"]
-                    st.session_state.menu_selecionado = "Dashboard"
                     st.success(f"Bem-vindo, {usuario_info['nome_completo']}! Acesso concedido.")
                     st.rerun()
                 else:
@@ -1,5 +1,4 @@
 """Dashboard: gráficos, projeções e KPIs."""
-from dateutil.relativedelta import relativedelta
 import datetime
 import numpy as np
 import pandas as pd
@@ -7,14 +6,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 from helpers import formatar_moeda, logger
-from db import consultar_dados
-
-def gerar_meses_futuros(data_inicio, n_meses):
-    """Gera uma lista de objetos datetime.date para os n meses futuros."""
-    datas = []
-    for i in range(n_meses):
-        datas.append(data_inicio + relativedelta(months=i))
-    return datas
+from perfilador import secao
+from analitico import chave_mes, rotulo_mes, somar_por_ano, somar_por_mes
+from db import backend_analitico, consultar_agregado_mensal, consultar_salario_mensal, consultar_varios
 
 def criar_grafico_saldo_combinado(df_saldo, titulo):
     # Pivotar de volta para o formato largo para facilitar a plotagem separada
@@ -86,14 +80,15 @@ def criar_grafico_saldo_combinado(df_saldo, titulo):
     return fig
 
 def projetar_dados_futuro(df_passado, df_futuro_agregado, meses_futuro_ref):
+    """Projeção de receita, despesa e saldo para as chaves de mês (inteiras) de meses_futuro_ref."""
     # 1. Histórico — unifica 'Receita (Salário)' em 'Receita' para o cálculo
     df_hist = df_passado.copy()
     df_hist['Tipo_agg'] = df_hist['Tipo'].replace({'Receita (Salário)': 'Receita'})
-    df_hist['mes_num'] = df_hist['ano_mes'].str[-2:].astype(int)
+    df_hist['mes_num'] = (df_hist['mes'] % 12 + 1).astype(int)
 
     # Agrega por mês e tipo unificado (soma receita + salário no mesmo mês)
     df_hist_agg = (
-        df_hist.groupby(['ano_mes', 'mes_num', 'Tipo_agg'])['Valor']
+        df_hist.groupby(['mes', 'mes_num', 'Tipo_agg'])['Valor']
         .sum()
         .reset_index()
     )
@@ -114,7 +109,7 @@ def projetar_dados_futuro(df_passado, df_futuro_agregado, meses_futuro_ref):
     # 2. Dados já agendados no futuro
     if not df_futuro_agregado.empty:
         df_futuro_pivot = df_futuro_agregado.pivot_table(
-            index='ano_mes', columns='Tipo', values='Valor', aggfunc='sum'
+            index='mes', columns='Tipo', values='Valor', aggfunc='sum'
         ).fillna(0)
         for col in ['Receita', 'Receita (Salário)', 'Despesa']:
             if col not in df_futuro_pivot.columns:
@@ -126,8 +121,8 @@ def projetar_dados_futuro(df_passado, df_futuro_agregado, meses_futuro_ref):
 
     # 3. Projeção mês a mês
     rows = []
-    for mes_str in meses_futuro_ref:
-        mes_num = int(mes_str[-2:])
+    for mes in meses_futuro_ref:
+        mes_num = mes % 12 + 1
 
         # Média sazonal para este mês do ano (fallback: média geral)
         rec_saz = media_sazonal[(media_sazonal['mes_num'] == mes_num) & (media_sazonal['Tipo_agg'] == 'Receita')]
@@ -136,8 +131,8 @@ def projetar_dados_futuro(df_passado, df_futuro_agregado, meses_futuro_ref):
         media_dep = float(dep_saz['media'].iloc[0]) if not dep_saz.empty else media_dep_geral
 
         # Agendado para este mês
-        rec_agend = float(df_futuro_pivot.loc[mes_str, 'Receita_Agendada']) if mes_str in df_futuro_pivot.index else 0.0
-        dep_agend = float(df_futuro_pivot.loc[mes_str, 'Despesa_Agendada']) if mes_str in df_futuro_pivot.index else 0.0
+        rec_agend = float(df_futuro_pivot.loc[mes, 'Receita_Agendada']) if mes in df_futuro_pivot.index else 0.0
+        dep_agend = float(df_futuro_pivot.loc[mes, 'Despesa_Agendada']) if mes in df_futuro_pivot.index else 0.0
 
         # Regra: max(agendado, média histórica sazonal)
         # Garante que lançamentos parciais não subestimam a projeção
@@ -145,7 +140,7 @@ def projetar_dados_futuro(df_passado, df_futuro_agregado, meses_futuro_ref):
         despesa_final = max(dep_agend, media_dep)
 
         rows.append({
-            'ano_mes': mes_str,
+            'ano_mes': rotulo_mes(mes),
             'Receita': receita_final,
             'Despesa': despesa_final,
             'Saldo_Mensal': receita_final - despesa_final,
@@ -161,53 +156,27 @@ def projetar_dados_futuro(df_passado, df_futuro_agregado, meses_futuro_ref):
         value_name='Valor',
     )
 
-def dashboard():
-    st.title("📊 Dashboard Financeiro")
-
-    # 1. CONSULTA DE DADOS
-    try:
-        df_transacoes = consultar_dados("stg_transacoes") 
-        df_salario = consultar_dados("fact_salario")
-
-    except Exception as e:
-        logger.exception("Erro ao carregar dados de transação/salário no dashboard")
-        st.warning(f"Não foi possível carregar os dados de transação/salário. Verifique as tabelas. Erro: {e}")
-        return
-
-    if df_transacoes.empty and df_salario.empty:
-        st.info("Nenhuma transação ou salário encontrado para gerar o dashboard.")
-        return
-
-    # --- PRÉ-PROCESSAMENTO GERAL ---
-
-    # 1. Preparar df_transacoes (Receitas agendadas e Despesas)
-    if not df_transacoes.empty:
-        df_transacoes['dt_datatransacao'] = pd.to_datetime(df_transacoes['dt_datatransacao'])
-
-        df_transacoes_tipo = df_transacoes.groupby(['dt_datatransacao', 'dsc_tipotransacao'])['vl_transacao'].sum().reset_index()
+def preparar_dados_mensais(df_cubo, df_salario, backend="pandas"):
+    """Receitas, salários e despesas por mês (colunas ano_mes, mes, Tipo, Valor), a partir do cubo."""
+    # 1. Preparar as transações (Receitas agendadas e Despesas) por mês e tipo
+    if not df_cubo.empty:
+        df_transacoes_tipo = somar_por_mes(df_cubo, 'dsc_tipotransacao', backend=backend)
         df_transacoes_tipo = df_transacoes_tipo.rename(columns={'vl_transacao': 'Valor'})
-        df_transacoes_tipo['ano_mes'] = df_transacoes_tipo['dt_datatransacao'].dt.to_period('M').astype(str)
 
         df_transacoes_tipo = df_transacoes_tipo[df_transacoes_tipo['dsc_tipotransacao'].isin(['Receita', 'Despesas'])].copy()
         df_transacoes_tipo['Tipo'] = df_transacoes_tipo['dsc_tipotransacao'].replace({'Despesas': 'Despesa', 'Receita': 'Receita'})
 
-        df_transacoes_tipo = df_transacoes_tipo[['ano_mes', 'Tipo', 'Valor']]
+        df_transacoes_tipo = df_transacoes_tipo[['ano_mes', 'mes', 'Tipo', 'Valor']]
     else:
-        df_transacoes_tipo = pd.DataFrame(columns=['ano_mes', 'Tipo', 'Valor'])
+        df_transacoes_tipo = pd.DataFrame(columns=['ano_mes', 'mes', 'Tipo', 'Valor'])
 
-    # 2. Preparar df_salario (Receitas)
+    # 2. Preparar o salário mensal (Receitas)
     if not df_salario.empty:
-        df_salario['dt_recebimento'] = pd.to_datetime(df_salario['dt_recebimento'])
-
-        df_salario_agregado = df_salario.groupby(df_salario['dt_recebimento'].dt.to_period('M'))['vl_salario'].sum().reset_index()
-
-        df_salario_agregado['ano_mes'] = df_salario_agregado['dt_recebimento'].astype(str) 
-        df_salario_agregado = df_salario_agregado.rename(columns={'vl_salario': 'Valor'})
-        df_salario_agregado['Tipo'] = 'Receita (Salário)'
-
-        df_salario_final = df_salario_agregado[['ano_mes', 'Tipo', 'Valor']].copy()
+        df_salario_final = df_salario.rename(columns={'vl_salario': 'Valor'})
+        df_salario_final['Tipo'] = 'Receita (Salário)'
+        df_salario_final = df_salario_final[['ano_mes', 'mes', 'Tipo', 'Valor']]
     else:
-        df_salario_final = pd.DataFrame(columns=['ano_mes', 'Tipo', 'Valor'])
+        df_salario_final = pd.DataFrame(columns=['ano_mes', 'mes', 'Tipo', 'Valor'])
 
 
     # 3. UNIR DADOS (Salário + Transações)
@@ -216,34 +185,19 @@ def dashboard():
         df_salario_final
     ])
 
-    df_dados_mensais = df_dados_mensais.groupby(['ano_mes', 'Tipo'])['Valor'].sum().reset_index()
+    return df_dados_mensais.groupby(['ano_mes', 'mes', 'Tipo'])['Valor'].sum().reset_index()
 
+@st.fragment
+def graficos_periodo(df_cubo, df_dados_mensais, backend, today):
+    """
+    Saldo, projeção e evolução por categoria/subcategoria no período escolhido.
 
+    Roda como fragmento (st.fragment): mexer nos sliders do período reexecuta
+    só esta função, com as entradas recebidas da última execução completa;
+    KPIs, consultas e os gráficos anuais não são refeitos.
+    """
     PALETA_CORES = px.colors.qualitative.Plotly
 
-    today = datetime.date.today()
-
-    # -----------------------------------------------------------------
-    # KPIs — mês atual
-    # -----------------------------------------------------------------
-    mes_atual_str = today.strftime('%Y-%m')
-    df_kpi = df_dados_mensais[df_dados_mensais['ano_mes'] == mes_atual_str]
-    if not df_kpi.empty:
-        df_kpi_pivot = df_kpi.pivot_table(index='ano_mes', columns='Tipo', values='Valor', aggfunc='sum').fillna(0)
-        receita_kpi = float(df_kpi_pivot['Receita'].sum() if 'Receita' in df_kpi_pivot.columns else 0)
-        receita_kpi += float(df_kpi_pivot['Receita (Salário)'].sum() if 'Receita (Salário)' in df_kpi_pivot.columns else 0)
-        despesa_kpi = float(df_kpi_pivot['Despesa'].sum() if 'Despesa' in df_kpi_pivot.columns else 0)
-    else:
-        receita_kpi, despesa_kpi = 0.0, 0.0
-    saldo_kpi = receita_kpi - despesa_kpi
-
-    col_k1, col_k2, col_k3 = st.columns(3)
-    col_k1.metric("Receitas (mês atual)", f"{formatar_moeda(receita_kpi)} €")
-    col_k2.metric("Despesas (mês atual)", f"{formatar_moeda(despesa_kpi)} €")
-    col_k3.metric("Saldo (mês atual)", f"{formatar_moeda(saldo_kpi)} €", delta=round(saldo_kpi, 2))
-
-    st.markdown("---")
-
     # -----------------------------------------------------------------
     # FILTRO DE TEMPO
     # -----------------------------------------------------------------
@@ -254,27 +208,20 @@ def dashboard():
         with col_f2:
             n_meses_futuro = st.slider("Meses no futuro", min_value=1, max_value=24, value=12, key="dash_meses_futuro")
 
-    # 1. VISÃO PASSADA
-    start_date_passado = today.replace(day=1) - relativedelta(months=n_meses_passado - 1)
-    end_limit_passado = today.replace(day=1) + relativedelta(months=1)
+    # Períodos como intervalos de chaves inteiras de mês (analitico.chave_mes)
+    mes_atual = chave_mes(today)
 
-    meses_passado = [
-        (today.replace(day=1) - relativedelta(months=i)).strftime('%Y-%m')
-        for i in range(n_meses_passado - 1, -1, -1)
-    ]
+    # 1. VISÃO PASSADA (inclui o mês atual)
+    mes_inicio_passado = mes_atual - (n_meses_passado - 1)
+    meses_passado = range(mes_inicio_passado, mes_atual + 1)
 
-    df_passado_saldo = df_dados_mensais[df_dados_mensais['ano_mes'].isin(meses_passado)].copy()
+    df_passado_saldo = df_dados_mensais[df_dados_mensais['mes'].between(mes_inicio_passado, mes_atual)].copy()
 
     # 2. VISÃO FUTURA
-    start_date_futuro = today.replace(day=1) + relativedelta(months=1)
-    end_date_futuro = start_date_futuro + relativedelta(months=n_meses_futuro)
-
-    meses_futuro = [
-        (start_date_futuro + relativedelta(months=i)).strftime('%Y-%m')
-        for i in range(n_meses_futuro)
-    ]
+    mes_fim_futuro = mes_atual + n_meses_futuro
+    meses_futuro = range(mes_atual + 1, mes_fim_futuro + 1)
 
-    df_futuro_saldo = df_dados_mensais[df_dados_mensais['ano_mes'].isin(meses_futuro)].copy()
+    df_futuro_saldo = df_dados_mensais[df_dados_mensais['mes'].between(mes_atual + 1, mes_fim_futuro)].copy()
 
 
     # -----------------------------------------------------------------
@@ -291,8 +238,9 @@ def dashboard():
         df_saldo_longo = pd.melt(df_pivot, id_vars=['ano_mes'], value_vars=['Receita', 'Despesa', 'Saldo_Mensal'], var_name='Tipo', value_name='Valor')
         return df_saldo_longo
 
-    df_saldo_passado_final = gerar_df_saldo(df_passado_saldo, meses_ref=sorted(meses_passado))
-    df_saldo_futuro_final = projetar_dados_futuro(df_passado_saldo, df_futuro_saldo, meses_futuro_ref=sorted(meses_futuro))
+    with secao("Saldo e projeção"):
+        df_saldo_passado_final = gerar_df_saldo(df_passado_saldo, meses_ref=[rotulo_mes(mes) for mes in meses_passado])
+        df_saldo_futuro_final = projetar_dados_futuro(df_passado_saldo, df_futuro_saldo, meses_futuro_ref=meses_futuro)
 
 
     # -----------------------------------------------------------------
@@ -300,7 +248,7 @@ def dashboard():
     # -----------------------------------------------------------------
     col_saldo_passado, col_saldo_futuro = st.columns(2)
 
-    with col_saldo_passado:
+    with col_saldo_passado, secao("Gráfico: balanço passado"):
         st.subheader("Balanço Mensal (Passado)")
         if not df_saldo_passado_final.empty:
             fig3 = criar_grafico_saldo_combinado(df_saldo_passado_final, f'Receitas, Despesas e Saldo (Últimos {n_meses_passado} Meses)')
@@ -308,7 +256,7 @@ def dashboard():
         else:
             st.info("Dados de balanço insuficientes no período passado.")
 
-    with col_saldo_futuro:
+    with col_saldo_futuro, secao("Gráfico: projeção"):
         st.subheader("Projeção de Balanço (Futuro)")
         if not df_saldo_futuro_final.empty:
             fig4 = criar_grafico_saldo_combinado(df_saldo_futuro_final, f'Projeção de Balanço (Próximos {n_meses_futuro} Meses)')
@@ -317,27 +265,21 @@ def dashboard():
             st.info("Nenhuma projeção de transação disponível para o período futuro.")
 
     # -----------------------------------------------------------
-    # SEGUNDA LINHA DE GRÁFICOS (Evolução por Categoria + Acumulado)
+    # SEGUNDA LINHA DE GRÁFICOS (Evolução por Categoria)
     # -----------------------------------------------------------
     st.markdown("---") 
 
-    col_grafico1, col_grafico2, col_grafico5 = st.columns(3)
+    col_grafico1, col_grafico2 = st.columns(2)
 
     # -----------------------------------------------------------------
     # Gráfico 1: Evolução Mensal por Categoria (Passado) - Coluna 1
     # -----------------------------------------------------------------
-    with col_grafico1:
+    with col_grafico1, secao("Gráfico 1"):
         st.subheader("Evolução Mensal por Categoria")
 
-        df_passado_categoria = df_transacoes[
-            (df_transacoes['dt_datatransacao'].dt.date >= start_date_passado) &
-            (df_transacoes['dt_datatransacao'].dt.date < end_limit_passado)
-        ].copy()
-
-        if not df_passado_categoria.empty:
-            df_passado_categoria['ano_mes'] = df_passado_categoria['dt_datatransacao'].dt.to_period('M').astype(str)
-            df_agregado_mensal = df_passado_categoria.groupby(['ano_mes', 'dsc_categoriatransacao'])['vl_transacao'].sum().reset_index()
+        df_agregado_mensal = somar_por_mes(df_cubo, 'dsc_categoriatransacao', mes_inicio_passado, mes_atual, backend=backend)
 
+        if not df_agregado_mensal.empty:
             meses_ordenados = sorted(df_agregado_mensal['ano_mes'].unique())
             categoria_ordenada = df_agregado_mensal.groupby('dsc_categoriatransacao')['vl_transacao'].sum().sort_values(ascending=False).index.tolist()
 
@@ -360,18 +302,12 @@ def dashboard():
     # -----------------------------------------------------------------
     # Gráfico 2: Transações por Categoria (Futuro) - Coluna 2
     # -----------------------------------------------------------------
-    with col_grafico2:
+    with col_grafico2, secao("Gráfico 2"):
         st.subheader("Transações Agendadas por Categoria")
 
-        df_futuro_categoria = df_transacoes[
-            (df_transacoes['dt_datatransacao'].dt.date >= start_date_futuro) &
-            (df_transacoes['dt_datatransacao'].dt.date < end_date_futuro)
-        ].copy()
-
-        if not df_futuro_categoria.empty:
-            df_futuro_categoria['ano_mes'] = df_futuro_categoria['dt_datatransacao'].dt.to_period('M').astype(str)
-            df_agregado_futuro = df_futuro_categoria.groupby(['ano_mes', 'dsc_categoriatransacao'])['vl_transacao'].sum().reset_index()
+        df_agregado_futuro = somar_por_mes(df_cubo, 'dsc_categoriatransacao', mes_atual + 1, mes_fim_futuro, backend=backend)
 
+        if not df_agregado_futuro.empty:
             meses_futuros_ordenados = sorted(df_agregado_futuro['ano_mes'].unique())
             categoria_futura_ordenada = df_agregado_futuro.groupby('dsc_categoriatransacao')['vl_transacao'].sum().sort_values(ascending=False).index.tolist()
 
@@ -391,72 +327,22 @@ def dashboard():
         else:
             st.info("Nenhuma transação agendada/registrada para o período futuro.")
 
-    # -----------------------------------------------------------------
-    # Gráfico 5: Despesas Acumuladas por Ano (Anual) - Coluna 3
-    # -----------------------------------------------------------------
-    with col_grafico5:
-        st.subheader("Despesas Acumuladas por Ano")
-
-        # Filtrar o DataFrame de Transações Apenas para DESPESAS
-        df_despesas_acumuladas_anual = df_transacoes[
-            df_transacoes['dsc_tipotransacao'] == 'Despesas'
-        ].copy()
-
-        if not df_despesas_acumuladas_anual.empty:
-            df_despesas_acumuladas_anual['Ano'] = df_despesas_acumuladas_anual['dt_datatransacao'].dt.year
-
-            df_agregado_anual = df_despesas_acumuladas_anual.groupby(['Ano', 'dsc_categoriatransacao'])['vl_transacao'].sum().reset_index()
-            df_agregado_anual['Ano'] = df_agregado_anual['Ano'].astype(str)
-
-            # Ajuste de Ordenação da Pilha (Cores)
-            categoria_ordenada_acumulada = df_agregado_anual.groupby('dsc_categoriatransacao')['vl_transacao'].sum().sort_values(ascending=False).index.tolist()
-
-            fig5 = px.bar(
-                df_agregado_anual,
-                x='Ano',
-                y='vl_transacao',
-                color='dsc_categoriatransacao',
-                barmode='stack',
-                title='Distribuição de Despesas por Categoria (Acumulado Anual)',
-                labels={'vl_transacao': 'Valor Acumulado (€)', 'dsc_categoriatransacao': 'Categoria'},
-                color_discrete_sequence=PALETA_CORES, 
-                category_orders={"dsc_categoriatransacao": categoria_ordenada_acumulada}
-            )
-
-            # Ordenação do Eixo X (Ano) é mantida cronológica (2023, 2024, 2025)
-            fig5.update_layout(
-                xaxis_title='Ano', 
-                yaxis_title='Valor Acumulado',
-                legend_title='Categoria'
-            )
-            fig5.update_yaxes(tickformat=".2f")
-            st.plotly_chart(fig5, use_container_width=True)
-        else:
-            st.info("Nenhuma despesa registrada para o cálculo acumulado por ano.")
-
     # -----------------------------------------------------------
-    # TERCEIRA LINHA DE GRÁFICOS (Evolução por Subcategoria + Acumulado)
+    # TERCEIRA LINHA DE GRÁFICOS (Evolução por Subcategoria)
     # -----------------------------------------------------------
     st.markdown("---") 
 
-    col_grafico6, col_grafico7, col_grafico8 = st.columns(3)
+    col_grafico6, col_grafico7 = st.columns(2)
 
     # -----------------------------------------------------------------
     # Gráfico 6: Evolução Mensal por Subcategoria (Passado) - Coluna 1
     # -----------------------------------------------------------------
-    with col_grafico6:
+    with col_grafico6, secao("Gráfico 6"):
         st.subheader("Evolução Mensal por Subcategoria")
 
-        df_passado_subcategoria = df_transacoes[
-            (df_transacoes['dt_datatransacao'].dt.date >= start_date_passado) &
-            (df_transacoes['dt_datatransacao'].dt.date < end_limit_passado)
-        ].copy()
-
-        if not df_passado_subcategoria.empty:
-            df_passado_subcategoria['ano_mes'] = df_passado_subcategoria['dt_datatransacao'].dt.to_period('M').astype(str)
-            # Agrupar por Mês e Subcategoria
-            df_agregado_mensal_sub = df_passado_subcategoria.groupby(['ano_mes', 'dsc_subcategoriatransacao'])['vl_transacao'].sum().reset_index()
+        df_agregado_mensal_sub = somar_por_mes(df_cubo, 'dsc_subcategoriatransacao', mes_inicio_passado, mes_atual, backend=backend)
 
+        if not df_agregado_mensal_sub.empty:
             meses_ordenados = sorted(df_agregado_mensal_sub['ano_mes'].unique())
             # Ordenar subcategorias para consistência de cores
             subcategoria_ordenada = df_agregado_mensal_sub.groupby('dsc_subcategoriatransacao')['vl_transacao'].sum().sort_values(ascending=False).index.tolist()
@@ -480,19 +366,12 @@ def dashboard():
     # -----------------------------------------------------------------
     # Gráfico 7: Transações por Subcategoria (Futuro) - Coluna 2
     # -----------------------------------------------------------------
-    with col_grafico7:
+    with col_grafico7, secao("Gráfico 7"):
         st.subheader("Transações Agendadas por Subcategoria")
 
-        df_futuro_subcategoria = df_transacoes[
-            (df_transacoes['dt_datatransacao'].dt.date >= start_date_futuro) &
-            (df_transacoes['dt_datatransacao'].dt.date < end_date_futuro)
-        ].copy()
-
-        if not df_futuro_subcategoria.empty:
-            df_futuro_subcategoria['ano_mes'] = df_futuro_subcategoria['dt_datatransacao'].dt.to_period('M').astype(str)
-            # Agrupar por Mês e Subcategoria
-            df_agregado_futuro_sub = df_futuro_subcategoria.groupby(['ano_mes', 'dsc_subcategoriatransacao'])['vl_transacao'].sum().reset_index()
+        df_agregado_futuro_sub = somar_por_mes(df_cubo, 'dsc_subcategoriatransacao', mes_atual + 1, mes_fim_futuro, backend=backend)
 
+        if not df_agregado_futuro_sub.empty:
             meses_futuros_ordenados = sorted(df_agregado_futuro_sub['ano_mes'].unique())
             subcategoria_futura_ordenada = df_agregado_futuro_sub.groupby('dsc_subcategoriatransacao')['vl_transacao'].sum().sort_values(ascending=False).index.tolist()
 
@@ -512,23 +391,107 @@ def dashboard():
         else:
             st.info("Nenhuma transação agendada/registrada por subcategoria para o período futuro.")
 
+def dashboard():
+    st.title("📊 Dashboard Financeiro")
+
+    # 1. CONSULTA DE DADOS (agregados mensais; ver [dashboard].backend_analitico)
+    try:
+        with secao("Consulta"):
+            df_cubo, df_salario = consultar_varios([consultar_agregado_mensal, consultar_salario_mensal])
+        # Recortes do cubo: no DuckDB se configurado, senão em pandas (o cubo já é pequeno)
+        backend = "duckdb" if backend_analitico() == "duckdb" else "pandas"
+
+    except Exception as e:
+        logger.exception("Erro ao carregar dados de transação/salário no dashboard")
+        st.warning(f"Não foi possível carregar os dados de transação/salário. Verifique as tabelas. Erro: {e}")
+        return
+
+    if df_cubo.empty and df_salario.empty:
+        st.info("Nenhuma transação ou salário encontrado para gerar o dashboard.")
+        return
+
+    # --- PRÉ-PROCESSAMENTO GERAL ---
+    with secao("Pré-processamento"):
+        df_dados_mensais = preparar_dados_mensais(df_cubo, df_salario, backend)
+
+    today = datetime.date.today()
+
     # -----------------------------------------------------------------
-    # Gráfico 8: Despesas Acumuladas por Subcategoria (Anual) - Coluna 3
+    # KPIs — mês atual
     # -----------------------------------------------------------------
-    with col_grafico8:
-        st.subheader("Despesas Acumuladas por Ano (Subcategoria)")
+    df_kpi = df_dados_mensais[df_dados_mensais['mes'] == chave_mes(today)]
+    if not df_kpi.empty:
+        df_kpi_pivot = df_kpi.pivot_table(index='ano_mes', columns='Tipo', values='Valor', aggfunc='sum').fillna(0)
+        receita_kpi = float(df_kpi_pivot['Receita'].sum() if 'Receita' in df_kpi_pivot.columns else 0)
+        receita_kpi += float(df_kpi_pivot['Receita (Salário)'].sum() if 'Receita (Salário)' in df_kpi_pivot.columns else 0)
+        despesa_kpi = float(df_kpi_pivot['Despesa'].sum() if 'Despesa' in df_kpi_pivot.columns else 0)
+    else:
+        receita_kpi, despesa_kpi = 0.0, 0.0
+    saldo_kpi = receita_kpi - despesa_kpi
 
-        df_despesas_acumuladas_anual_sub = df_transacoes[
-            df_transacoes['dsc_tipotransacao'] == 'Despesas'
-        ].copy()
+    col_k1, col_k2, col_k3 = st.columns(3)
+    col_k1.metric("Receitas (mês atual)", f"{formatar_moeda(receita_kpi)} €")
+    col_k2.metric("Despesas (mês atual)", f"{formatar_moeda(despesa_kpi)} €")
+    col_k3.metric("Saldo (mês atual)", f"{formatar_moeda(saldo_kpi)} €", delta=round(saldo_kpi, 2))
+
+    st.markdown("---")
 
-        if not df_despesas_acumuladas_anual_sub.empty:
-            df_despesas_acumuladas_anual_sub['Ano'] = df_despesas_acumuladas_anual_sub['dt_datatransacao'].dt.year
+    # Gráficos do período: os sliders reexecutam só este fragmento
+    graficos_periodo(df_cubo, df_dados_mensais, backend, today)
+
+    # -----------------------------------------------------------
+    # ACUMULADO ANUAL (não depende do período: fora do fragmento)
+    # -----------------------------------------------------------
+    st.markdown("---")
+
+    PALETA_CORES = px.colors.qualitative.Plotly
+
+    col_grafico5, col_grafico8 = st.columns(2)
+
+    # -----------------------------------------------------------------
+    # Gráfico 5: Despesas Acumuladas por Ano (Anual) - Coluna 1
+    # -----------------------------------------------------------------
+    with col_grafico5, secao("Gráfico 5"):
+        st.subheader("Despesas Acumuladas por Ano")
+
+        df_agregado_anual = somar_por_ano(df_cubo, 'dsc_categoriatransacao', tipo='Despesas', backend=backend)
+
+        if not df_agregado_anual.empty:
+            # Ajuste de Ordenação da Pilha (Cores)
+            categoria_ordenada_acumulada = df_agregado_anual.groupby('dsc_categoriatransacao')['vl_transacao'].sum().sort_values(ascending=False).index.tolist()
+
+            fig5 = px.bar(
+                df_agregado_anual,
+                x='Ano',
+                y='vl_transacao',
+                color='dsc_categoriatransacao',
+                barmode='stack',
+                title='Distribuição de Despesas por Categoria (Acumulado Anual)',
+                labels={'vl_transacao': 'Valor Acumulado (€)', 'dsc_categoriatransacao': 'Categoria'},
+                color_discrete_sequence=PALETA_CORES, 
+                category_orders={"dsc_categoriatransacao": categoria_ordenada_acumulada}
+            )
+
+            # Ordenação do Eixo X (Ano) é mantida cronológica (2023, 2024, 2025)
+            fig5.update_layout(
+                xaxis_title='Ano', 
+                yaxis_title='Valor Acumulado',
+                legend_title='Categoria'
+            )
+            fig5.update_yaxes(tickformat=".2f")
+            st.plotly_chart(fig5, use_container_width=True)
+        else:
+            st.info("Nenhuma despesa registrada para o cálculo acumulado por ano.")
+
+    # -----------------------------------------------------------------
+    # Gráfico 8: Despesas Acumuladas por Subcategoria (Anual) - Coluna 2
+    # -----------------------------------------------------------------
+    with col_grafico8, secao("Gráfico 8"):
+        st.subheader("Despesas Acumuladas por Ano (Subcategoria)")
 
-            # Agrupar por Ano e Subcategoria
-            df_agregado_anual_sub = df_despesas_acumuladas_anual_sub.groupby(['Ano', 'dsc_subcategoriatransacao'])['vl_transacao'].sum().reset_index()
-            df_agregado_anual_sub['Ano'] = df_agregado_anual_sub['Ano'].astype(str)
+        df_agregado_anual_sub = somar_por_ano(df_cubo, 'dsc_subcategoriatransacao', tipo='Despesas', backend=backend)
 
+        if not df_agregado_anual_sub.empty:
             # Ajuste de Ordenação da Pilha (Cores)
             subcategoria_ordenada_acumulada = df_agregado_anual_sub.groupby('dsc_subcategoriatransacao')['vl_transacao'].sum().sort_values(ascending=False).index.tolist()
 
@@ -1,23 +1,292 @@
 """Camada de acesso a dados (engine SQLAlchemy, pool e operações de BD)."""
-from psycopg2 import sql
-from sqlalchemy import create_engine, text
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from psycopg2 import errors, sql
+from psycopg2.extras import execute_values
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.engine import URL
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.exc import SQLAlchemyError
 import pandas as pd
 import psycopg2
+import datetime
+import hashlib
+import io
+import json
+import numpy as np
+import os
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import re
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import threading
+import time
+import analitico
 from helpers import logger
 
+# Tabelas lidas de forma incremental (delta-sync): nome -> coluna de ID crescente
+# usada como high-water mark. As demais continuam com SELECT * completo.
+_TABELAS_INCREMENTAIS = {"stg_transacoes": "id_transacao"}
+# Coluna opcional de última alteração; se existir, também detecta UPDATEs feitos fora do app.
+_COLUNA_ATUALIZACAO = "updated_at"
+# Tempo máximo (s) de um snapshot incremental antes de uma recarga completa de segurança.
+_TTL_SNAPSHOT_COMPLETO = 3600
+
+# Cache em disco opcional ([cache_disco].diretorio no secrets.toml): versão do formato
+# dos arquivos (mudar descarta os snapshots gravados) e relações que nunca vão para o
+# disco (dim_usuario tem os hashes de senha).
+_FORMATO_CACHE_DISCO = 1
+_RELACOES_FORA_DO_CACHE_DISCO = ("dim_usuario",)
+# Os snapshots são gravados em lote, numa thread, até N s depois da leitura que os
+# renovou: uma sequência de escritas no app gera uma só regravação por arquivo.
+_ATRASO_GRAVACAO_DISCO_S = 30.0
+
+# Views que dependem de cada tabela: uma escrita na tabela invalida o cache
+# dela e destas views, e nada mais.
+_DEPENDENCIAS_CACHE = {
+    "stg_transacoes": ("vw_stg_transacoes", "vw_acertototal", "vw_acertomensal", "vw_acertodetalhe"),
+    "fact_salario": ("vw_fact_salarios",),
+    "dim_tipotransacao": ("vw_dim_categoria",),
+    "dim_categoria": ("vw_dim_categoria", "vw_dim_subcategoria"),
+    "dim_subcategoria": ("vw_dim_subcategoria",),
+    "dim_usuario": ("vw_fact_salarios", "vw_acertototal", "vw_acertomensal", "vw_acertodetalhe"),
+}
+
+# Views de acerto mantidas também como views materializadas (pré-calculadas),
+# criadas pela migração 3 (migracoes.py).
+_VIEWS_MATERIALIZADAS = {
+    "vw_acertototal": "mvw_acertototal",
+    "vw_acertomensal": "mvw_acertomensal",
+    "vw_acertodetalhe": "mvw_acertodetalhe",
+}
+# Ordem de leitura de cada view materializada (pela chave do índice único).
+_ORDEM_MATERIALIZADAS = {
+    "mvw_acertototal": ["nomeusuario"],
+    "mvw_acertomensal": ["ano", "mes", "cd_quemdeve"],
+    "mvw_acertodetalhe": ["dt_datatransacao", "ch_linha", "nr_repeticao"],
+}
+# Colunas de chave que só existem na view materializada (não voltam para as telas).
+_COLUNAS_CHAVE_MATERIALIZADAS = ("ch_linha", "nr_repeticao")
+# Enquanto as views materializadas não existem, o catálogo é reconsultado a cada N s.
+_INTERVALO_VERIFICACAO_MATERIALIZADAS_S = 60
+# Tabelas cujas escritas disparam o refresh das views materializadas de acerto.
+_TABELAS_BASE_ACERTO = ("stg_transacoes", "dim_usuario")
+# Espera (s) após a última escrita antes do refresh; escritas em sequência geram um só refresh.
+_ATRASO_REFRESH_S = 2.0
+
+# Registro de esquemas: tipos das colunas de cada tabela/view lida pelo app. É
+# aplicado uma única vez ao carregar (antes de o DataFrame ir para o cache), então
+# as telas nunca reconvertem colunas. Colunas ausentes no resultado são ignoradas.
+#   datas      -> datetime64[ns] (_TIPO_DATAS) em qualquer motor de leitura: DATE
+#                 lido como objeto (pandas) ou date32 (arrow) é sempre convertido
+#   moeda      -> float64 (também no motor "arrow", que lê double[pyarrow])
+#   flags      -> category ('S'/'N'), com categorias em object em qualquer motor
+#   categorias -> category (textos repetidos), idem
+#   inteiros   -> {coluna: tipo} com largura fixa (não depende dos valores lidos,
+#                 então snapshot, delta e cache em disco têm sempre o mesmo dtype);
+#                 com NULL, a variante anulável do mesmo tipo (ex.: Int32)
+_ESQUEMAS = {
+    "stg_transacoes": {
+        "datas": ("dt_datatransacao",),
+        "moeda": ("vl_transacao",),
+        "flags": ("cd_edividido", "cd_foidividido"),
+        "categorias": (
+            "dsc_tipotransacao", "dsc_categoriatransacao", "dsc_subcategoriatransacao",
+            "dsc_nomeusuario", "cd_quempagou",
+        ),
+        "inteiros": {
+            "id_transacao": "int32", "id_tipotransacao": "int32", "id_categoria": "int32",
+            "id_subcategoria": "int32", "id_usuario": "int32",
+        },
+    },
+    "fact_salario": {
+        "datas": ("dt_recebimento",),
+        "moeda": ("vl_salario",),
+        "inteiros": {"id_salario": "int32", "id_usuario": "int32"},
+    },
+    "dim_tipotransacao": {"inteiros": {"id_tipotransacao": "int32"}},
+    "dim_categoria": {"inteiros": {"id_categoria": "int32", "id_tipotransacao": "int32"}},
+    "dim_subcategoria": {"inteiros": {"id_subcategoria": "int32", "id_categoria": "int32"}},
+    "dim_usuario": {"inteiros": {"id_usuario": "int32"}},
+    "vw_fact_salarios": {
+        "datas": ("dt_recebimento",),
+        "moeda": ("vl_salario",),
+        "categorias": ("nomeusuario",),
+        "inteiros": {"id_salario": "int32"},
+    },
+    "vw_dim_categoria": {"inteiros": {"id": "int32"}},
+    "vw_dim_subcategoria": {"inteiros": {"id": "int32"}},
+    "vw_acertototal": {"moeda": ("vl_saldototal",)},
+    "vw_acertomensal": {"moeda": ("vl_saldoacertomensal",), "categorias": ("cd_quemdeve",)},
+    "vw_acertodetalhe": {
+        "datas": ("dt_datatransacao",),
+        "moeda": ("vl_totaltransacao", "vl_proporcional", "vl_acertotransacao"),
+        "categorias": ("cd_quempagou", "cd_quemdeve"),
+    },
+}
+_TIPO_DATAS = "datetime64[ns]"
+_ESQUEMAS["vw_stg_transacoes"] = _ESQUEMAS["stg_transacoes"]
+for _view, _view_materializada in _VIEWS_MATERIALIZADAS.items():
+    _ESQUEMAS[_view_materializada] = _ESQUEMAS[_view]
+
+# Motores de leitura: "pandas" (pd.read_sql, linha a linha) ou "arrow" (COPY ... TO
+# STDOUT em CSV lido em colunas pelo pyarrow, gerando DataFrames com dtypes Arrow).
+# O padrão pode ser trocado em [postgresql].motor_leitura.
+_MOTORES_LEITURA = ("pandas", "arrow")
+_MOTOR_LEITURA_PADRAO = "pandas"
+# Onde o dashboard agrega: "postgres" (GROUP BY no banco), "duckdb" ou "pandas"
+# (sobre o snapshot de stg_transacoes/fact_salario já em cache, ver analitico.py).
+# Configurável em [dashboard].backend_analitico.
+_BACKEND_ANALITICO_PADRAO = "postgres"
+# Tipos do Postgres (OID) -> tipo Arrow no motor "arrow"; os demais são lidos como string.
+_TIPOS_ARROW = {
+    16: pa.bool_(),                          # boolean
+    20: pa.int64(), 21: pa.int64(), 23: pa.int64(),  # int8, int2, int4
+    700: pa.float64(), 701: pa.float64(), 1700: pa.float64(),  # float4, float8, numeric
+    1082: pa.date32(),                       # date
+    1114: pa.timestamp("us"),                # timestamp
+    1184: pa.timestamp("us", tz="UTC"),      # timestamptz
+}
+
+# Consultas acima deste tempo (ms) vão para o log como lentas; configurável em
+# [diagnostico].consulta_lenta_ms no secrets.toml.
+_LIMITE_CONSULTA_LENTA_MS = 500
+# Durações mantidas por consulta (fingerprint) para os percentis móveis p50/p95/p99.
+_AMOSTRAS_POR_CONSULTA = 500
+
+# Normalização do SQL para o fingerprint: literais e parâmetros viram '?'.
+_RE_TEXTO_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_RE_PARAMETRO = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+# Operadores aceitos nos filtros estruturados de consultar_dados.
+_OPERADORES_FILTRO = {
+    "=": "=", "!=": "<>", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "in": "IN",
+}
+
+# Janela padrão (s) após uma escrita em que as leituras da relação vão ao primário,
+# para o usuário ver o próprio INSERT mesmo com atraso de replicação.
+_JANELA_POS_ESCRITA_S = 5.0
+
+# Configuração padrão do pool; cada chave pode ser sobrescrita no bloco [postgresql].
+_CONFIG_POOL_PADRAO = {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": 600}
+# Limites (ms) das faixas dos histogramas de espera no checkout e de tempo de conexão.
+_FAIXAS_HISTOGRAMA_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+class _Histograma:
+    """Histograma de latências (ms) em faixas fixas, com contagem, soma e máximo."""
+
+    def __init__(self):
+        self.contagens = [0] * (len(_FAIXAS_HISTOGRAMA_MS) + 1)
+        self.total = 0
+        self.soma_ms = 0.0
+        self.max_ms = 0.0
+
+    def registrar(self, ms):
+        indice = next((i for i, limite in enumerate(_FAIXAS_HISTOGRAMA_MS) if ms <= limite), len(_FAIXAS_HISTOGRAMA_MS))
+        self.contagens[indice] += 1
+        self.total += 1
+        self.soma_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def resumo(self):
+        rotulos = [f"<= {limite} ms" for limite in _FAIXAS_HISTOGRAMA_MS] + [f"> {_FAIXAS_HISTOGRAMA_MS[-1]} ms"]
+        return {
+            "total": self.total,
+            "media_ms": round(self.soma_ms / self.total, 2) if self.total else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "faixas": dict(zip(rotulos, self.contagens)),
+        }
+
+class _MetricasPool:
+    """Métricas de um pool, alimentadas pelos eventos do SQLAlchemy (thread-safe)."""
+
+    def __init__(self, config):
+        self.config = dict(config)
+        self.lock = threading.Lock()
+        self.espera_checkout = _Histograma()
+        self.tempo_conexao = _Histograma()
+        self.checkouts = 0
+        self.conexoes_abertas = 0
+        self.invalidacoes = 0
+        self.ultima_invalidacao = None
+        self.pico_em_uso = 0
+        self.em_uso = 0
+        self.inicio_conexao = threading.local()
+
+    def registrar_espera(self, ms):
+        with self.lock:
+            self.espera_checkout.registrar(ms)
+
+    def ao_iniciar_conexao(self, *_):
+        self.inicio_conexao.t0 = time.perf_counter()
+
+    def ao_conectar(self, *_):
+        t0 = getattr(self.inicio_conexao, "t0", None)
+        with self.lock:
+            self.conexoes_abertas += 1
+            if t0 is not None:
+                self.tempo_conexao.registrar((time.perf_counter() - t0) * 1000)
+        self.inicio_conexao.t0 = None
+
+    def ao_checkout(self, *_):
+        with self.lock:
+            self.checkouts += 1
+            self.em_uso += 1
+            self.pico_em_uso = max(self.pico_em_uso, self.em_uso)
+
+    def ao_checkin(self, *_):
+        with self.lock:
+            self.em_uso = max(self.em_uso - 1, 0)
+
+    def ao_invalidar(self, dbapi_connection, connection_record, exception):
+        # Inclui as conexões mortas descartadas pelo pool_pre_ping.
+        with self.lock:
+            self.invalidacoes += 1
+            self.ultima_invalidacao = repr(exception) if exception is not None else None
+
+    def resumo(self, pool):
+        with self.lock:
+            return {
+                "config": self.config,
+                "tamanho": pool.size(),
+                "em_uso": pool.checkedout(),
+                "ociosas": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "pico_em_uso": self.pico_em_uso,
+                "checkouts": self.checkouts,
+                "conexoes_abertas": self.conexoes_abertas,
+                "invalidacoes": self.invalidacoes,
+                "ultima_invalidacao": self.ultima_invalidacao,
+                "espera_checkout": self.espera_checkout.resumo(),
+                "tempo_conexao": self.tempo_conexao.resumo(),
+            }
+
+class _PoolInstrumentado(QueuePool):
+    """QueuePool que mede o tempo de espera por uma conexão no checkout."""
+
+    metricas = None
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metricas is not None:
+                self.metricas.registrar_espera((time.perf_counter() - t0) * 1000)
+
 @st.cache_resource
-def get_engine():
-    """Cria uma única vez um engine SQLAlchemy com pool de conexões (Postgres/Neon).
+def _pools_instrumentados():
+    """Engines criados por nome ("primario"/"replica") e suas métricas."""
+    return {}
 
-    O pool é compartilhado entre reruns/sessões do Streamlit (via cache_resource),
-    evitando abrir uma conexão TCP nova a cada query. `pool_pre_ping` descarta
-    conexões mortas (ex.: timeout do Neon) antes de reutilizá-las.
-    """
-    # As credenciais são carregadas do secrets.toml (bloco [postgresql])
-    conn_details = st.secrets["postgresql"]
+def _criar_engine(conn_details, nome="primario"):
+    """Cria um engine SQLAlchemy com pool instrumentado a partir de um bloco de credenciais."""
     url = URL.create(
         "postgresql+psycopg2",
         username=conn_details["username"],
@@ -26,13 +295,85 @@ def get_engine():
         port=conn_details["port"],
         database=conn_details["database"],
     )
-    return create_engine(
+    config = {chave: conn_details.get(chave, padrao) for chave, padrao in _CONFIG_POOL_PADRAO.items()}
+    engine = create_engine(
         url,
         connect_args={"sslmode": "require"},  # O Neon exige SSL
         pool_pre_ping=True,
-        pool_recycle=600,
+        poolclass=_PoolInstrumentado,
+        **config,
     )
 
+    metricas = _MetricasPool(config)
+    engine.pool.metricas = metricas
+    event.listen(engine, "do_connect", metricas.ao_iniciar_conexao)
+    event.listen(engine.pool, "connect", metricas.ao_conectar)
+    event.listen(engine.pool, "checkout", metricas.ao_checkout)
+    event.listen(engine.pool, "checkin", metricas.ao_checkin)
+    event.listen(engine.pool, "invalidate", metricas.ao_invalidar)
+    _pools_instrumentados()[nome] = (engine, metricas)
+    return engine
+
+def diagnostico_pool():
+    """
+    Retorna as métricas de cada pool criado ({"primario": {...}, "replica": {...}}).
+
+    Inclui a configuração efetiva, conexões em uso/ociosas/overflow (e o pico),
+    histogramas de espera no checkout e de tempo de abertura de conexão, e as
+    invalidações (ex.: conexões mortas descartadas pelo pre-ping).
+    """
+    get_engine()  # garante ao menos o pool do primário
+    return {nome: metricas.resumo(engine.pool) for nome, (engine, metricas) in _pools_instrumentados().items()}
+
+@st.cache_resource
+def get_engine():
+    """Cria uma única vez um engine SQLAlchemy com pool de conexões (Postgres/Neon).
+
+    O pool é compartilhado entre reruns/sessões do Streamlit (via cache_resource),
+    evitando abrir uma conexão TCP nova a cada query. `pool_pre_ping` descarta
+    conexões mortas (ex.: timeout do Neon) antes de reutilizá-las.
+
+    É o engine do primário: todas as escritas passam por ele.
+    """
+    # As credenciais são carregadas do secrets.toml (bloco [postgresql])
+    return _criar_engine(st.secrets["postgresql"])
+
+@st.cache_resource
+def _get_engine_replica():
+    """
+    Engine da réplica de leitura (bloco opcional [postgresql.replica]), ou None.
+
+    Campos omitidos na réplica (usuário, senha, banco...) herdam os do primário,
+    então normalmente basta informar `server`.
+    """
+    conn_details = st.secrets["postgresql"]
+    if "replica" not in conn_details:
+        return None
+    return _criar_engine({**conn_details, **conn_details["replica"]}, nome="replica")
+
+def _janela_pos_escrita():
+    """Janela de leitura-após-escrita (s); configurável em [postgresql.replica]."""
+    replica = st.secrets["postgresql"].get("replica", {})
+    return float(replica.get("janela_pos_escrita_s", _JANELA_POS_ESCRITA_S))
+
+def get_engine_leitura(*relacoes):
+    """
+    Engine para leituras das relações informadas.
+
+    Usa a réplica quando configurada; volta ao primário se alguma das relações
+    foi escrita há menos de `janela_pos_escrita_s` segundos. Assim quem acabou
+    de gravar (e o cache da nova versão) não lê um dado ainda não replicado.
+    """
+    replica = _get_engine_replica()
+    if replica is None:
+        return get_engine()
+
+    escritas = _versoes_cache()["escritas"]
+    limite = time.monotonic() - _janela_pos_escrita()
+    if any(escritas.get(relacao.lower(), float("-inf")) > limite for relacao in relacoes):
+        return get_engine()
+    return replica
+
 def get_connection():
     """Retorna uma conexão psycopg2 obtida do pool do engine.
 
@@ -41,35 +382,838 @@ def get_connection():
     """
     return get_engine().raw_connection()
 
-@st.cache_data(ttl=3600)
-def consultar_dados(tabela_ou_view, usar_view=True):
+def _renderizar_sql(sql_query, engine):
+    """Renderiza um psycopg2.sql.Composed em string.
+
+    O render exige a conexão psycopg2 real (raw.driver_connection), e não o
+    wrapper do pool.
+    """
+    raw = engine.raw_connection()
+    try:
+        return sql_query.as_string(raw.driver_connection)
+    finally:
+        raw.close()
+
+# Funções chamadas a cada consulta medida: (fingerprint, sql, duracao_ms, linhas, bytes).
+_ouvintes_consulta = []
+
+def registrar_ouvinte_consulta(funcao):
+    """Registra uma função chamada após cada consulta medida (ex.: perfilador)."""
+    if funcao not in _ouvintes_consulta:
+        _ouvintes_consulta.append(funcao)
+
+@st.cache_resource
+def _estatisticas_consultas():
+    """
+    Estatísticas por fingerprint de consulta, compartilhadas entre sessões (com lock).
+
+    Guarda também o limite de consulta lenta ([diagnostico].consulta_lenta_ms),
+    lido uma vez: as threads de segundo plano recebem este estado na criação e
+    não consultam st.secrets.
+    """
+    return {
+        "lock": threading.Lock(),
+        "consultas": {},
+        "limite_ms": st.secrets.get("diagnostico", {}).get("consulta_lenta_ms", _LIMITE_CONSULTA_LENTA_MS),
+    }
+
+def _normalizar_sql(texto):
+    """Normaliza o SQL (literais/parâmetros -> '?', listas -> '(?...)', espaços colapsados)."""
+    texto = _RE_TEXTO_LITERAL.sub("?", texto)
+    texto = _RE_PARAMETRO.sub("?", texto)
+    texto = _RE_NUMERO.sub("?", texto)
+    texto = _RE_LISTA.sub("(?...)", texto)
+    return _RE_ESPACOS.sub(" ", texto).strip()
+
+def _texto_sql(consulta, contexto=None):
+    """Texto de uma consulta (str, text() do SQLAlchemy ou psycopg2.sql.Composable)."""
+    if isinstance(consulta, sql.Composable):
+        return consulta.as_string(contexto)
+    return getattr(consulta, "text", None) or str(consulta)
+
+def _registrar_consulta(texto, duracao_ms, linhas, bytes_, estatisticas=None):
+    """
+    Acumula a execução nas estatísticas do fingerprint e loga se passar do limite.
+
+    `estatisticas` é o estado de _estatisticas_consultas(); threads fora do
+    contexto do Streamlit o recebem na criação e o repassam aqui.
+    """
+    normalizado = _normalizar_sql(texto)
+    fingerprint = hashlib.md5(normalizado.encode("utf-8")).hexdigest()[:12]
+
+    estado = estatisticas or _estatisticas_consultas()
+    with estado["lock"]:
+        estatistica = estado["consultas"].setdefault(fingerprint, {
+            "sql": normalizado, "execucoes": 0, "lentas": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "linhas": 0, "bytes": 0, "duracoes": deque(maxlen=_AMOSTRAS_POR_CONSULTA),
+        })
+        estatistica["execucoes"] += 1
+        estatistica["total_ms"] += duracao_ms
+        estatistica["max_ms"] = max(estatistica["max_ms"], duracao_ms)
+        estatistica["linhas"] += max(linhas or 0, 0)
+        estatistica["bytes"] += bytes_ or 0
+        estatistica["duracoes"].append(duracao_ms)
+
+        if duracao_ms > estado["limite_ms"]:
+            estatistica["lentas"] += 1
+            logger.warning(
+                "Consulta lenta [%s] %.0f ms, %s linha(s), %s bytes: %s",
+                fingerprint, duracao_ms, linhas, bytes_, normalizado,
+            )
+
+    for ouvinte in _ouvintes_consulta:
+        ouvinte(fingerprint, normalizado, duracao_ms, linhas, bytes_)
+
+@contextmanager
+def _medir_consulta(consulta, contexto=None, estatisticas=None):
+    """
+    Mede a execução do bloco e a registra nas estatísticas da consulta.
+
+    O bloco preenche `linhas` e `bytes` no dicionário retornado. Execuções com
+    erro também são registradas (com o tempo até a falha).
+    """
+    medicao = {"linhas": None, "bytes": None}
+    inicio = time.perf_counter()
+    try:
+        yield medicao
+    finally:
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        _registrar_consulta(_texto_sql(consulta, contexto), duracao_ms, medicao["linhas"], medicao["bytes"], estatisticas)
+
+def _motor_leitura(motor=None):
+    """Valida o motor de leitura; None usa o padrão configurado em [postgresql].motor_leitura."""
+    motor = motor or st.secrets["postgresql"].get("motor_leitura", _MOTOR_LEITURA_PADRAO)
+    if motor not in _MOTORES_LEITURA:
+        raise ValueError(f"Motor de leitura inválido: {motor!r} (use {', '.join(_MOTORES_LEITURA)})")
+    return motor
+
+def backend_analitico():
+    """
+    Backend das agregações do dashboard, de [dashboard].backend_analitico.
+
+    "duckdb" sem o pacote instalado (extra "analitico") cai para "pandas".
+    """
+    backend = st.secrets.get("dashboard", {}).get("backend_analitico", _BACKEND_ANALITICO_PADRAO)
+    if backend not in analitico.BACKENDS_ANALITICOS:
+        raise ValueError(f"Backend analítico inválido: {backend!r} (use {', '.join(analitico.BACKENDS_ANALITICOS)})")
+    if backend == "duckdb" and not analitico.duckdb_disponivel():
+        logger.warning("backend_analitico = 'duckdb', mas o pacote duckdb não está instalado; usando pandas")
+        return "pandas"
+    return backend
+
+def _ler_sql_arrow(consulta, engine, params=None):
+    """
+    Lê o resultado via `COPY (consulta) TO STDOUT` em CSV, convertido em colunas pelo pyarrow.
+
+    Não materializa tuplas Python por linha: o CSV vai para um buffer e o pyarrow
+    monta as colunas direto. Os tipos vêm do Postgres (uma execução com LIMIT 0),
+    então a conversão não depende de inferência. NULL e texto vazio continuam
+    distintos (no CSV do COPY só o texto vazio vem entre aspas).
+    """
+    if not isinstance(consulta, str):
+        # text() do SQLAlchemy: compila para o formato do driver (%(nome)s)
+        consulta = str(consulta.compile(dialect=engine.dialect))
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        consulta_final = cursor.mogrify(consulta, params or None).decode(raw.driver_connection.encoding)
+
+        cursor.execute(f"SELECT * FROM ({consulta_final}) AS q LIMIT 0")
+        colunas = [(coluna.name, _TIPOS_ARROW.get(coluna.type_code, pa.string())) for coluna in cursor.description]
+
+        buffer = io.BytesIO()
+        cursor.copy_expert(f"COPY ({consulta_final}) TO STDOUT WITH (FORMAT csv, HEADER)", buffer)
+        raw.rollback()  # encerra a transação de leitura antes de devolver ao pool
+    finally:
+        raw.close()
+
+    buffer.seek(0)
+    tabela = pa_csv.read_csv(buffer, convert_options=pa_csv.ConvertOptions(
+        column_types=dict(colunas),
+        strings_can_be_null=True,
+        quoted_strings_can_be_null=False,
+        true_values=["t"],
+        false_values=["f"],
+    ))
+    return tabela.to_pandas(types_mapper=pd.ArrowDtype)
+
+def _ler_sql(consulta, engine, params=None, motor=None, relacao=None, estatisticas=None):
+    """
+    Lê uma consulta em DataFrame (motor pandas ou arrow), registrando duração, linhas e bytes.
+
+    Com `relacao`, o esquema dela (_ESQUEMAS) é aplicado na leitura.
+    """
+    motor = _motor_leitura(motor)
+    esquema = _ESQUEMAS.get(relacao, {})
+    with _medir_consulta(consulta, estatisticas=estatisticas) as medicao:
+        if motor == "arrow":
+            df = _ler_sql_arrow(consulta, engine, params)
+        else:
+            df = pd.read_sql(consulta, engine, params=params, parse_dates=list(esquema.get("datas", ())))
+        df = _aplicar_esquema(df, relacao)
+        medicao["linhas"] = len(df)
+        medicao["bytes"] = int(df.memory_usage(deep=True).sum())
+    return df
+
+def _executar_sql(cursor, consulta, params=None, estatisticas=None):
+    """cursor.execute instrumentado: registra duração, linhas afetadas e bytes enviados."""
+    with _medir_consulta(consulta, cursor, estatisticas) as medicao:
+        cursor.execute(consulta, params)
+        medicao["linhas"] = cursor.rowcount
+        medicao["bytes"] = len(cursor.query or b"")
+    return cursor
+
+def estatisticas_consultas():
+    """
+    Retorna as estatísticas por consulta (fingerprint), da maior para a menor soma de tempo.
+
+    Cada item traz o SQL normalizado, execuções, execuções lentas, tempo total,
+    médio e máximo, percentis móveis p50/p95/p99 (últimas execuções), linhas e bytes.
+    """
+    estado = _estatisticas_consultas()
+    with estado["lock"]:
+        itens = [(fingerprint, dict(e, duracoes=list(e["duracoes"]))) for fingerprint, e in estado["consultas"].items()]
+
+    resultado = []
+    for fingerprint, estatistica in itens:
+        p50, p95, p99 = np.percentile(estatistica.pop("duracoes"), [50, 95, 99])
+        resultado.append({
+            "fingerprint": fingerprint,
+            **estatistica,
+            "total_ms": round(estatistica["total_ms"], 2),
+            "media_ms": round(estatistica["total_ms"] / estatistica["execucoes"], 2),
+            "max_ms": round(estatistica["max_ms"], 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+        })
+    return sorted(resultado, key=lambda e: e["total_ms"], reverse=True)
+
+def exportar_estatisticas_consultas(caminho=None):
+    """
+    Serializa as estatísticas de consultas em JSON para análise offline.
+
+    Se `caminho` for informado, grava o arquivo; sempre retorna o JSON (str).
+    """
+    conteudo = json.dumps({
+        "gerado_em": datetime.datetime.now().isoformat(timespec="seconds"),
+        "consultas": estatisticas_consultas(),
+    }, ensure_ascii=False, indent=2)
+    if caminho:
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            arquivo.write(conteudo)
+    return conteudo
+
+def _aplicar_esquema(df, relacao):
+    """
+    Converte as colunas do DataFrame para os tipos do esquema da relação (_ESQUEMAS).
+
+    Retorna um novo DataFrame (o original não é alterado). Colunas já
+    convertidas são mantidas, então pode ser reaplicado após um concat.
+    As datas saem em _TIPO_DATAS também no motor "arrow" (date32), então
+    telas, snapshot incremental e cache em disco veem o mesmo dtype.
+    """
+    esquema = _ESQUEMAS.get(relacao)
+    if not esquema:
+        return df
+
+    # Aplicado também a DataFrames vazios (relação sem linhas, página ou filtro
+    # vazios): o dtype de cada coluna não pode depender de haver dados.
+    conversoes = {}
+    for coluna in (*esquema.get("flags", ()), *esquema.get("categorias", ())):
+        if coluna in df.columns and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            serie = df[coluna]
+            if isinstance(serie.dtype, pd.ArrowDtype):
+                serie = serie.astype(object)
+            conversoes[coluna] = serie.astype("category")
+    for coluna, tipo in esquema.get("inteiros", {}).items():
+        if coluna in df.columns:
+            if df[coluna].hasnans:
+                tipo = pd.api.types.pandas_dtype(tipo.capitalize())
+            if df[coluna].dtype != tipo:
+                conversoes[coluna] = df[coluna].astype(tipo)
+    for coluna in esquema.get("moeda", ()):
+        if coluna in df.columns and df[coluna].dtype != "float64":
+            serie = df[coluna]
+            if serie.dtype == object:
+                serie = pd.to_numeric(serie, errors="coerce")
+            conversoes[coluna] = serie.astype("float64")
+    for coluna in esquema.get("datas", ()):
+        if coluna in df.columns and df[coluna].dtype != _TIPO_DATAS:
+            serie = df[coluna]
+            if serie.dtype == object:
+                serie = pd.to_datetime(serie)
+            conversoes[coluna] = serie.astype(_TIPO_DATAS)
+    return df.assign(**conversoes) if conversoes else df
+
+def _dtypes_esquema(df, relacao):
+    """Dtype de cada coluna do esquema presente em `df` (categóricas com o dtype das categorias)."""
+    esquema = _ESQUEMAS.get(relacao, {})
+    colunas = [coluna for grupo in esquema.values() for coluna in grupo]
+    return {
+        coluna: (str(df[coluna].dtype), str(df[coluna].cat.categories.dtype))
+        if isinstance(df[coluna].dtype, pd.CategoricalDtype) else (str(df[coluna].dtype),)
+        for coluna in colunas if coluna in df.columns
+    }
+
+def _valor_cursor(valor, coluna, relacao):
+    """Converte o valor de uma chave de paginação para o tipo Python enviado ao banco."""
+    if isinstance(valor, pd.Timestamp):
+        # Colunas DATE voltam como date, para a comparação continuar usando o índice.
+        return valor.date() if coluna in _ESQUEMAS.get(relacao, {}).get("datas", ()) else valor.to_pydatetime()
+    return valor.item() if hasattr(valor, "item") else valor
+
+@st.cache_resource
+def _snapshots_incrementais():
+    """Snapshots das tabelas incrementais, compartilhados entre sessões (com lock)."""
+    return {"lock": threading.Lock(), "tabelas": {}}
+
+def _marcar_alteracoes(tabela, ids):
+    """Registra IDs alterados/excluídos pelo app para o próximo delta-sync da tabela."""
+    if tabela not in _TABELAS_INCREMENTAIS or not ids:
+        return
+    estado = _snapshots_incrementais()
+    with estado["lock"]:
+        snapshot = estado["tabelas"].get(tabela)
+        if snapshot is not None:
+            snapshot["ids_alterados"].update(int(i) for i in ids)
+
+def _carregar_snapshot_completo(tabela, engine, motor, estatisticas=None):
+    """Lê a tabela inteira e monta o snapshot com o high-water mark (maior ID/updated_at)."""
+    coluna_id = _TABELAS_INCREMENTAIS[tabela]
+    sql_query = sql.SQL("SELECT * FROM {} ORDER BY {}").format(
+        sql.Identifier(tabela), sql.Identifier(coluna_id)
+    )
+    return _montar_snapshot(tabela, _ler_sql(text(_renderizar_sql(sql_query, engine)), engine, motor=motor, relacao=tabela, estatisticas=estatisticas))
+
+def _montar_snapshot(tabela, df):
+    """Monta o snapshot incremental de um DataFrame completo da tabela (watermark calculado dele)."""
+    coluna_id = _TABELAS_INCREMENTAIS[tabela]
+    tem_coluna_atualizacao = _COLUNA_ATUALIZACAO in df.columns
+    return {
+        "df": df,
+        "max_id": int(df[coluna_id].max()) if not df.empty else 0,
+        "max_atualizacao": df[_COLUNA_ATUALIZACAO].max() if tem_coluna_atualizacao and not df.empty else None,
+        "tem_coluna_atualizacao": tem_coluna_atualizacao,
+        "ids_alterados": set(),
+        "carregado_em": time.monotonic(),
+    }
+
+def _sincronizar_incremental(tabela, engine, estado, motor, estatisticas=None):
+    """
+    Atualiza o snapshot da tabela buscando apenas o que mudou desde o último sync.
+
+    - Linhas novas: ID acima do high-water mark.
+    - Linhas alteradas: IDs marcados pelos helpers de escrita (e, se a tabela
+      tiver a coluna `updated_at`, as com `updated_at` >= último valor visto).
+    - Exclusões: reconciliadas pela lista de IDs atuais (consulta só da chave).
+
+    Recebe o estado de _snapshots_incrementais(), o motor de leitura e as
+    estatísticas de consultas (também roda fora do contexto do Streamlit, na
+    revalidação do cache em disco).
+    """
+    coluna_id = _TABELAS_INCREMENTAIS[tabela]
+
+    with estado["lock"]:
+        snapshot = estado["tabelas"].get(tabela)
+        expirado = snapshot is not None and time.monotonic() - snapshot["carregado_em"] > _TTL_SNAPSHOT_COMPLETO
+        if snapshot is None or expirado:
+            snapshot = _carregar_snapshot_completo(tabela, engine, motor, estatisticas)
+            estado["tabelas"][tabela] = snapshot
+            return snapshot["df"]
+
+        ids_alterados = set(snapshot["ids_alterados"])
+
+        condicoes = [
+            sql.SQL("{} > :max_id").format(sql.Identifier(coluna_id)),
+            sql.SQL("{} = ANY(:ids_alterados)").format(sql.Identifier(coluna_id)),
+        ]
+        params = {"max_id": snapshot["max_id"], "ids_alterados": sorted(ids_alterados)}
+        if snapshot["tem_coluna_atualizacao"] and snapshot["max_atualizacao"] is not None:
+            # >= e não >: uma linha gravada depois do snapshot com o mesmo updated_at do
+            # watermark (transação concorrente, relógio de baixa resolução) ainda entra.
+            # As linhas do watermark voltam a cada sync e substituem as do snapshot pelo ID.
+            condicoes.append(sql.SQL("{} >= :max_atualizacao").format(sql.Identifier(_COLUNA_ATUALIZACAO)))
+            params["max_atualizacao"] = snapshot["max_atualizacao"]
+
+        sql_delta = sql.SQL("SELECT * FROM {} WHERE {}").format(
+            sql.Identifier(tabela), sql.SQL(" OR ").join(condicoes)
+        )
+        sql_ids = sql.SQL("SELECT {} FROM {}").format(sql.Identifier(coluna_id), sql.Identifier(tabela))
+
+        df_delta = _ler_sql(text(_renderizar_sql(sql_delta, engine)), engine, params=params, motor=motor, relacao=tabela,
+                            estatisticas=estatisticas)
+        ids_atuais = _ler_sql(text(_renderizar_sql(sql_ids, engine)), engine, motor=motor, estatisticas=estatisticas)[coluna_id]
+
+        df = snapshot["df"]
+        manter = df[coluna_id].isin(ids_atuais) & ~df[coluna_id].isin(df_delta[coluna_id])
+        if not df_delta.empty:
+            df = pd.concat([df[manter], df_delta], ignore_index=True)
+            df = _aplicar_esquema(df, tabela).sort_values(coluna_id).reset_index(drop=True)
+            snapshot["max_id"] = max(snapshot["max_id"], int(df_delta[coluna_id].max()))
+            if snapshot["tem_coluna_atualizacao"]:
+                snapshot["max_atualizacao"] = df[_COLUNA_ATUALIZACAO].max()
+        elif not manter.all():
+            df = df[manter].reset_index(drop=True)
+
+        snapshot["df"] = df
+        snapshot["ids_alterados"] -= ids_alterados
+        return df
+
+class _CacheDisco:
+    """
+    Camada opcional de snapshots em Parquet abaixo de consultar_dados, para a partida a frio.
+
+    Cada leitura completa no motor padrão (sem filtros nem limite) é gravada em
+    `<diretorio>/<chave>.parquet`, com um `<chave>.json` de metadados (formato,
+    assinatura do esquema e watermark). Após um restart/redeploy, a primeira
+    leitura de cada chave no processo devolve o arquivo na hora e revalida em
+    segundo plano contra o banco; se o dado mudou, o arquivo é regravado e a
+    versão de cache da relação é incrementada, então a execução seguinte já
+    mostra o dado novo. Falhas de disco só geram aviso no log: o banco continua
+    sendo a fonte da verdade.
+
+    As gravações saem do caminho da requisição (agendar_gravacao): ficam
+    pendentes por _ATRASO_GRAVACAO_DISCO_S e são feitas numa thread, só com a
+    versão mais recente de cada chave. As threads não chamam st.secrets nem
+    os helpers em cache_resource: motor de leitura, versões, snapshots
+    incrementais e estatísticas de consultas são recebidos na criação.
+    """
+
+    def __init__(self, diretorio, versoes, motor, snapshots, estatisticas):
+        self._diretorio = Path(diretorio) if diretorio else None
+        self._versoes = versoes
+        self._motor = motor
+        self._snapshots = snapshots
+        self._estatisticas = estatisticas
+        self._lock = threading.Lock()
+        self._chaves_revalidadas = set()
+        self._lock_pendentes = threading.Lock()
+        self._pendentes = {}
+        self._timer = None
+
+    def cobre(self, relacao, consulta):
+        """Indica se a leitura entra no cache em disco (leitura completa, fora das relações sensíveis)."""
+        if self._diretorio is None or relacao in _RELACOES_FORA_DO_CACHE_DISCO:
+            return False
+        return consulta is None or (consulta[1] is None and consulta[3] is None)
+
+    def _caminhos(self, relacao, consulta):
+        chave = relacao
+        if consulta is not None:
+            chave += "-" + hashlib.md5(repr(consulta).encode()).hexdigest()[:12]
+        return self._diretorio / f"{chave}.parquet", self._diretorio / f"{chave}.json"
+
+    def carregar_frio(self, relacao, consulta, engine):
+        """
+        Na primeira leitura da chave no processo, devolve o snapshot em disco e agenda a revalidação.
+
+        Retorna None se a chave já foi lida do banco neste processo ou se não há
+        snapshot válido (arquivo ausente, de outro formato ou de outro esquema).
+        """
+        with self._lock:
+            if (relacao, consulta) in self._chaves_revalidadas:
+                return None
+            self._chaves_revalidadas.add((relacao, consulta))
+
+        df = self._ler(relacao, consulta)
+        if df is None:
+            return None
+
+        # Tabela incremental com updated_at: o snapshot em disco vira a base do delta-sync,
+        # então a revalidação busca só o que mudou. Sem updated_at, alterações feitas
+        # antes do restart não seriam detectadas, e a revalidação relê a tabela inteira.
+        if consulta is None and relacao in _TABELAS_INCREMENTAIS and _COLUNA_ATUALIZACAO in df.columns:
+            with self._snapshots["lock"]:
+                self._snapshots["tabelas"].setdefault(relacao, _montar_snapshot(relacao, df))
+
+        threading.Thread(target=self._revalidar, args=(relacao, consulta, engine, df), daemon=True).start()
+        return df
+
+    def _ler(self, relacao, consulta):
+        caminho_dados, caminho_metadados = self._caminhos(relacao, consulta)
+        try:
+            metadados = json.loads(caminho_metadados.read_text(encoding="utf-8"))
+            if metadados.get("formato") != _FORMATO_CACHE_DISCO or metadados.get("esquema") != _assinatura_esquema(relacao):
+                return None
+            df = _aplicar_esquema(pd.read_parquet(caminho_dados), relacao)
+            logger.info("'%s' carregada do cache em disco (gravada em %s)", relacao, metadados.get("gravado_em"))
+            return df
+
+        except FileNotFoundError:
+            return None
+
+        except Exception:
+            logger.warning("Snapshot em disco de '%s' ilegível; lendo do banco", relacao, exc_info=True)
+            return None
+
+    def agendar_gravacao(self, relacao, consulta, df):
+        """Marca o DataFrame para gravação em segundo plano (substitui uma gravação pendente da mesma chave)."""
+        with self._lock_pendentes:
+            self._pendentes[(relacao, consulta)] = df
+            if self._timer is None:
+                self._timer = threading.Timer(_ATRASO_GRAVACAO_DISCO_S, self._gravar_pendentes)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _gravar_pendentes(self):
+        with self._lock_pendentes:
+            pendentes, self._pendentes, self._timer = self._pendentes, {}, None
+        for (relacao, consulta), df in pendentes.items():
+            self.salvar(relacao, consulta, df)
+
+    def salvar(self, relacao, consulta, df):
+        """Grava o DataFrame e seus metadados (escrita atômica: arquivo temporário + rename)."""
+        caminho_dados, caminho_metadados = self._caminhos(relacao, consulta)
+        metadados = {
+            "formato": _FORMATO_CACHE_DISCO,
+            "relacao": relacao,
+            "esquema": _assinatura_esquema(relacao),
+            "linhas": len(df),
+            "gravado_em": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        }
+        if consulta is None and relacao in _TABELAS_INCREMENTAIS and not df.empty:
+            snapshot = _montar_snapshot(relacao, df)
+            metadados["max_id"] = snapshot["max_id"]
+            metadados["max_atualizacao"] = snapshot["max_atualizacao"]
+
+        try:
+            with self._lock:
+                self._diretorio.mkdir(parents=True, exist_ok=True)
+                temporario = caminho_dados.with_name(caminho_dados.name + ".tmp")
+                df.to_parquet(temporario, index=False)
+                os.replace(temporario, caminho_dados)
+                temporario = caminho_metadados.with_name(caminho_metadados.name + ".tmp")
+                temporario.write_text(json.dumps(metadados, default=str), encoding="utf-8")
+                os.replace(temporario, caminho_metadados)
+
+        except Exception:
+            logger.warning("Não foi possível gravar o snapshot em disco de '%s'", relacao, exc_info=True)
+
+    def _revalidar(self, relacao, consulta, engine, df_disco):
+        try:
+            df = _ler_do_banco(relacao, consulta, engine, self._motor, self._motor, self._snapshots, self._estatisticas)
+            if _mesmos_dados(df, df_disco):
+                return
+            self.salvar(relacao, consulta, df)
+            _incrementar_versoes(self._versoes, {relacao}, registrar_escrita=False)
+            logger.info("Snapshot em disco de '%s' estava desatualizado; cache renovado", relacao)
+
+        except Exception:
+            logger.exception("Erro ao revalidar o snapshot em disco de '%s'", relacao)
+
+def _mesmos_dados(df_a, df_b):
+    """
+    Indica se os dois DataFrames têm os mesmos dados (valores exatos, mesma ordem).
+
+    Ignora diferenças só de representação, que a ida e volta pelo Parquet ou um
+    delta-sync podem introduzir (ex.: int32 x Int32, ordem das categorias).
+    """
+    try:
+        pd.testing.assert_frame_equal(
+            df_a.reset_index(drop=True), df_b.reset_index(drop=True),
+            check_dtype=False, check_categorical=False, check_exact=True,
+        )
+    except AssertionError:
+        return False
+    return True
+
+@st.cache_resource
+def _cache_disco():
+    """Cache em disco único por processo; inativo se [cache_disco].diretorio não estiver configurado."""
+    return _CacheDisco(
+        st.secrets.get("cache_disco", {}).get("diretorio"), _versoes_cache(), _motor_leitura(),
+        _snapshots_incrementais(), _estatisticas_consultas(),
+    )
+
+def _assinatura_esquema(relacao):
+    """Assinatura do esquema declarado da relação: snapshots gravados com outro esquema são descartados."""
+    esquema = sorted(_ESQUEMAS.get(relacao, {}).items())
+    return hashlib.md5(repr((esquema, _TIPO_DATAS)).encode()).hexdigest()[:12]
+
+@st.cache_resource
+def _versoes_cache():
+    """Versão de cache e instante da última escrita por relação, compartilhados entre sessões."""
+    return {"lock": threading.Lock(), "versoes": {}, "escritas": {}}
+
+def _versao_cache(relacao):
+    """Retorna a versão atual da relação; entra na chave das consultas em cache."""
+    return _versoes_cache()["versoes"].get(relacao, 0)
+
+def _incrementar_versoes(estado, relacoes, registrar_escrita=True):
+    """
+    Incrementa a versão de cache das relações (estado vindo de _versoes_cache).
+
+    Com registrar_escrita=False (dado atualizado por revalidação, sem escrita no
+    banco) as relações não são desviadas para o primário.
+    """
+    agora = time.monotonic()
+    with estado["lock"]:
+        for relacao in relacoes:
+            estado["versoes"][relacao] = estado["versoes"].get(relacao, 0) + 1
+            if registrar_escrita:
+                estado["escritas"][relacao] = agora
+
+def invalidar_cache(tabela):
+    """
+    Invalida as consultas em cache da tabela e das views que dependem dela.
+
+    Cada consulta em cache é chaveada pela versão da relação; incrementar a
+    versão faz a próxima leitura ir ao banco sem afetar as demais tabelas.
+    Escritas nas tabelas base de acerto também agendam o refresh das views
+    materializadas.
+    """
+    tabela = tabela.lower()
+    _incrementar_versoes(_versoes_cache(), {tabela, *_DEPENDENCIAS_CACHE.get(tabela, ())})
+
+    if tabela in _TABELAS_BASE_ACERTO and views_materializadas_disponiveis():
+        _agendador_refresh().agendar()
+
+class _AgendadorRefresh:
+    """
+    Executa REFRESH MATERIALIZED VIEW CONCURRENTLY em segundo plano, com debounce.
+
+    Cada chamada a agendar() reinicia a espera; quando as escritas param por
+    _ATRASO_REFRESH_S segundos, as views de acerto são atualizadas numa thread
+    e o cache delas é invalidado. Engine, versões e estatísticas de consultas
+    são recebidos na criação, pois a thread roda fora do contexto do Streamlit.
+    """
+
+    def __init__(self, engine, versoes, estatisticas):
+        self._engine = engine
+        self._versoes = versoes
+        self._estatisticas = estatisticas
+        self._lock = threading.Lock()
+        self._lock_execucao = threading.Lock()
+        self._timer = None
+
+    def agendar(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(_ATRASO_REFRESH_S, self._executar)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _executar(self):
+        # Um refresh por vez; um novo agendamento durante a execução roda em seguida.
+        with self._lock_execucao:
+            conn = None
+            try:
+                conn = self._engine.raw_connection()
+                cursor = conn.cursor()
+                for view_materializada in _VIEWS_MATERIALIZADAS.values():
+                    _executar_sql(
+                        cursor,
+                        sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {}").format(sql.Identifier(view_materializada)),
+                        estatisticas=self._estatisticas,
+                    )
+                conn.commit()
+                _incrementar_versoes(self._versoes, _VIEWS_MATERIALIZADAS.values())
+
+            except Exception:
+                logger.exception("Erro ao atualizar as views materializadas de acerto")
+                if conn: conn.rollback()
+
+            finally:
+                if conn: conn.close()
+
+@st.cache_resource
+def _agendador_refresh():
+    """Agendador único (por processo) do refresh das views materializadas."""
+    return _AgendadorRefresh(get_engine(), _versoes_cache(), _estatisticas_consultas())
+
+@st.cache_resource
+def _estado_views_materializadas():
+    """Disponibilidade das views materializadas, compartilhada entre sessões."""
+    return {"lock": threading.Lock(), "disponiveis": False, "verificado_em": None}
+
+def views_materializadas_disponiveis():
+    """
+    Indica se as views materializadas de acerto existem (migração 3 aplicada).
+
+    Só o resultado positivo fica guardado. Enquanto elas não existem (ou a
+    verificação falha), o catálogo é reconsultado a cada
+    _INTERVALO_VERIFICACAO_MATERIALIZADAS_S segundos, então uma falha passageira
+    ou uma migração aplicada depois não exigem reiniciar o app.
+    """
+    estado = _estado_views_materializadas()
+    with estado["lock"]:
+        if estado["disponiveis"]:
+            return True
+        agora = time.monotonic()
+        if estado["verificado_em"] is not None and agora - estado["verificado_em"] < _INTERVALO_VERIFICACAO_MATERIALIZADAS_S:
+            return False
+        estado["verificado_em"] = agora
+
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        _executar_sql(cursor, """
+            SELECT count(*) FROM unnest(%s::text[]) AS nome
+            WHERE (SELECT relkind FROM pg_class WHERE oid = to_regclass(nome)) = 'm'
+        """, (list(_VIEWS_MATERIALIZADAS.values()),))
+        disponiveis = cursor.fetchone()[0] == len(_VIEWS_MATERIALIZADAS)
+        if not disponiveis:
+            logger.info("Views materializadas de acerto ausentes (migração 3 não aplicada); usando as views comuns")
+
+    except Exception:
+        logger.exception("Não foi possível verificar as views materializadas de acerto; usando as views comuns")
+        disponiveis = False
+
+    finally:
+        if conn:
+            conn.rollback()
+            conn.close()
+
+    with estado["lock"]:
+        estado["disponiveis"] = estado["disponiveis"] or disponiveis
+    return disponiveis
+
+def consultar_view_acerto(view):
+    """
+    Lê uma view de acerto (vw_acertototal/vw_acertomensal/vw_acertodetalhe).
+
+    Usa a versão materializada, já pré-calculada, quando disponível; caso
+    contrário, consulta a view comum.
+    """
+    view = view.lower()
+    if view in _VIEWS_MATERIALIZADAS and views_materializadas_disponiveis():
+        view_materializada = _VIEWS_MATERIALIZADAS[view]
+        df = consultar_dados(view_materializada, ordenar_por=_ORDEM_MATERIALIZADAS[view_materializada])
+        return df.drop(columns=list(_COLUNAS_CHAVE_MATERIALIZADAS), errors="ignore")
+    return consultar_dados(view)
+
+def _normalizar_consulta(colunas, filtros, ordenar_por, limite):
+    """
+    Converte os parâmetros de projeção/filtro/ordem em uma tupla hashable e canônica.
+
+    Retorna None quando nada foi pedido (leitura completa da relação). Consultas
+    equivalentes (ex.: filtros em outra ordem, nomes em maiúsculas) geram a mesma
+    chave de cache.
+    """
+    if not colunas and not filtros and not ordenar_por and limite is None:
+        return None
+
+    colunas_norm = tuple(c.lower() for c in colunas) if colunas else None
+
+    filtros_norm = []
+    for coluna, operador, valor in filtros or ():
+        operador = operador.lower()
+        if operador not in _OPERADORES_FILTRO:
+            raise ValueError(f"Operador de filtro não suportado: {operador}")
+        if operador == "in":
+            valor = tuple(valor)
+        filtros_norm.append((coluna.lower(), operador, valor))
+    filtros_norm = tuple(sorted(filtros_norm, key=repr)) or None
+
+    ordem_norm = []
+    for item in ordenar_por or ():
+        coluna, direcao = (item, "asc") if isinstance(item, str) else item
+        direcao = direcao.lower()
+        if direcao not in ("asc", "desc"):
+            raise ValueError(f"Direção de ordenação inválida: {direcao}")
+        ordem_norm.append((coluna.lower(), direcao))
+    ordem_norm = tuple(ordem_norm) or None
+
+    if limite is not None:
+        limite = int(limite)
+
+    return (colunas_norm, filtros_norm, ordem_norm, limite)
+
+def _montar_consulta(tabela_ou_view, consulta):
+    """
+    Monta o SELECT (psycopg2.sql) e os parâmetros de uma consulta normalizada.
+
+    Identificadores são citados com sql.Identifier e valores viram placeholders
+    nomeados, então nada do que vem do chamador é interpolado no SQL.
+    """
+    colunas, filtros, ordem, limite = consulta or (None, None, None, None)
+    params = {}
+
+    if colunas:
+        projecao = sql.SQL(", ").join(sql.Identifier(c) for c in colunas)
+    else:
+        projecao = sql.SQL("*")
+    sql_query = sql.SQL("SELECT {} FROM {}").format(projecao, sql.Identifier(tabela_ou_view))
+
+    if filtros:
+        condicoes = []
+        for i, (coluna, operador, valor) in enumerate(filtros):
+            nome = f"f{i}"
+            params[nome] = list(valor) if operador == "in" else valor
+            if operador == "in":
+                modelo = "{} = ANY({})"
+            else:
+                modelo = "{} " + _OPERADORES_FILTRO[operador] + " {}"
+            condicoes.append(sql.SQL(modelo).format(sql.Identifier(coluna), sql.Placeholder(nome)))
+        sql_query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(condicoes)
+
+    if ordem:
+        sql_query += sql.SQL(" ORDER BY ") + sql.SQL(", ").join(
+            sql.SQL("{} " + direcao.upper()).format(sql.Identifier(coluna)) for coluna, direcao in ordem
+        )
+
+    if limite is not None:
+        params["limite"] = limite
+        sql_query += sql.SQL(" LIMIT {}").format(sql.Placeholder("limite"))
+
+    return sql_query, params
+
+def consultar_dados(tabela_ou_view, usar_view=True, colunas=None, filtros=None, ordenar_por=None, limite=None, motor=None):
     """
     Consulta dados de uma tabela ou view e retorna um DataFrame.
 
     Parâmetros:
         tabela_ou_view (str): Nome da tabela ou view a ser consultada.
-        usar_view (bool): Parâmetro adicionado para compatibilidade com 
-                          a chamada de outras funções (não tem efeito 
-                          no corpo desta função atualmente).
+        usar_view (bool): Parâmetro mantido por compatibilidade com as chamadas
+                          existentes. Não tem efeito e não entra na chave de
+                          cache (não gera entradas duplicadas).
+        colunas (list[str]): Colunas a trazer (padrão: todas).
+        filtros (list[tuple]): Condições (coluna, operador, valor) combinadas com
+                          AND. Operadores: =, !=, <, <=, >, >= e 'in' (valor é
+                          uma lista). Intervalos de data usam >= e < juntos.
+        ordenar_por (list): Colunas de ordenação, como 'coluna' ou
+                          ('coluna', 'asc'|'desc').
+        limite (int): Número máximo de linhas.
+        motor (str): "pandas" (pd.read_sql) ou "arrow" (COPY em colunas, com
+                          dtypes Arrow). Padrão: [postgresql].motor_leitura.
+
+    Filtros, projeção e ordenação são executados no banco; cada consulta
+    normalizada tem sua própria entrada de cache.
     """
     tabela_ou_view = tabela_ou_view.lower()
+    consulta = _normalizar_consulta(colunas, filtros, ordenar_por, limite)
+    return _consultar_dados_cache(
+        get_engine_leitura(tabela_ou_view), tabela_ou_view, _versao_cache(tabela_ou_view), consulta, _motor_leitura(motor)
+    )
+
+@st.cache_data(ttl=3600, max_entries=128)
+def _consultar_dados_cache(_engine, tabela_ou_view, versao, consulta=None, motor=_MOTOR_LEITURA_PADRAO):
+    """Leitura em cache de consultar_dados, chaveada por (relação, versão, consulta, motor).
 
+    O engine (primário ou réplica) não entra na chave: ambos retornam o mesmo dado.
+    """
     df = pd.DataFrame()
 
     try:
-        engine = get_engine()
-
-        # Monta a query com o identificador citado de forma segura. O render exige
-        # a conexão psycopg2 real (raw.driver_connection), e não o wrapper do pool.
-        sql_query = sql.SQL("SELECT * FROM {}").format(sql.Identifier(tabela_ou_view))
-        raw = engine.raw_connection()
-        try:
-            query_str = sql_query.as_string(raw.driver_connection)
-        finally:
-            raw.close()
-
-        # Lê passando o engine SQLAlchemy (evita o UserWarning do pandas).
-        df = pd.read_sql(text(query_str), engine)
+        engine = _engine
+
+        # Partida a frio: o snapshot em disco (se configurado) responde na hora e é
+        # revalidado em segundo plano. Só no motor padrão, cujos dtypes o Parquet preserva.
+        cache_disco = _cache_disco()
+        motor_padrao = _motor_leitura()
+        usar_disco = motor == motor_padrao and cache_disco.cobre(tabela_ou_view, consulta)
+        if usar_disco:
+            df_disco = cache_disco.carregar_frio(tabela_ou_view, consulta, engine)
+            if df_disco is not None:
+                return df_disco
+
+        df = _ler_do_banco(tabela_ou_view, consulta, engine, motor, motor_padrao, _snapshots_incrementais())
+        if usar_disco:
+            cache_disco.agendar_gravacao(tabela_ou_view, consulta, df)
 
     except SQLAlchemyError as e:
         logger.exception("Erro de banco ao consultar '%s'", tabela_ou_view)
@@ -83,6 +1227,247 @@ def consultar_dados(tabela_ou_view, usar_view=True):
 
     return df
 
+def _ler_do_banco(tabela_ou_view, consulta, engine, motor, motor_padrao, snapshots, estatisticas=None):
+    """
+    Executa a leitura de consultar_dados no banco (sem cache).
+
+    Não chama st.secrets nem os helpers em cache_resource (roda também nas
+    threads do cache em disco): motor padrão, snapshots incrementais e
+    estatísticas de consultas vêm como parâmetros.
+    """
+    # Tabelas grandes com chave crescente: busca só o delta desde o último snapshot
+    # (mantido no motor padrão; outro motor lê a tabela inteira).
+    if consulta is None and tabela_ou_view in _TABELAS_INCREMENTAIS and motor == motor_padrao:
+        return _sincronizar_incremental(tabela_ou_view, engine, snapshots, motor, estatisticas)
+
+    # Monta a query com identificadores citados e valores como parâmetros.
+    sql_query, params = _montar_consulta(tabela_ou_view, consulta)
+    query_str = _renderizar_sql(sql_query, engine)
+
+    # Lê passando o engine SQLAlchemy (evita o UserWarning do pandas). A string já
+    # está no formato do driver (%(nome)s), então vai direto, sem passar por text().
+    return _ler_sql(query_str, engine, params=params or None, motor=motor, relacao=tabela_ou_view,
+                    estatisticas=estatisticas)
+
+def comparar_motores_leitura(tabela_ou_view="stg_transacoes", repeticoes=5):
+    """
+    Mede a leitura completa da relação em cada motor, sem cache (benchmark).
+
+    Retorna um DataFrame com, por motor: tempo médio e mínimo (ms), linhas e
+    memória do DataFrame resultante (bytes). Levanta RuntimeError se os motores
+    devolverem dtypes diferentes nas colunas do esquema (_ESQUEMAS).
+    """
+    engine = get_engine()
+    relacao = tabela_ou_view.lower()
+    query_str = _renderizar_sql(sql.SQL("SELECT * FROM {}").format(sql.Identifier(relacao)), engine)
+
+    resultados = []
+    dtypes = {}
+    for motor in _MOTORES_LEITURA:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            df = _ler_sql(query_str, engine, motor=motor, relacao=relacao)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        dtypes[motor] = _dtypes_esquema(df, relacao)
+        resultados.append({
+            "motor": motor,
+            "media_ms": round(sum(tempos) / len(tempos), 2),
+            "min_ms": round(min(tempos), 2),
+            "linhas": len(df),
+            "memoria_bytes": int(df.memory_usage(deep=True).sum()),
+        })
+
+    referencia, *outros = _MOTORES_LEITURA
+    for motor in outros:
+        diferentes = {c: (t, dtypes[motor].get(c)) for c, t in dtypes[referencia].items() if dtypes[motor].get(c) != t}
+        if diferentes:
+            raise RuntimeError(f"Motores {referencia}/{motor} com dtypes diferentes em {relacao}: {diferentes}")
+    return pd.DataFrame(resultados)
+
+def consultar_pagina(tabela, colunas, chaves=("dt_datatransacao", "id_transacao"), tamanho=50, descendente=True, apos=None):
+    """
+    Retorna uma página da relação usando paginação por keyset (sem OFFSET).
+
+    A ordem é dada pelas colunas `chaves` (a última deve ser única, ex.: o ID).
+    `apos` é a tupla de valores das chaves da última linha da página anterior
+    (None na primeira página). O custo e o volume por página ficam constantes,
+    independentemente do tamanho do histórico.
+
+    Retorna (df_pagina, cursor_proxima_pagina); o cursor é None na última página.
+    """
+    tabela = tabela.lower()
+    chaves = tuple(c.lower() for c in chaves)
+    colunas = tuple(dict.fromkeys([*(c.lower() for c in colunas), *chaves]))
+    apos = tuple(apos) if apos is not None else None
+    return _consultar_pagina_cache(
+        get_engine_leitura(tabela), tabela, _versao_cache(tabela), colunas, chaves, int(tamanho), bool(descendente), apos
+    )
+
+@st.cache_data(ttl=3600, max_entries=64)
+def _consultar_pagina_cache(_engine, tabela, versao, colunas, chaves, tamanho, descendente, apos):
+    direcao = sql.SQL("DESC" if descendente else "ASC")
+    sql_query = sql.SQL("SELECT {} FROM {}").format(
+        sql.SQL(", ").join(sql.Identifier(c) for c in colunas), sql.Identifier(tabela)
+    )
+    params = {"limite": tamanho + 1}  # uma linha a mais indica se há próxima página
+
+    if apos is not None:
+        # Comparação de linha (a, b) < (x, y): usa o índice composto das chaves
+        comparacao = sql.SQL("<" if descendente else ">")
+        marcadores = []
+        for i, valor in enumerate(apos):
+            params[f"k{i}"] = valor
+            marcadores.append(sql.Placeholder(f"k{i}"))
+        sql_query += sql.SQL(" WHERE ({}) {} ({})").format(
+            sql.SQL(", ").join(sql.Identifier(c) for c in chaves), comparacao, sql.SQL(", ").join(marcadores)
+        )
+
+    sql_query += sql.SQL(" ORDER BY {} LIMIT {}").format(
+        sql.SQL(", ").join(sql.SQL("{} {}").format(sql.Identifier(c), direcao) for c in chaves),
+        sql.Placeholder("limite"),
+    )
+
+    try:
+        df = _ler_sql(_renderizar_sql(sql_query, _engine), _engine, params=params, relacao=tabela)
+
+    except SQLAlchemyError as e:
+        logger.exception("Erro de banco ao paginar '%s'", tabela)
+        st.error(f"Erro ao consultar o banco de dados para a tabela '{tabela}'. Detalhes: {e}")
+        return pd.DataFrame(), None
+
+    except Exception as e:
+        logger.exception("Erro inesperado ao paginar '%s'", tabela)
+        st.error(f"Erro inesperado ao consultar a tabela '{tabela}'. Detalhes: {e}")
+        return pd.DataFrame(), None
+
+    if len(df) <= tamanho:
+        return df, None
+
+    df = df.iloc[:tamanho]
+    ultima = df.iloc[-1]
+    return df, tuple(_valor_cursor(ultima[c], c, tabela) for c in chaves)
+
+def _consultar_sql(sql_query, descricao, params=None, engine=None):
+    """Executa uma consulta SQL (text) no engine e retorna um DataFrame (vazio em caso de erro)."""
+    try:
+        return _ler_sql(sql_query, engine or get_engine(), params=params)
+
+    except SQLAlchemyError as e:
+        logger.exception("Erro de banco ao consultar %s", descricao)
+        st.error(f"Erro ao consultar o banco de dados ({descricao}). Detalhes: {e}")
+
+    except Exception as e:
+        logger.exception("Erro inesperado ao consultar %s", descricao)
+        st.error(f"Erro inesperado ao consultar {descricao}. Detalhes: {e}")
+
+    return pd.DataFrame()
+
+def consultar_agregado_mensal():
+    """
+    Retorna as somas de stg_transacoes agregadas por mês no próprio Postgres.
+
+    Uma linha por mês × tipo × categoria × subcategoria, com as colunas
+    ano_mes ('YYYY-MM'), mes (chave inteira ano * 12 + mês - 1, ver
+    analitico.chave_mes), dsc_tipotransacao, dsc_categoriatransacao,
+    dsc_subcategoriatransacao, vl_transacao (soma) e qt_transacoes, ordenado
+    pelas chaves. É calculado uma vez por versão dos dados e o dashboard
+    (KPIs, projeção e todos os gráficos) só recorta esse quadro pequeno, por
+    intervalos de `mes`, em vez de trazer a tabela inteira.
+
+    Com backend_analitico() "duckdb" ou "pandas" o mesmo quadro é calculado
+    localmente a partir do snapshot de stg_transacoes (consultar_dados).
+    """
+    backend = backend_analitico()
+    if backend != "postgres":
+        return _agregado_mensal_local_cache(_versao_cache("stg_transacoes"), backend)
+    return _consultar_agregado_mensal_cache(get_engine_leitura("stg_transacoes"), _versao_cache("stg_transacoes"))
+
+@st.cache_data(ttl=3600, max_entries=4)
+def _agregado_mensal_local_cache(versao, backend):
+    return analitico.cubo_mensal(consultar_dados("stg_transacoes"), backend)
+
+@st.cache_data(ttl=3600, max_entries=4)
+def _consultar_agregado_mensal_cache(_engine, versao):
+    sql_query = text("""
+        SELECT
+            to_char(date_trunc('month', dt_datatransacao), 'YYYY-MM') AS ano_mes,
+            dsc_tipotransacao,
+            dsc_categoriatransacao,
+            dsc_subcategoriatransacao,
+            SUM(vl_transacao)::double precision AS vl_transacao,
+            COUNT(*) AS qt_transacoes
+        FROM stg_transacoes
+        GROUP BY 1, 2, 3, 4
+        -- Ordem byte a byte nas chaves de texto: igual à dos backends locais (analitico.py)
+        ORDER BY 1, dsc_tipotransacao COLLATE "C", dsc_categoriatransacao COLLATE "C",
+                 dsc_subcategoriatransacao COLLATE "C"
+    """)
+    return _com_chave_mes(_consultar_sql(sql_query, "o agregado mensal de transações", engine=_engine))
+
+def consultar_salario_mensal():
+    """Retorna a soma mensal de fact_salario (colunas ano_mes 'YYYY-MM', mes e vl_salario)."""
+    backend = backend_analitico()
+    if backend != "postgres":
+        return _salario_mensal_local_cache(_versao_cache("fact_salario"), backend)
+    return _consultar_salario_mensal_cache(get_engine_leitura("fact_salario"), _versao_cache("fact_salario"))
+
+@st.cache_data(ttl=3600, max_entries=4)
+def _salario_mensal_local_cache(versao, backend):
+    return analitico.salario_mensal(consultar_dados("fact_salario"), backend)
+
+@st.cache_data(ttl=3600, max_entries=4)
+def _consultar_salario_mensal_cache(_engine, versao):
+    sql_query = text("""
+        SELECT
+            to_char(date_trunc('month', dt_recebimento), 'YYYY-MM') AS ano_mes,
+            SUM(vl_salario)::double precision AS vl_salario
+        FROM fact_salario
+        GROUP BY 1
+        ORDER BY 1
+    """)
+    return _com_chave_mes(_consultar_sql(sql_query, "o agregado mensal de salários", engine=_engine))
+
+def _com_chave_mes(df):
+    # Em caso de erro _consultar_sql devolve um DataFrame sem colunas
+    return analitico.com_chave_mes(df) if "ano_mes" in df.columns else df
+
+def _como_funcao(consulta):
+    """Converte um item de consultar_varios em uma função sem argumentos."""
+    if callable(consulta):
+        return consulta
+    if isinstance(consulta, str):
+        return lambda: consultar_dados(consulta)
+    tabela_ou_view, kwargs = consulta
+    return lambda: consultar_dados(tabela_ou_view, **kwargs)
+
+def consultar_varios(consultas):
+    """
+    Executa várias leituras em paralelo e retorna os resultados na mesma ordem.
+
+    Cada item pode ser:
+        - o nome de uma tabela/view (ex.: "dim_usuario");
+        - uma tupla (tabela_ou_view, kwargs) com os argumentos de consultar_dados
+          (colunas, filtros, ordenar_por, limite);
+        - uma função sem argumentos (ex.: consultar_agregado_mensal).
+
+    Cada leitura passa pelo cache normal, então o que já está em memória volta
+    na hora; com o cache frio, a espera é a da consulta mais lenta, e não a soma
+    de todas. O número de threads é limitado ao tamanho do pool de conexões.
+    """
+    funcoes = [_como_funcao(c) for c in consultas]
+    if len(funcoes) <= 1:
+        return [f() for f in funcoes]
+
+    # As threads herdam o contexto da execução atual (para st.error/cache funcionarem nelas).
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(
+        max_workers=min(len(funcoes), get_engine().pool.size()),
+        thread_name_prefix="consultar_varios",
+        initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx),
+    ) as executor:
+        return list(executor.map(lambda f: f(), funcoes))
+
 def inserir_dados(tabela, dados, campos):
     conn = None
     tabela_lower = tabela.lower()
@@ -100,14 +1485,14 @@ def inserir_dados(tabela, dados, campos):
 
         # 1. EXECUÇÃO: Passa o SQL e os dados (a tupla de valores)
         # Exemplo: cursor.execute("...", ('Receita',))
-        cursor.execute(sql, dados) 
+        _executar_sql(cursor, sql, dados)
 
         # 2. COMMIT: ESSENCIAL para salvar os dados
         conn.commit() 
 
         # Feedback de Sucesso no Streamlit (Opcional, mas recomendado)
         st.success(f"Registro inserido com sucesso na tabela {tabela_lower.upper()}!")
-        consultar_dados.clear()
+        invalidar_cache(tabela_lower)
         return True
 
     except psycopg2.Error as ex:
@@ -123,7 +1508,7 @@ def inserir_dados(tabela, dados, campos):
     finally:
         if conn: conn.close()
 
-def buscar_transacao_por_id(id_transacao):
+def buscar_transacao_por_id(id_transacao, motor=None):
     df_transacao = pd.DataFrame()
 
     # Tabela stg_transacoes — parâmetro nomeado (:id_transacao) para o engine.
@@ -133,10 +1518,12 @@ def buscar_transacao_por_id(id_transacao):
     """)
 
     try:
-        df_transacao = pd.read_sql(
+        df_transacao = _ler_sql(
             sql_query,
-            get_engine(),
+            get_engine_leitura("stg_transacoes"),
             params={"id_transacao": id_transacao},
+            motor=motor,
+            relacao="stg_transacoes",
         )
 
     except SQLAlchemyError as e:
@@ -218,9 +1605,10 @@ def atualizar_transacao_por_id(
         cursor = conn.cursor()
 
         # Execução: Passa o SQL e a tupla de valores
-        cursor.execute(sql_update, valores)
+        _executar_sql(cursor, sql_update, valores)
         conn.commit()
-        consultar_dados.clear()
+        _marcar_alteracoes(tabela, [id_transacao])
+        invalidar_cache(tabela)
         return True
 
     except psycopg2.Error as ex:
@@ -238,6 +1626,72 @@ def atualizar_transacao_por_id(
     finally:
         if conn: conn.close()
 
+# Colunas de stg_transacoes alteráveis na edição em lote (grade); os IDs de
+# tipo/categoria/subcategoria são resolvidos a partir dos nomes.
+_CAMPOS_EDICAO_LOTE = (
+    "dt_datatransacao", "id_tipotransacao", "dsc_tipotransacao", "id_categoria", "dsc_categoriatransacao",
+    "id_subcategoria", "dsc_subcategoriatransacao", "dsc_transacao", "vl_transacao",
+    "cd_quempagou", "cd_edividido", "cd_foidividido",
+)
+
+def atualizar_transacoes_em_lote(df):
+    """
+    Aplica várias correções de transações com um único UPDATE ... FROM (VALUES ...).
+
+    `df` traz `id_transacao` e as colunas editáveis com os nomes (dsc_*) de
+    tipo/categoria/subcategoria; os IDs são resolvidos como na importação
+    (resolver_dimensoes_transacoes). Todas as linhas são validadas antes e vão
+    num só comando e num só commit: se alguma for rejeitada, nada é gravado.
+
+    Retorna (quantidade_atualizada, df_rejeitadas) ou (None, df_rejeitadas) em caso de erro.
+    """
+    resolvidas, rejeitadas = resolver_dimensoes_transacoes(df)
+    if resolvidas.empty or not rejeitadas.empty:
+        return 0, rejeitadas
+
+    colunas = ("id_transacao", *_CAMPOS_EDICAO_LOTE)
+    resolvidas = resolvidas[list(colunas)].assign(
+        dt_datatransacao=pd.to_datetime(resolvidas["dt_datatransacao"]).dt.date
+    )
+    linhas = list(resolvidas.astype(object).where(resolvidas.notna(), None).itertuples(index=False, name=None))
+    # Tipos numpy (int64/float64) viram tipos Python para o psycopg2
+    linhas = [tuple(v.item() if hasattr(v, "item") else v for v in linha) for linha in linhas]
+
+    sql_update = sql.SQL("UPDATE stg_transacoes AS t SET {} FROM (VALUES %s) AS v ({}) WHERE t.id_transacao = v.id_transacao").format(
+        sql.SQL(", ").join(sql.SQL("{} = v.{}").format(sql.Identifier(c), sql.Identifier(c)) for c in _CAMPOS_EDICAO_LOTE),
+        sql.SQL(", ").join(sql.Identifier(c) for c in colunas),
+    )
+
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        # page_size cobre todas as linhas: um único comando, não um por página.
+        with _medir_consulta(sql_update, conn.driver_connection) as medicao:
+            execute_values(cursor, sql_update.as_string(conn.driver_connection), linhas, page_size=len(linhas))
+            medicao["linhas"] = cursor.rowcount
+        quantidade = cursor.rowcount
+        conn.commit()
+        _marcar_alteracoes("stg_transacoes", resolvidas["id_transacao"].tolist())
+        invalidar_cache("stg_transacoes")
+        return quantidade, rejeitadas
+
+    except psycopg2.Error as ex:
+        logger.exception("Erro de banco ao atualizar transações em lote")
+        st.error(f"Erro do banco de dados ao atualizar transações em lote: {ex}")
+        if conn: conn.rollback()
+        return None, rejeitadas
+
+    except Exception as e:
+        logger.exception("Erro inesperado ao atualizar transações em lote")
+        st.error(f"Erro inesperado ao atualizar transações em lote: {e}")
+        if conn: conn.rollback()
+        return None, rejeitadas
+
+    finally:
+        if conn: conn.close()
+
 def atualizar_status_acerto(lista_ids):
     conn = None
     # Verifica se há IDs para evitar erro SQL e trabalho desnecessário
@@ -256,9 +1710,10 @@ def atualizar_status_acerto(lista_ids):
         cursor = conn.cursor()
 
         # O argumento é uma tupla contendo a lista (array) de IDs
-        cursor.execute(sql_update, (lista_ids,))
+        _executar_sql(cursor, sql_update, (lista_ids,))
         conn.commit()
-        consultar_dados.clear()
+        _marcar_alteracoes("stg_transacoes", lista_ids)
+        invalidar_cache("stg_transacoes")
         return True
 
     except psycopg2.Error as ex:
@@ -294,9 +1749,11 @@ def deletar_registro_dimensao(tabela, id_coluna, id_registro):
         cursor = conn.cursor()
 
         # 3. Execução: Passa o ID como uma tupla
-        cursor.execute(sql_delete, (id_registro,))
+        _executar_sql(cursor, sql_delete, (id_registro,))
         conn.commit()
-        consultar_dados.clear()
+        if _TABELAS_INCREMENTAIS.get(tabela_lower) == id_coluna:
+            _marcar_alteracoes(tabela_lower, [id_registro])
+        invalidar_cache(tabela_lower)
         return True
 
     except psycopg2.Error as ex:
@@ -324,9 +1781,10 @@ def deletar_transacoes(lista_ids):
     try:
         conn = get_connection()
         cursor = conn.cursor()
-        cursor.execute(sql_delete, (lista_ids,))
+        _executar_sql(cursor, sql_delete, (lista_ids,))
         conn.commit()
-        consultar_dados.clear()
+        _marcar_alteracoes("stg_transacoes", lista_ids)
+        invalidar_cache("stg_transacoes")
         return True
 
     except psycopg2.Error as ex:
@@ -374,9 +1832,11 @@ def atualizar_registro_dimensao(tabela, id_coluna, id_registro, campos_valores):
 
         # Execução: Passa o SQL e a tupla de valores
         # O psycopg2 faz o bind dos %s com os valores na ordem
-        cursor.execute(sql_update, valores_com_id)
+        _executar_sql(cursor, sql_update, valores_com_id)
         conn.commit()
-        consultar_dados.clear()
+        if _TABELAS_INCREMENTAIS.get(tabela_lower) == id_coluna:
+            _marcar_alteracoes(tabela_lower, [id_registro])
+        invalidar_cache(tabela_lower)
         return True
 
     except psycopg2.Error as ex:
@@ -393,3 +1853,168 @@ def atualizar_registro_dimensao(tabela, id_coluna, id_registro, campos_valores):
 
     finally:
         if conn: conn.close()
+
+# Colunas gravadas pela importação em lote (mesma ordem do formulário de transação).
+_CAMPOS_TRANSACAO = (
+    "dt_datatransacao", "id_tipotransacao", "dsc_tipotransacao", "id_categoria", "dsc_categoriatransacao",
+    "id_subcategoria", "dsc_subcategoriatransacao", "id_usuario", "dsc_nomeusuario",
+    "dsc_transacao", "vl_transacao", "cd_quempagou", "cd_edividido", "cd_foidividido",
+)
+
+# No CSV do COPY um campo vazio sem aspas é NULL; a descrição vazia ('') tem que
+# chegar como '' (igual ao execute_values), então é lida com FORCE_NOT_NULL.
+_OPCOES_COPY_TRANSACOES = "FORMAT csv, FORCE_NOT_NULL (dsc_transacao)"
+
+def _lote_transacoes(resolvidas):
+    """Colunas de _CAMPOS_TRANSACAO, com a descrição ausente gravada como '' pelos dois caminhos."""
+    return resolvidas[list(_CAMPOS_TRANSACAO)].assign(dsc_transacao=resolvidas["dsc_transacao"].fillna(""))
+
+def _csv_copy(lote):
+    """Conteúdo CSV do COPY FROM STDIN (sem cabeçalho, datas ISO)."""
+    return lote.to_csv(index=False, header=False, date_format="%Y-%m-%d").encode("utf-8")
+
+def _linhas_insert(lote):
+    """Tuplas do execute_values (alternativa ao COPY), com NaN/NA como None."""
+    return list(lote.astype(object).where(lote.notna(), None).itertuples(index=False, name=None))
+
+class _LeitorComProgresso(io.BytesIO):
+    """BytesIO que informa a fração já lida (usado para acompanhar o envio do COPY)."""
+
+    def __init__(self, conteudo, ao_ler):
+        super().__init__(conteudo)
+        self._total = max(len(conteudo), 1)
+        self._ao_ler = ao_ler
+
+    def read(self, size=-1):
+        bloco = super().read(size)
+        self._ao_ler(self.tell() / self._total)
+        return bloco
+
+    def readline(self, size=-1):
+        linha = super().readline(size)
+        self._ao_ler(self.tell() / self._total)
+        return linha
+
+def _chave_nome(serie):
+    """Chave de comparação de nomes de dimensão (sem espaços extras e sem caixa)."""
+    return serie.astype("string").str.strip().str.casefold()
+
+def resolver_dimensoes_transacoes(df):
+    """
+    Resolve os pares id_*/dsc_* das transações a partir dos nomes informados.
+
+    Faz três joins vetorizados (tipo -> categoria do tipo -> subcategoria da
+    categoria) sobre as dimensões em cache, usando os nomes canônicos do banco.
+    Retorna (df_resolvidas, df_rejeitadas); as rejeitadas têm a coluna `motivo`.
+    """
+    df_tipos = consultar_dados("dim_tipotransacao")
+    df_categorias = consultar_dados("dim_categoria")
+    df_subcategorias = consultar_dados("dim_subcategoria")
+
+    df = df.reset_index(drop=True)
+    nomes_informados = df[["dsc_tipotransacao", "dsc_categoriatransacao", "dsc_subcategoriatransacao"]]
+    df["_tipo"] = _chave_nome(df["dsc_tipotransacao"])
+    df["_cat"] = _chave_nome(df["dsc_categoriatransacao"])
+    df["_sub"] = _chave_nome(df["dsc_subcategoriatransacao"])
+    df = df.drop(columns=["dsc_tipotransacao", "dsc_categoriatransacao", "dsc_subcategoriatransacao"])
+
+    # drop_duplicates garante no máximo um par por chave (o join não multiplica linhas)
+    tipos = df_tipos[["id_tipotransacao", "dsc_tipotransacao"]].assign(
+        _tipo=_chave_nome(df_tipos["dsc_tipotransacao"])
+    ).drop_duplicates("_tipo")
+    categorias = df_categorias[["id_categoria", "id_tipotransacao", "dsc_categoriatransacao"]].assign(
+        _cat=_chave_nome(df_categorias["dsc_categoriatransacao"])
+    ).drop_duplicates(["id_tipotransacao", "_cat"])
+    subcategorias = df_subcategorias[["id_subcategoria", "id_categoria", "dsc_subcategoriatransacao"]].assign(
+        _sub=_chave_nome(df_subcategorias["dsc_subcategoriatransacao"])
+    ).drop_duplicates(["id_categoria", "_sub"])
+
+    df = df.merge(tipos, on="_tipo", how="left")
+    df = df.merge(categorias, on=["id_tipotransacao", "_cat"], how="left")
+    df = df.merge(subcategorias, on=["id_categoria", "_sub"], how="left")
+
+    motivo = pd.Series(pd.NA, index=df.index, dtype="string")
+    motivo = motivo.mask(df["id_subcategoria"].isna(), "Subcategoria não encontrada na categoria")
+    motivo = motivo.mask(df["id_categoria"].isna(), "Categoria não encontrada no tipo")
+    motivo = motivo.mask(df["id_tipotransacao"].isna(), "Tipo de transação não encontrado")
+    motivo = motivo.mask(df["vl_transacao"].isna() | (df["vl_transacao"] <= 0), "Valor inválido")
+    motivo = motivo.mask(df["dt_datatransacao"].isna(), "Data inválida")
+
+    df = df.drop(columns=["_tipo", "_cat", "_sub"])
+    # As rejeitadas voltam com os nomes como foram informados, para correção.
+    rejeitadas = df[motivo.notna()].assign(motivo=motivo[motivo.notna()])
+    rejeitadas[nomes_informados.columns] = nomes_informados[motivo.notna()]
+    resolvidas = df[motivo.isna()].copy()
+    for coluna in ("id_tipotransacao", "id_categoria", "id_subcategoria"):
+        resolvidas[coluna] = resolvidas[coluna].astype("int64")
+    return resolvidas, rejeitadas
+
+def importar_transacoes_em_lote(df, ao_progredir=None):
+    """
+    Grava um lote de transações em stg_transacoes com COPY FROM STDIN e um único commit.
+
+    `df` deve trazer as colunas de _CAMPOS_TRANSACAO com os nomes (dsc_*) já
+    preenchidos; os IDs de tipo/categoria/subcategoria são resolvidos aqui, de
+    forma vetorizada. Se o servidor não aceitar COPY, usa execute_values como
+    alternativa. `ao_progredir(fracao, mensagem)` recebe o andamento.
+
+    Retorna (quantidade_inserida, df_rejeitadas) ou (None, df_rejeitadas) em caso de erro.
+    """
+    def progresso(fracao, mensagem):
+        if ao_progredir:
+            ao_progredir(min(fracao, 1.0), mensagem)
+
+    progresso(0.0, "Resolvendo tipos, categorias e subcategorias...")
+    resolvidas, rejeitadas = resolver_dimensoes_transacoes(df)
+    if resolvidas.empty:
+        progresso(1.0, "Nenhuma transação válida para importar.")
+        return 0, rejeitadas
+
+    resolvidas = _lote_transacoes(resolvidas)
+    progresso(0.1, f"Enviando {len(resolvidas)} transações...")
+
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        colunas = sql.SQL(", ").join(sql.Identifier(c) for c in _CAMPOS_TRANSACAO)
+
+        try:
+            conteudo = _csv_copy(resolvidas)
+            leitor = _LeitorComProgresso(conteudo, lambda f: progresso(0.1 + 0.8 * f, "Enviando transações (COPY)..."))
+            sql_copy = sql.SQL("COPY stg_transacoes ({}) FROM STDIN WITH ({})").format(
+                colunas, sql.SQL(_OPCOES_COPY_TRANSACOES)
+            )
+            with _medir_consulta(sql_copy, conn.driver_connection) as medicao:
+                cursor.copy_expert(sql_copy.as_string(conn.driver_connection), leitor)
+                medicao["linhas"], medicao["bytes"] = cursor.rowcount, len(conteudo)
+
+        except (errors.FeatureNotSupported, errors.InsufficientPrivilege):
+            logger.warning("COPY indisponível; importando com execute_values")
+            conn.rollback()
+            sql_insert = sql.SQL("INSERT INTO stg_transacoes ({}) VALUES %s").format(colunas)
+            linhas = _linhas_insert(resolvidas)
+            with _medir_consulta(sql_insert, conn.driver_connection) as medicao:
+                execute_values(cursor, sql_insert.as_string(conn.driver_connection), linhas, page_size=500)
+                medicao["linhas"] = len(linhas)
+
+        progresso(0.95, "Confirmando...")
+        conn.commit()
+        invalidar_cache("stg_transacoes")
+        progresso(1.0, f"{len(resolvidas)} transações importadas.")
+        return len(resolvidas), rejeitadas
+
+    except psycopg2.Error as ex:
+        logger.exception("Erro de banco ao importar transações em lote")
+        st.error(f"Erro do banco de dados ao importar transações: {ex}")
+        if conn: conn.rollback()
+        return None, rejeitadas
+
+    except Exception as e:
+        logger.exception("Erro inesperado ao importar transações em lote")
+        st.error(f"Erro inesperado ao importar transações: {e}")
+        if conn: conn.rollback()
+        return None, rejeitadas
+
+    finally:
+        if conn: conn.close()
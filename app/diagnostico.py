@@ -0,0 +1,55 @@
+"""Painel de diagnóstico (pool de conexões e consultas), visível só para administradores."""
+import pandas as pd
+import streamlit as st
+from db import diagnostico_pool, estatisticas_consultas, exportar_estatisticas_consultas
+
+_NOMES_POOL = {"primario": "Primário", "replica": "Réplica"}
+
+def usuario_eh_administrador():
+    """Indica se o usuário logado está em [diagnostico].administradores no secrets.toml."""
+    administradores = st.secrets.get("diagnostico", {}).get("administradores", [])
+    return st.session_state.get("login") in administradores
+
+def painel_diagnostico():
+    """Exibe na sidebar as métricas de cada pool e das consultas (somente para administradores)."""
+    if not usuario_eh_administrador():
+        return
+
+    with st.expander("🩺 Diagnóstico do Pool", expanded=False):
+        for nome, metricas in diagnostico_pool().items():
+            st.markdown(f"**{_NOMES_POOL.get(nome, nome)}** — pool_size={metricas['config']['pool_size']}, "
+                        f"max_overflow={metricas['config']['max_overflow']}")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Em uso", metricas["em_uso"], help=f"Pico: {metricas['pico_em_uso']}")
+            col2.metric("Overflow", metricas["overflow"])
+            col3.metric("Invalidações", metricas["invalidacoes"], help=metricas["ultima_invalidacao"])
+
+            espera = metricas["espera_checkout"]
+            conexao = metricas["tempo_conexao"]
+            st.caption(
+                f"Checkout: {espera['total']} (média {espera['media_ms']} ms, máx. {espera['max_ms']} ms) · "
+                f"Conexões abertas: {metricas['conexoes_abertas']} (média {conexao['media_ms']} ms)"
+            )
+            df_faixas = pd.DataFrame({
+                "Espera no checkout": espera["faixas"],
+                "Abertura de conexão": conexao["faixas"],
+            })
+            st.dataframe(df_faixas, use_container_width=True)
+
+    with st.expander("🐢 Consultas", expanded=False):
+        consultas = estatisticas_consultas()
+        if not consultas:
+            st.caption("Nenhuma consulta registrada ainda.")
+            return
+
+        df_consultas = pd.DataFrame(consultas)[
+            ["sql", "execucoes", "lentas", "p50_ms", "p95_ms", "p99_ms", "max_ms", "total_ms", "linhas", "bytes"]
+        ]
+        st.dataframe(df_consultas.head(20), hide_index=True, use_container_width=True)
+        st.download_button(
+            "⬇️ Exportar estatísticas (JSON)",
+            data=exportar_estatisticas_consultas(),
+            file_name="estatisticas_consultas.json",
+            mime="application/json",
+            key="btn_exportar_consultas",
+        )
@@ -4,7 +4,7 @@ import datetime
 import pandas as pd
 import streamlit as st
 from helpers import cor_saldo, formatar_moeda, logger
-from db import atualizar_registro_dimensao, atualizar_status_acerto, atualizar_transacao_por_id, buscar_transacao_por_id, consultar_dados, deletar_registro_dimensao, deletar_transacoes, inserir_dados
+from db import atualizar_registro_dimensao, atualizar_status_acerto, atualizar_transacao_por_id, atualizar_transacoes_em_lote, buscar_transacao_por_id, consultar_dados, consultar_pagina, consultar_varios, consultar_view_acerto, deletar_registro_dimensao, deletar_transacoes, inserir_dados
 
 def _bloco_confirmacao_exclusao(chave_id, chave_nome, mensagem_aviso, fn_deletar):
     id_del = st.session_state.get(chave_id)
@@ -25,6 +25,71 @@ def _bloco_confirmacao_exclusao(chave_id, chave_nome, mensagem_aviso, fn_deletar
             st.session_state[chave_id] = None
             st.rerun()
 
+def _reiniciar_paginacao(chave):
+    """Volta o navegador de transações para a primeira página (mudança de ordem/tamanho)."""
+    st.session_state[f"{chave}_cursores"] = [None]
+
+def navegador_transacoes(chave, colunas, column_config=None, selecao=False):
+    """
+    Exibe stg_transacoes paginado por keyset em (dt_datatransacao, id_transacao).
+
+    A ordenação e o corte da página são feitos no banco, então o custo de cada
+    rerun não cresce com o histórico. Com `selecao=True` a tabela permite
+    seleção de várias linhas. Retorna (df_pagina, evento_selecao).
+    """
+    chave_cursores = f"{chave}_cursores"
+    if chave_cursores not in st.session_state:
+        st.session_state[chave_cursores] = [None]
+
+    col_ordem, col_tamanho = st.columns([3, 1])
+    with col_ordem:
+        ordem = st.radio(
+            "Ordenação:",
+            ("Mais recentes primeiro", "Mais antigas primeiro"),
+            horizontal=True,
+            key=f"{chave}_ordem",
+            on_change=_reiniciar_paginacao,
+            args=(chave,),
+        )
+    with col_tamanho:
+        tamanho = st.selectbox(
+            "Linhas por página:",
+            (25, 50, 100, 200),
+            index=1,
+            key=f"{chave}_tamanho",
+            on_change=_reiniciar_paginacao,
+            args=(chave,),
+        )
+
+    cursores = st.session_state[chave_cursores]
+    df_pagina, proximo = consultar_pagina(
+        "stg_transacoes",
+        colunas,
+        tamanho=tamanho,
+        descendente=(ordem == "Mais recentes primeiro"),
+        apos=cursores[-1],
+    )
+
+    parametros = {"column_config": column_config, "hide_index": True, "use_container_width": True}
+    if selecao:
+        # A chave inclui a página para a seleção não "vazar" para outra página
+        parametros.update(selection_mode="multi-row", on_select="rerun", key=f"{chave}_tabela_{len(cursores)}")
+    evento = st.dataframe(df_pagina[colunas] if not df_pagina.empty else df_pagina, **parametros)
+
+    col_ant, col_pag, col_prox = st.columns([1, 2, 1])
+    with col_ant:
+        if st.button("◀ Anterior", key=f"{chave}_anterior", disabled=len(cursores) == 1, use_container_width=True):
+            cursores.pop()
+            st.rerun()
+    with col_pag:
+        st.caption(f"Página {len(cursores)}")
+    with col_prox:
+        if st.button("Próxima ▶", key=f"{chave}_proxima", disabled=proximo is None, use_container_width=True):
+            cursores.append(proximo)
+            st.rerun()
+
+    return df_pagina, evento
+
 def reset_categoria():
     """Reseta a Categoria e Subcategoria ao mudar o Tipo de Transação."""
     # Define a chave de Categoria para o primeiro valor (index=0)
@@ -544,7 +609,12 @@ def formulario_salario():
         df_exibicao['Valor do Salário'] = df_exibicao['Valor do Salário'].apply(formatar_moeda) 
 
         # 6. Exibe o DataFrame com os nomes de colunas corretos
-        st.dataframe(df_exibicao[colunas_finais], hide_index=True, use_container_width=True)
+        st.dataframe(
+            df_exibicao[colunas_finais],
+            column_config={"dt_recebimento": st.column_config.DateColumn("dt_recebimento", format="YYYY-MM-DD")},
+            hide_index=True,
+            use_container_width=True,
+        )
 
     else:
         st.info("Nenhum salário registrado.")
@@ -553,10 +623,9 @@ def formulario_transacao():
     st.header("Registro de Transação")
 
     # 1. CARREGAR DADOS DAS DIMENSÕES
-    df_tipos = consultar_dados("dim_tipotransacao")
-    df_categorias = consultar_dados("dim_categoria")
-    df_subcategorias = consultar_dados("dim_subcategoria")
-    df_usuarios = consultar_dados("dim_usuario") 
+    df_tipos, df_categorias, df_subcategorias, df_usuarios = consultar_varios(
+        ["dim_tipotransacao", "dim_categoria", "dim_subcategoria", "dim_usuario"]
+    )
 
     # --- DADOS DO USUÁRIO LOGADO (VINCULAÇÃO AUTOMÁTICA) ---
     try:
@@ -704,8 +773,16 @@ def formulario_transacao():
             st.warning("Verifique se o Valor, Descrição e Categorias/Subcategorias válidas foram selecionadas.")
 
     st.subheader("Transações em Staging")
-    df_stg = consultar_dados("vw_stg_transacoes") 
-    st.dataframe(df_stg, use_container_width=True)
+    navegador_transacoes(
+        "stg_navegador",
+        ['id_transacao', 'dt_datatransacao', 'dsc_tipotransacao', 'dsc_categoriatransacao',
+         'dsc_subcategoriatransacao', 'dsc_transacao', 'vl_transacao', 'dsc_nomeusuario',
+         'cd_quempagou', 'cd_edividido', 'cd_foidividido'],
+        column_config={
+            "dt_datatransacao": st.column_config.DateColumn("Data", format="YYYY-MM-DD"),
+            "vl_transacao": st.column_config.NumberColumn("Valor (€)", format="%.2f €"),
+        },
+    )
 
 def exibir_detalhe_rateio():
     st.header("Análise de Acerto de Contas")
@@ -715,17 +792,17 @@ def exibir_detalhe_rateio():
     # -------------------------------------------------------------
     st.subheader("Saldo Total Pendente")
 
-    df_total = consultar_dados("vw_acertototal")
+    df_total = consultar_view_acerto("vw_acertototal")
 
     if df_total.empty:
         st.info("Nenhuma transação para rateio pendente.")
         return # Se não houver dados, para a execução aqui
 
     # Renomeação do Resumo Total
-    df_total.rename(columns={
+    df_total = df_total.rename(columns={
         'nomeusuario': 'Usuário',
         'vl_saldototal': 'Saldo Total'
-    }, inplace=True)
+    })
 
     # Exibição do Resumo Total (formatado sem o símbolo €)
     if not df_total.empty:
@@ -745,22 +822,22 @@ def exibir_detalhe_rateio():
     # 2. TABELA CONSOLIDADO MENSAL (vw_acertomensal)
     # ----------------------------------------------------------------------
     st.subheader("Saldo Consolidado Mensal")
-    df_resumo = consultar_dados("vw_acertomensal")
+    df_resumo = consultar_view_acerto("vw_acertomensal")
 
     if df_resumo.empty:
         st.info("Nenhuma transação para rateio pendente. Cadastre uma transação dividida ou marque as transações antigas como saldadas.")
         return
 
     # Renomeação do Resumo
-    df_resumo.rename(columns={
+    df_resumo = df_resumo.rename(columns={
         'cd_quemdeve': 'Usuário',
         'ano' : 'Ano',
         'mes' : 'Mês',
         'vl_saldoacertomensal': 'Saldo Líquido'
-    }, inplace=True)
+    })
 
     # Ordena o DataFrame por Ano e Mês (crescente)
-    df_resumo.sort_values(by=['Ano', 'Mês'], inplace=True)
+    df_resumo = df_resumo.sort_values(by=['Ano', 'Mês'])
 
     # Exibição do Resumo (formatado sem o símbolo €)
     st.dataframe(
@@ -784,10 +861,10 @@ def exibir_detalhe_rateio():
     st.subheader("Detalhe das Transações Pendentes de Acerto")
 
     # View de detalhe: vw_acertodetalhe
-    df_detalhe = consultar_dados("vw_acertodetalhe") 
+    df_detalhe = consultar_view_acerto("vw_acertodetalhe")
 
     # Renomeação do Detalhe
-    df_detalhe.rename(columns={
+    df_detalhe = df_detalhe.rename(columns={
         'dt_datatransacao': 'Data',
         'dsc_transacao': 'Descrição',
         'vl_totaltransacao': 'Total da Transação',
@@ -795,7 +872,7 @@ def exibir_detalhe_rateio():
         'cd_quemdeve': 'Usuário',
         'vl_proporcional': 'Devido (Parte Dele)',
         'vl_acertotransacao': 'Acerto Líquido'
-    }, inplace=True)
+    })
 
     # Exibição do Detalhe (formatação de moeda + cor por sinal)
     st.dataframe(
@@ -803,6 +880,7 @@ def exibir_detalhe_rateio():
             cor_saldo,
             subset=['Acerto Líquido']
         ).format({
+            'Data': "{:%Y-%m-%d}",
             'Total da Transação': formatar_moeda,
             'Devido (Parte Dele)': formatar_moeda,
             'Acerto Líquido': formatar_moeda
@@ -815,30 +893,24 @@ def acerto_multiplo_transacoes():
     st.markdown("Selecione as transações que foram acertadas/saldadas para atualizar o campo **cd_foidividido** para 'S'.")
 
     # 1. CARREGAR DADOS PENDENTES
-    # Adicionando um filtro para carregar apenas transações não acertadas ('N') e que são despesas
-    # Você precisará adaptar a chamada à sua função consultar_dados
-
-    # Carrega todas as transações e filtra as pendentes ('N') em Pandas.
-    df_todas = consultar_dados("stg_transacoes", usar_view=False)
-    if df_todas.empty or 'cd_foidividido' not in df_todas.columns:
-        df_pendentes = pd.DataFrame()
-    else:
-        df_pendentes = df_todas[df_todas['cd_foidividido'] == 'N']
+    # Filtro (cd_foidividido = 'N'), projeção e ordenação (mais recente primeiro)
+    # são feitos no banco; o índice posicional (0, 1, 2...) é o que a seleção
+    # do st.dataframe (iloc) usa.
+    colunas_editor = ['id_transacao', 'dt_datatransacao', 'dsc_transacao', 'vl_transacao', 'cd_quempagou']
+    df_pendentes = consultar_dados(
+        "stg_transacoes",
+        colunas=colunas_editor,
+        filtros=[("cd_foidividido", "=", "N")],
+        ordenar_por=[("dt_datatransacao", "desc"), ("id_transacao", "desc")],
+    )
 
     if df_pendentes.empty:
         st.info("🎉 Não há transações pendentes de acerto (cd_foidividido = 'N').")
         return
 
-    # Ordena o DataFrame pela data da transação em ordem decrescente (mais recente primeiro)
-    df_pendentes = df_pendentes.sort_values(
-        by='dt_datatransacao', 
-        ascending=False
-    ).reset_index(drop=True) # Reseta o índice para garantir que a seleção do st.dataframe (iloc) funcione corretamente
-
     st.subheader(f"Transações Pendentes de Acerto ({len(df_pendentes)})")
 
     # 2. USAR st.data_editor PARA SELEÇÃO MÚLTIPLA
-    colunas_editor = ['id_transacao', 'dt_datatransacao', 'dsc_transacao', 'vl_transacao', 'cd_quempagou']
     df_exibicao = df_pendentes[colunas_editor]
 
     config = {
@@ -882,8 +954,6 @@ def acerto_multiplo_transacoes():
 
                 if sucesso:
                     st.success(f"🎉 {len(ids_selecionados)} transações foram acertadas com sucesso!")
-                    # Limpar o cache para que a lista de pendentes seja atualizada
-                    consultar_dados.clear()
                     st.rerun()
                 else:
                     st.error("Falha ao atualizar o status de acerto no banco de dados.")
@@ -892,17 +962,8 @@ def excluir_transacoes_duplicadas():
     st.subheader("Excluir Transações")
     st.markdown("Selecione as transações duplicadas ou incorretas para excluí-las permanentemente.")
 
-    df_todas = consultar_dados("stg_transacoes", usar_view=False)
-    if df_todas.empty:
-        st.info("Nenhuma transação encontrada.")
-        return
-
-    df_todas = df_todas.sort_values(by='dt_datatransacao', ascending=False).reset_index(drop=True)
-
     colunas_exibicao = ['id_transacao', 'dt_datatransacao', 'dsc_transacao', 'vl_transacao',
                         'dsc_categoriatransacao', 'dsc_nomeusuario', 'cd_foidividido']
-    colunas_presentes = [c for c in colunas_exibicao if c in df_todas.columns]
-    df_exibicao = df_todas[colunas_presentes]
 
     config = {
         "dt_datatransacao": st.column_config.DatetimeColumn("Data", format="YYYY-MM-DD"),
@@ -914,14 +975,11 @@ def excluir_transacoes_duplicadas():
         "cd_foidividido": st.column_config.TextColumn("Acertado"),
     }
 
-    selecao = st.dataframe(
-        df_exibicao,
-        column_config=config,
-        hide_index=True,
-        use_container_width=True,
-        selection_mode="multi-row",
-        on_select="rerun",
-    )
+    # Navegação paginada: só a página exibida é lida do banco
+    df_todas, selecao = navegador_transacoes("excluir_navegador", colunas_exibicao, column_config=config, selecao=True)
+    if df_todas.empty:
+        st.info("Nenhuma transação encontrada.")
+        return
 
     indices_selecionados = selecao.selection.rows
     ids_selecionados = []
@@ -937,7 +995,7 @@ def excluir_transacoes_duplicadas():
                 f"Você está prestes a excluir **{len(ids_selecionados)} transação(ões)** de forma permanente. "
                 "Esta ação não pode ser desfeita."
             )
-            df_confirmacao = df_todas[df_todas['id_transacao'].isin(ids_selecionados)][colunas_presentes]
+            df_confirmacao = df_todas[df_todas['id_transacao'].isin(ids_selecionados)][colunas_exibicao]
             st.dataframe(df_confirmacao, column_config=config, hide_index=True, use_container_width=True)
 
             if st.button("🗑️ Confirmar e Excluir", type="primary"):
@@ -945,36 +1003,50 @@ def excluir_transacoes_duplicadas():
                     sucesso = deletar_transacoes(ids_selecionados)
                 if sucesso:
                     st.success(f"{len(ids_selecionados)} transação(ões) excluída(s) com sucesso!")
-                    consultar_dados.clear()
                     st.rerun()
 
+def _manter_estado_widgets(chaves):
+    """
+    Preserva o valor de widgets que não serão desenhados nesta execução.
+
+    O Streamlit descarta o estado de um widget que sai da tela; regravá-lo na
+    sessão mantém o valor até o widget voltar a ser exibido.
+    """
+    for chave in chaves:
+        if chave in st.session_state:
+            st.session_state[chave] = st.session_state[chave]
+
 def pagina_acerto_controle():
     st.title("💰 Gestão de Acertos e Correções")
 
-    tab_detalhe, tab_acerto_multiplo, tab_excluir, tab_corrigir = st.tabs([
-        "📊 Detalhe e Rateio de Contas",
-        "✅ Acerto Múltiplo",
-        "🗑️ Excluir Transação",
-        "🛠️ Corrigir Transação",
-    ])
-
-    with tab_detalhe:
-        exibir_detalhe_rateio()
+    # Seção -> (função, chaves dos widgets cujo valor é mantido enquanto ela está fechada).
+    # Diferente de st.tabs, só a seção selecionada é executada a cada rerun.
+    secoes = {
+        "📊 Detalhe e Rateio de Contas": (exibir_detalhe_rateio, ()),
+        "✅ Acerto Múltiplo": (acerto_multiplo_transacoes, ()),
+        "🗑️ Excluir Transação": (excluir_transacoes_duplicadas, ("excluir_navegador_ordem", "excluir_navegador_tamanho")),
+        "🛠️ Corrigir Transação": (editar_transacao, ("modo_correcao", "id_correcao")),
+    }
 
-    with tab_acerto_multiplo:
-        acerto_multiplo_transacoes()
+    secao_atual = st.radio(
+        "Seção:", list(secoes), horizontal=True, label_visibility="collapsed", key="secao_acerto"
+    )
 
-    with tab_excluir:
-        excluir_transacoes_duplicadas()
+    for secao, (_, chaves) in secoes.items():
+        if secao != secao_atual:
+            _manter_estado_widgets(chaves)
 
-    with tab_corrigir:
-        editar_transacao()
+    exibir_secao, _ = secoes[secao_atual]
+    exibir_secao()
 
 def exibir_formulario_edicao(id_transacao):
     st.subheader(f"2. Editando Transação ID: {id_transacao}")
 
-    # 1. BUSCAR DADOS ATUAIS DA TRANSAÇÃO
-    dados_atuais = buscar_transacao_por_id(id_transacao)
+    # 1. BUSCAR DADOS ATUAIS DA TRANSAÇÃO (junto com as dimensões dos dropdowns, em paralelo)
+    dados_atuais, df_usuarios, df_categorias, df_subcategorias, df_tipos = consultar_varios([
+        lambda: buscar_transacao_por_id(id_transacao),
+        "dim_usuario", "dim_categoria", "dim_subcategoria", "dim_tipotransacao",
+    ])
 
     # Verificação única. Se o DataFrame veio vazio, sai.
     if dados_atuais.empty: 
@@ -984,19 +1056,15 @@ def exibir_formulario_edicao(id_transacao):
     # 2. BUSCAR DADOS PARA OS DROPDOWNS (DIMENSÕES)
 
     # Usuários (dim_usuario) - Para o dropdown "Quem Pagou"
-    df_usuarios = consultar_dados("dim_usuario", usar_view=False)
     usuarios_nomes = df_usuarios['dsc_nome'].tolist() if not df_usuarios.empty and 'dsc_nome' in df_usuarios.columns else []
 
     # Categorias (dim_categoria)
-    df_categorias = consultar_dados("dim_categoria", usar_view=False)
     categorias_nomes = df_categorias['dsc_categoriatransacao'].tolist() if not df_categorias.empty and 'dsc_categoriatransacao' in df_categorias.columns else []
 
     # Subcategorias (dim_subcategoria)
-    df_subcategorias = consultar_dados("dim_subcategoria", usar_view=False)
     subcategorias_nomes = df_subcategorias['dsc_subcategoriatransacao'].tolist() if not df_subcategorias.empty and 'dsc_subcategoriatransacao' in df_subcategorias.columns else []
 
     # Tipos de Transação (dim_tipotransacao) - IDs reais vindos do banco
-    df_tipos = consultar_dados("dim_tipotransacao", usar_view=False)
     tipos_map = dict(zip(df_tipos['dsc_tipotransacao'], df_tipos['id_tipotransacao'])) if not df_tipos.empty else {}
 
 
@@ -1149,25 +1217,91 @@ def exibir_formulario_edicao(id_transacao):
 
             if sucesso:
                 st.success(f"Transação {id_transacao} atualizada com sucesso!")
-                consultar_dados.clear()
                 st.rerun() 
             else:
                 st.error("Erro ao atualizar a transação. Verifique a conexão com o banco.")
 
-def editar_transacao():
-    st.header("Correção de Transações")
+def editar_transacoes_em_grade(primeiro_dia):
+    """
+    Correção de várias transações de uma vez numa grade editável (st.data_editor).
+
+    As células editadas são comparadas com o original e só as linhas alteradas
+    são enviadas, todas num único UPDATE (atualizar_transacoes_em_lote).
+    """
+    colunas = ['id_transacao', 'dt_datatransacao', 'dsc_transacao', 'vl_transacao', 'cd_quempagou',
+               'dsc_tipotransacao', 'dsc_categoriatransacao', 'dsc_subcategoriatransacao',
+               'cd_edividido', 'cd_foidividido']
+    df_original, df_tipos, df_categorias, df_subcategorias, df_usuarios = consultar_varios([
+        ("stg_transacoes", {
+            "colunas": colunas,
+            "filtros": [("dt_datatransacao", ">=", primeiro_dia), ("cd_foidividido", "=", "N")],
+        }),
+        "dim_tipotransacao", "dim_categoria", "dim_subcategoria", "dim_usuario",
+    ])
 
-    # ----------------------------------------------------------------------
-    # A) TABELA DE VISUALIZAÇÃO
-    # ----------------------------------------------------------------------
-    st.subheader("1. Tabela de Transações Registradas")
+    if df_original.empty:
+        st.info(f"Nenhuma transação encontrada a partir de {primeiro_dia.strftime('%d/%m/%Y')}.")
+        return
 
-    # Consulta a tabela de transações (stg_transacoes já deve trazer 'dt_datatransacao')
-    df_transacoes = consultar_dados("stg_transacoes")
+    # Colunas category (esquema do db) viram texto para aceitar qualquer opção da grade
+    df_original = df_original[colunas]
+    df_original = df_original.astype({c: "object" for c in df_original.select_dtypes("category").columns})
 
-    if df_transacoes.empty:
-        st.info("Nenhuma transação registrada para editar.")
-        return
+    def opcoes(df, coluna, atuais):
+        return sorted(set(df[coluna].dropna().tolist()) | set(atuais.dropna().tolist()))
+
+    df_editado = st.data_editor(
+        df_original,
+        key="grade_transacoes",
+        hide_index=True,
+        use_container_width=True,
+        num_rows="fixed",
+        disabled=["id_transacao"],
+        column_config={
+            "id_transacao": st.column_config.NumberColumn("ID"),
+            "dt_datatransacao": st.column_config.DateColumn("Data", format="YYYY-MM-DD", required=True),
+            "dsc_transacao": st.column_config.TextColumn("Descrição"),
+            "vl_transacao": st.column_config.NumberColumn("Valor", min_value=0.01, format="%.2f", required=True),
+            "cd_quempagou": st.column_config.SelectboxColumn(
+                "Pagador", options=opcoes(df_usuarios, 'dsc_nome', df_original['cd_quempagou']), required=True),
+            "dsc_tipotransacao": st.column_config.SelectboxColumn(
+                "Tipo", options=opcoes(df_tipos, 'dsc_tipotransacao', df_original['dsc_tipotransacao']), required=True),
+            "dsc_categoriatransacao": st.column_config.SelectboxColumn(
+                "Categoria", options=opcoes(df_categorias, 'dsc_categoriatransacao', df_original['dsc_categoriatransacao']), required=True),
+            "dsc_subcategoriatransacao": st.column_config.SelectboxColumn(
+                "Subcategoria", options=opcoes(df_subcategorias, 'dsc_subcategoriatransacao', df_original['dsc_subcategoriatransacao']), required=True),
+            "cd_edividido": st.column_config.SelectboxColumn("É dividida?", options=['N', 'S'], required=True),
+            "cd_foidividido": st.column_config.SelectboxColumn("Foi acertada?", options=['N', 'S'], required=True),
+        },
+    )
+
+    # Linhas com alguma célula diferente do original (NaN == NaN conta como igual)
+    iguais = df_editado.eq(df_original) | (df_editado.isna() & df_original.isna())
+    df_alteradas = df_editado[~iguais.all(axis=1)]
+
+    st.caption(f"{len(df_alteradas)} transação(ões) alterada(s).")
+    if st.button(f"💾 Salvar {len(df_alteradas)} alteração(ões)", key="btn_salvar_grade",
+                 type="primary", disabled=df_alteradas.empty):
+        with st.spinner("Gravando correções..."):
+            quantidade, df_rejeitadas = atualizar_transacoes_em_lote(df_alteradas)
+
+        if quantidade is None:
+            st.error("Erro ao gravar as correções. Nenhuma transação foi alterada.")
+            return
+        if not df_rejeitadas.empty:
+            st.warning(f"Nenhuma transação foi gravada: {len(df_rejeitadas)} linha(s) com erro. "
+                       "Corrija as linhas abaixo e salve novamente.")
+            st.dataframe(df_rejeitadas[['id_transacao', 'dsc_tipotransacao', 'dsc_categoriatransacao',
+                                        'dsc_subcategoriatransacao', 'motivo']], hide_index=True)
+            return
+
+        st.success(f"{quantidade} transação(ões) atualizada(s) com sucesso!")
+        # Descarta as edições pendentes da grade antes de recarregar os dados
+        del st.session_state["grade_transacoes"]
+        st.rerun()
+
+def editar_transacao():
+    st.header("Correção de Transações")
 
     # LÓGICA DE FILTRO DE DATA (INÍCIO)
     # 1. Calcula o primeiro dia do mês anterior
@@ -1175,15 +1309,32 @@ def editar_transacao():
     primeiro_dia_mes_anterior = hoje - relativedelta(months=1)
     primeiro_dia_mes_anterior = primeiro_dia_mes_anterior.replace(day=1)
 
-    # 2. Converte a coluna de data para datetime (se ainda não for)
-    # Garante que a coluna de data seja comparável
-    df_transacoes['dt_datatransacao'] = pd.to_datetime(df_transacoes['dt_datatransacao'])
+    modo = st.radio(
+        "Modo de correção:",
+        ("Uma transação (formulário)", "Várias transações (grade)"),
+        horizontal=True,
+        key="modo_correcao",
+    )
+    if modo == "Várias transações (grade)":
+        editar_transacoes_em_grade(primeiro_dia_mes_anterior)
+        return
+
+    # ----------------------------------------------------------------------
+    # A) TABELA DE VISUALIZAÇÃO
+    # ----------------------------------------------------------------------
+    st.subheader("1. Tabela de Transações Registradas")
 
-    # 3. Filtra o DataFrame
-    df_filtrado = df_transacoes[
-        (df_transacoes['dt_datatransacao'].dt.date >= primeiro_dia_mes_anterior) & 
-        (df_transacoes['cd_foidividido'] == 'N')
-    ]
+    # 2. Consulta só as transações pendentes a partir do mês anterior, com as
+    # colunas exibidas (filtro e projeção feitos no banco)
+    df_filtrado = consultar_dados(
+        "stg_transacoes",
+        colunas=['id_transacao', 'dt_datatransacao', 'dsc_transacao', 'vl_transacao',
+                 'cd_quempagou', 'cd_edividido', 'cd_foidividido'],
+        filtros=[
+            ("dt_datatransacao", ">=", primeiro_dia_mes_anterior),
+            ("cd_foidividido", "=", "N"),
+        ],
+    )
 
     # Se o DataFrame filtrado estiver vazio
     if df_filtrado.empty:
@@ -1203,6 +1354,7 @@ def editar_transacao():
     # Exibe a tabela COMPLETA, apenas para visualização (sem modo de seleção)
     st.dataframe(
         df_exibicao, 
+        column_config={"Data": st.column_config.DateColumn("Data", format="YYYY-MM-DD")},
         hide_index=True, 
         use_container_width=True
     )
@@ -1221,7 +1373,8 @@ def editar_transacao():
     id_selecionado_str = st.selectbox(
         "Selecione o ID da transação que deseja corrigir na lista acima:",
         options=lista_ids,
-        index=0 # Começa com vazio
+        index=0, # Começa com vazio
+        key="id_correcao",
     )
 
     # ----------------------------------------------------------------------
@@ -0,0 +1,198 @@
+"""Importação em lote de extratos (CSV/OFX) para stg_transacoes."""
+import io
+import re
+import pandas as pd
+import streamlit as st
+from helpers import logger
+from db import consultar_dados, importar_transacoes_em_lote
+
+# Cabeçalhos aceitos no CSV (sem acento/caixa) -> coluna de stg_transacoes
+_COLUNAS_CSV = {
+    "data": "dt_datatransacao",
+    "tipo": "dsc_tipotransacao",
+    "categoria": "dsc_categoriatransacao",
+    "subcategoria": "dsc_subcategoriatransacao",
+    "descricao": "dsc_transacao",
+    "valor": "vl_transacao",
+    "quem_pagou": "cd_quempagou",
+    "dividido": "cd_edividido",
+    "acertado": "cd_foidividido",
+}
+
+_FLAGS = {"s": "S", "sim": "S", "n": "N", "nao": "N", "não": "N"}
+
+def _normalizar_cabecalho(nome):
+    """Normaliza um cabeçalho do CSV (minúsculo, sem acento, espaços viram '_')."""
+    nome = nome.strip().lower().replace(" ", "_")
+    return nome.translate(str.maketrans("áàâãéêíóôõúç", "aaaaeeiooouc"))
+
+def _converter_valor(serie):
+    """Converte valores '1.234,56', '1234.56' ou '-12,30 €' para float positivo."""
+    texto = serie.astype("string").str.replace("€", "", regex=False).str.strip()
+    tem_virgula = texto.str.contains(",", regex=False).fillna(False)
+    texto = texto.where(~tem_virgula, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(texto, errors="coerce").abs()
+
+def _converter_flag(serie):
+    """Converte Sim/Não/S/N em 'S'/'N' (demais valores ficam vazios para receber o padrão)."""
+    return serie.astype("string").str.strip().str.lower().map(_FLAGS)
+
+def ler_csv(conteudo):
+    """
+    Lê um CSV (separador ',' ou ';') com as colunas de _COLUNAS_CSV.
+
+    Só `data`, `descricao` e `valor` são obrigatórias; as demais podem vir
+    vazias e recebem os padrões escolhidos na tela.
+    """
+    df = pd.read_csv(io.BytesIO(conteudo), sep=None, engine="python", dtype=str, encoding="utf-8-sig")
+    df = df.rename(columns=lambda c: _COLUNAS_CSV.get(_normalizar_cabecalho(c), c))
+
+    faltando = {"dt_datatransacao", "dsc_transacao", "vl_transacao"} - set(df.columns)
+    if faltando:
+        raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(sorted(faltando))}")
+
+    df = df[[c for c in _COLUNAS_CSV.values() if c in df.columns]]
+    df["dt_datatransacao"] = pd.to_datetime(df["dt_datatransacao"], format="mixed", dayfirst=True, errors="coerce").dt.date
+    df["vl_transacao"] = _converter_valor(df["vl_transacao"])
+    for coluna in ("cd_edividido", "cd_foidividido"):
+        if coluna in df.columns:
+            df[coluna] = _converter_flag(df[coluna])
+    return df
+
+def ler_ofx(conteudo):
+    """
+    Lê as transações (<STMTTRN>) de um extrato OFX.
+
+    Usa DTPOSTED, TRNAMT e MEMO/NAME. Débitos (valor negativo) e créditos ficam
+    marcados na coluna `credito` para a tela decidir o que importar.
+    """
+    texto = conteudo.decode("latin-1")
+    registros = []
+    for bloco in re.findall(r"<STMTTRN>(.*?)</STMTTRN>", texto, flags=re.S | re.I):
+        campos = dict(
+            (tag.upper(), valor.strip())
+            for tag, valor in re.findall(r"<(\w+)>([^<\r\n]*)", bloco)
+        )
+        registros.append({
+            "dt_datatransacao": campos.get("DTPOSTED", "")[:8],
+            "dsc_transacao": campos.get("MEMO") or campos.get("NAME", ""),
+            "vl_transacao": campos.get("TRNAMT", ""),
+        })
+
+    df = pd.DataFrame(registros, columns=["dt_datatransacao", "dsc_transacao", "vl_transacao"])
+    df["dt_datatransacao"] = pd.to_datetime(df["dt_datatransacao"], format="%Y%m%d", errors="coerce").dt.date
+    df["credito"] = ~df["vl_transacao"].astype("string").str.strip().str.startswith("-").fillna(False)
+    df["vl_transacao"] = _converter_valor(df["vl_transacao"])
+    return df
+
+def ler_extrato(nome_arquivo, conteudo):
+    """Lê o extrato conforme a extensão do arquivo (.csv ou .ofx)."""
+    if nome_arquivo.lower().endswith(".ofx"):
+        return ler_ofx(conteudo)
+    return ler_csv(conteudo)
+
+def pagina_importacao():
+    st.header("Importação em Lote de Transações")
+    st.markdown(
+        "Envie um **CSV** (colunas `data`, `descricao`, `valor` e, opcionalmente, `tipo`, "
+        "`categoria`, `subcategoria`, `quem_pagou`, `dividido`, `acertado`) ou um extrato **OFX**. "
+        "Campos ausentes recebem os valores padrão escolhidos abaixo."
+    )
+
+    try:
+        id_usuario_logado = st.session_state.id_usuario_logado
+        nome_usuario = st.session_state.nome_completo
+    except AttributeError:
+        st.error("Erro de Sessão: As variáveis de usuário logado (id_usuario_logado e nome_completo) não estão configuradas na sessão.")
+        return
+
+    arquivo = st.file_uploader("Extrato (CSV ou OFX)", type=["csv", "ofx"], key="import_arquivo")
+    if arquivo is None:
+        return
+
+    try:
+        df_extrato = ler_extrato(arquivo.name, arquivo.getvalue())
+    except Exception as e:
+        logger.exception("Erro ao ler o extrato importado")
+        st.error(f"Não foi possível ler o arquivo: {e}")
+        return
+
+    if df_extrato.empty:
+        st.info("Nenhuma transação encontrada no arquivo.")
+        return
+
+    # ----------------------------------------
+    # VALORES PADRÃO
+    # ----------------------------------------
+    df_tipos = consultar_dados("dim_tipotransacao")
+    df_categorias = consultar_dados("dim_categoria")
+    df_subcategorias = consultar_dados("dim_subcategoria")
+    df_usuarios = consultar_dados("dim_usuario")
+
+    if df_tipos.empty or df_categorias.empty or df_subcategorias.empty or df_usuarios.empty:
+        st.warning("É necessário cadastrar: Usuários, Tipos, Categorias e Subcategorias. Verifique as tabelas de dimensões.")
+        return
+
+    st.subheader("Valores Padrão")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        tipo_padrao = st.selectbox("Tipo:", df_tipos['dsc_tipotransacao'].tolist(), key="import_tipo")
+    id_tipo_padrao = df_tipos.loc[df_tipos['dsc_tipotransacao'] == tipo_padrao, 'id_tipotransacao'].iloc[0]
+    df_cats = df_categorias[df_categorias['id_tipotransacao'] == id_tipo_padrao]
+    with col2:
+        categoria_padrao = st.selectbox("Categoria:", df_cats['dsc_categoriatransacao'].tolist(), key="import_cat")
+    df_subs = df_subcategorias[df_subcategorias['id_categoria'].isin(
+        df_cats.loc[df_cats['dsc_categoriatransacao'] == categoria_padrao, 'id_categoria']
+    )]
+    with col3:
+        subcategoria_padrao = st.selectbox("Subcategoria:", df_subs['dsc_subcategoriatransacao'].tolist(), key="import_sub")
+
+    col4, col5, col6 = st.columns(3)
+    with col4:
+        quem_pagou_padrao = st.selectbox("Quem Pagou:", df_usuarios['dsc_nome'].tolist(), key="import_quem_pagou")
+    with col5:
+        e_dividido_padrao = st.radio("Dividida?", ('Não', 'Sim'), horizontal=True, key="import_dividido")
+    with col6:
+        foi_dividido_padrao = st.radio("Acertada/saldada?", ('Não', 'Sim'), horizontal=True, key="import_acertado")
+
+    if "credito" in df_extrato.columns:
+        if st.checkbox("Ignorar créditos (valores positivos do extrato)", value=True, key="import_ignorar_creditos"):
+            df_extrato = df_extrato[~df_extrato["credito"]]
+        df_extrato = df_extrato.drop(columns=["credito"])
+
+    padroes = {
+        "dsc_tipotransacao": tipo_padrao,
+        "dsc_categoriatransacao": categoria_padrao,
+        "dsc_subcategoriatransacao": subcategoria_padrao,
+        "cd_quempagou": quem_pagou_padrao,
+        "cd_edividido": 'S' if e_dividido_padrao == 'Sim' else 'N',
+        "cd_foidividido": 'S' if foi_dividido_padrao == 'Sim' else 'N',
+    }
+    df_lote = df_extrato.copy()
+    for coluna, valor in padroes.items():
+        if coluna in df_lote.columns:
+            df_lote[coluna] = df_lote[coluna].fillna(valor)
+        else:
+            df_lote[coluna] = valor
+    df_lote["id_usuario"] = id_usuario_logado
+    df_lote["dsc_nomeusuario"] = nome_usuario
+    df_lote["dsc_transacao"] = df_lote["dsc_transacao"].fillna("").astype(str).str.slice(0, 100)
+
+    st.subheader(f"Pré-visualização ({len(df_lote)} transações)")
+    st.dataframe(df_lote.head(200), hide_index=True, use_container_width=True)
+
+    # ----------------------------------------
+    # IMPORTAÇÃO
+    # ----------------------------------------
+    if st.button(f"📥 Importar {len(df_lote)} Transações", type="primary", key="import_confirmar"):
+        barra = st.progress(0.0, text="Preparando importação...")
+        quantidade, df_rejeitadas = importar_transacoes_em_lote(
+            df_lote,
+            ao_progredir=lambda fracao, mensagem: barra.progress(fracao, text=mensagem),
+        )
+
+        if quantidade is not None:
+            st.success(f"{quantidade} transação(ões) importada(s) com sucesso!")
+        if not df_rejeitadas.empty:
+            st.warning(f"{len(df_rejeitadas)} linha(s) não foram importadas. Corrija e envie novamente:")
+            st.dataframe(df_rejeitadas, hide_index=True, use_container_width=True)
@@ -5,81 +5,69 @@ st.set_page_config(
     initial_sidebar_state="auto"
 )
 from auth import login_page
-from forms import formulario_categoria, formulario_salario, formulario_subcategoria, formulario_tipo_transacao, formulario_transacao, formulario_usuario, pagina_acerto_controle
-from dashboard import dashboard
-if 'menu_selecionado' not in st.session_state:
-    st.session_state.menu_selecionado = "Dashboard"
+
+# Páginas do app, por seção do menu. Cada página é um arquivo em paginas/ que
+# importa o próprio módulo (dashboard, forms, importacao) só quando é aberta:
+# a tela de login não paga pelo pandas/Plotly das páginas.
+_PAGINAS = {
+    "Principal": [
+        {"arquivo": "paginas/painel.py", "titulo": "Dashboard", "icone": "📊", "padrao": True},
+        {"arquivo": "paginas/transacao.py", "titulo": "Transação", "icone": "💵"},
+        {"arquivo": "paginas/acerto.py", "titulo": "Acerto & Correção", "icone": "💰"},
+        {"arquivo": "paginas/importar_extrato.py", "titulo": "Importar Extrato", "icone": "📥"},
+    ],
+    "Cadastros (Dimensões)": [
+        {"arquivo": "paginas/tipos_transacao.py", "titulo": "Tipos de Transação", "icone": "💳"},
+        {"arquivo": "paginas/categorias.py", "titulo": "Categorias", "icone": "🏷️"},
+        {"arquivo": "paginas/subcategorias.py", "titulo": "Subcategorias", "icone": "📝"},
+        {"arquivo": "paginas/usuarios.py", "titulo": "Usuários", "icone": "👥"},
+        {"arquivo": "paginas/salario.py", "titulo": "Salário", "icone": "💰"},
+    ],
+}
+
+def _navegacao():
+    """Monta o menu (st.navigation) e retorna a página selecionada."""
+    return st.navigation({
+        secao_menu: [
+            st.Page(pagina["arquivo"], title=pagina["titulo"], icon=pagina["icone"], default=pagina.get("padrao", False))
+            for pagina in paginas
+        ]
+        for secao_menu, paginas in _PAGINAS.items()
+    })
 
 def main():
     # Inicializa o estado de login
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
-    if 'menu_selecionado' not in st.session_state:
-        st.session_state.menu_selecionado = "Dashboard"
 
     # ----------------------------------------------------------------
     # CONTROLE DE FLUXO: Se não estiver logado, exibe apenas a tela de login
     # ----------------------------------------------------------------
     if not st.session_state.logged_in:
-        login_page()
+        # Menu só com o login: nenhuma outra página (nem seus imports, nem db/pandas) é carregada
+        pagina_login = st.navigation([st.Page(login_page, title="Login", icon="🔐")])
+        pagina_login.run()
         return 
 
-    # Se estiver logado, continua a execução do menu
-
-    # --- 1. SIDEBAR (Menu Principal) ---
-    with st.sidebar:
-        # Usar dsc_nome (nome_completo) em vez de login
-        nome_exibido = st.session_state.get('nome_completo', st.session_state.login)
-        st.title(f"Menu Principal - Logado como: {nome_exibido}")
-
-        # BOTÕES PRINCIPAIS
-        col1, col2 = st.columns(2) 
-
-        with col1:
-            if st.button("📊 Dashboard", key="btn_dashboard", use_container_width=True):
-                st.session_state.menu_selecionado = "Dashboard"
-        with col2:
-            if st.button("💵 Transação", key="btn_transacao", use_container_width=True):
-                st.session_state.menu_selecionado = "Transação"
-
-        if st.button("💰 Acerto & Correção", key="btn_acerto", use_container_width=True):
-            st.session_state.menu_selecionado = "Acerto de Contas"
+    # Se estiver logado, continua a execução do menu. Diagnóstico e perfilador
+    # importam db (pandas, SQLAlchemy), então só entram depois do login.
+    from perfilador import perfilar_execucao
 
-        st.subheader("Cadastros (Dimensões)")
+    # Perfil de renderização (?perfil=1 ou [perfilador] no secrets.toml); no-op se desligado
+    with perfilar_execucao():
+        _executar_app()
 
-        # Dicionário de Opções
-        opcoes_cadastro = {
-            "💳 Tipos de Transação": "Tipos de Transação", 
-            "🏷️ Categorias": "Categorias",        
-            "📝 Subcategorias": "Subcategorias",     
-            "👥 Usuários": "Usuários",          
-            "💰 Salário": "Salário",
-        }
+def _executar_app():
+    from diagnostico import painel_diagnostico
+    from perfilador import painel_perfil, perfilar_pagina, secao
 
-        # Layout de 2 botões por linha para Cadastros
-        opcoes_lista = list(opcoes_cadastro.keys())
-
-        for i in range(0, len(opcoes_lista), 2):
-            col_a, col_b = st.columns(2)
-
-            # Botão da coluna A
-            nome_opcao_a = opcoes_lista[i]
-            nome_limpo_a = opcoes_cadastro[nome_opcao_a]
-
-            with col_a:
-                if st.button(nome_opcao_a, key=f"btn_cadastro_{nome_limpo_a}", use_container_width=True):
-                    st.session_state.menu_selecionado = nome_limpo_a
-
-            # Botão da coluna B (se existir)
-            if i + 1 < len(opcoes_lista):
-                nome_opcao_b = opcoes_lista[i+1]
-                nome_limpo_b = opcoes_cadastro[nome_opcao_b]
-
-                with col_b:
-                    if st.button(nome_opcao_b, key=f"btn_cadastro_{nome_limpo_b}", use_container_width=True):
-                        st.session_state.menu_selecionado = nome_limpo_b
+    # --- 1. SIDEBAR (Menu Principal) ---
+    pagina_atual = _navegacao()
 
-        st.markdown("---")
+    with secao("Sidebar"), st.sidebar:
+        # Usar dsc_nome (nome_completo) em vez de login
+        nome_exibido = st.session_state.get('nome_completo', st.session_state.login)
+        st.caption(f"Logado como: {nome_exibido}")
 
         if st.button("🛑 Sair", key="btn_logout", type="primary", use_container_width=True):
             st.session_state.logged_in = False
@@ -92,26 +80,15 @@ def main():
                  del st.session_state.nome_completo
             st.rerun() 
 
-    # --- 2. EXIBIÇÃO DO FORMULÁRIO SELECIONADO ---
-    opcao_atual = st.session_state.menu_selecionado
+    # --- 2. EXIBIÇÃO DA PÁGINA SELECIONADA ---
+    with perfilar_pagina(pagina_atual.title):
+        pagina_atual.run()
 
-    # As funções abaixo devem estar definidas no seu código
-    if opcao_atual == "Dashboard":
-        dashboard()
-    elif opcao_atual == "Transação":
-        formulario_transacao()
-    elif opcao_atual == "Salário":
-        formulario_salario()
-    elif opcao_atual == "Acerto de Contas":
-        pagina_acerto_controle()
-    elif opcao_atual == "Tipos de Transação":
-        formulario_tipo_transacao()
-    elif opcao_atual == "Categorias":
-        formulario_categoria()
-    elif opcao_atual == "Subcategorias":
-        formulario_subcategoria()
-    elif opcao_atual == "Usuários":
-        formulario_usuario()
+    # --- 3. DIAGNÓSTICO (ao final, para incluir as consultas desta execução) ---
+    with st.sidebar:
+        with secao("Diagnóstico"):
+            painel_diagnostico()
+        painel_perfil()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,330 @@
+"""
+Migrações de esquema versionadas (DDL dos caminhos de acesso do app).
+
+Cada migração é aplicada uma única vez e registrada em `schema_migracoes`, na
+mesma transação do seu DDL: uma migração interrompida não fica registrada e é
+refeita por inteiro na próxima execução. Nem todo DDL é idempotente (a 3 recria
+as views materializadas); só as não transacionais, que rodam em autocommit,
+precisam usar IF NOT EXISTS. As migrações rodam
+como passo de deploy, pela CLI, antes de subir o app (nunca no carregamento
+de uma página):
+
+    uv run python app/migracoes.py             # aplica as pendentes
+    uv run python app/migracoes.py --opcional 2 # inclui uma migração opcional
+    uv run python app/migracoes.py --listar    # versões aplicadas/pendentes
+    uv run python app/migracoes.py --verificar # EXPLAIN: os índices são usados?
+
+Migrações marcadas como opcionais só rodam quando pedidas (--opcional) ou
+listadas em [migracoes].opcionais no secrets.toml.
+"""
+import argparse
+import datetime
+import json
+import re
+import psycopg2
+import streamlit as st
+from db import get_connection
+from helpers import logger
+from particoes import particionar_transacoes
+
+# Chave do advisory lock: duas instâncias do app não aplicam migrações ao mesmo tempo.
+_CHAVE_LOCK_MIGRACOES = 7_240_001
+
+_SQL_TABELA_CONTROLE = """
+    CREATE TABLE IF NOT EXISTS schema_migracoes (
+        versao      INTEGER PRIMARY KEY,
+        descricao   TEXT NOT NULL,
+        aplicada_em TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+# Migrações em ordem de versão. Cada uma tem "sql" (lista de comandos) e/ou
+# "funcao" (recebe o cursor, para DDL que depende do estado do banco).
+# "transacional": False roda os comandos em autocommit, um a um (exigido por
+# CREATE INDEX CONCURRENTLY, que não bloqueia escritas na tabela).
+# "verificacoes" lista consultas cujo EXPLAIN deve usar ("usa") e/ou não tocar
+# ("nao_usa") um índice ou tabela; "{ano}" é trocado pelo ano atual.
+_MIGRACOES = [
+    {
+        "versao": 1,
+        "descricao": "Índices dos caminhos de acesso de stg_transacoes e das dimensões",
+        "transacional": False,
+        "sql": [
+            # Paginação por keyset e filtros de período (consultar_pagina, dashboard)
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stg_transacoes_data_id "
+            "ON stg_transacoes (dt_datatransacao, id_transacao)",
+            # Transações pendentes de acerto: pequena fração da tabela
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_stg_transacoes_pendentes "
+            "ON stg_transacoes (dt_datatransacao) WHERE cd_foidividido = 'N'",
+            # Joins/filtros das dimensões (vw_dim_categoria, vw_dim_subcategoria, cascata dos formulários)
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dim_categoria_tipo ON dim_categoria (id_tipotransacao)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_dim_subcategoria_categoria ON dim_subcategoria (id_categoria)",
+        ],
+        "verificacoes": [
+            {"consulta": "SELECT id_transacao FROM stg_transacoes "
+                         "ORDER BY dt_datatransacao DESC, id_transacao DESC LIMIT 50",
+             "usa": "ix_stg_transacoes_data_id"},
+            {"consulta": "SELECT id_transacao FROM stg_transacoes "
+                         "WHERE cd_foidividido = 'N' AND dt_datatransacao >= DATE '2000-01-01'",
+             "usa": "ix_stg_transacoes_pendentes"},
+            {"consulta": "SELECT id_categoria FROM dim_categoria WHERE id_tipotransacao = 1",
+             "usa": "ix_dim_categoria_tipo"},
+            {"consulta": "SELECT id_subcategoria FROM dim_subcategoria WHERE id_categoria = 1",
+             "usa": "ix_dim_subcategoria_categoria"},
+        ],
+    },
+    {
+        "versao": 2,
+        "descricao": "Particionamento de stg_transacoes por ano, com partição de arquivo (opcional)",
+        "opcional": True,
+        "funcao": particionar_transacoes,
+        "verificacoes": [
+            # Intervalo de datas: só a partição do ano é lida
+            {"consulta": "SELECT id_transacao FROM stg_transacoes "
+                         "WHERE dt_datatransacao >= DATE '{ano}-01-01' AND dt_datatransacao < DATE '{ano}-07-01'",
+             "usa": "stg_transacoes_a{ano}", "nao_usa": "stg_transacoes_arquivo"},
+        ],
+    },
+    {
+        "versao": 3,
+        "descricao": "Views materializadas de acerto, com chave única para o refresh concorrente",
+        "sql": [
+            # Numa instalação limpa não há o que remover: o DROP só descarta mvw_* homônimas
+            # criadas fora das migrações (ex.: à mão), que fariam o CREATE abaixo falhar.
+            "DROP MATERIALIZED VIEW IF EXISTS mvw_acertototal, mvw_acertomensal, mvw_acertodetalhe",
+            # REFRESH ... CONCURRENTLY exige um índice único; a chave precisa ser a mesma
+            # entre refreshes para que só as linhas alteradas sejam regravadas.
+            "CREATE MATERIALIZED VIEW mvw_acertototal AS SELECT * FROM vw_acertototal",
+            "CREATE UNIQUE INDEX ux_mvw_acertototal ON mvw_acertototal (nomeusuario)",
+            "CREATE MATERIALIZED VIEW mvw_acertomensal AS SELECT * FROM vw_acertomensal",
+            "CREATE UNIQUE INDEX ux_mvw_acertomensal ON mvw_acertomensal (cd_quemdeve, ano, mes)",
+            # vw_acertodetalhe não expõe id_transacao: a chave é o hash do conteúdo da
+            # linha mais a ordem entre linhas idênticas (intercambiáveis entre si).
+            "CREATE MATERIALIZED VIEW mvw_acertodetalhe AS "
+            "SELECT md5(v::text) AS ch_linha, row_number() OVER (PARTITION BY md5(v::text)) AS nr_repeticao, v.* "
+            "FROM vw_acertodetalhe v",
+            "CREATE UNIQUE INDEX ux_mvw_acertodetalhe ON mvw_acertodetalhe (ch_linha, nr_repeticao)",
+            "CREATE INDEX ix_mvw_acertodetalhe_dt_datatransacao ON mvw_acertodetalhe (dt_datatransacao)",
+        ],
+        "verificacoes": [
+            # Filtro por data no detalhe do acerto
+            {"consulta": "SELECT ch_linha FROM mvw_acertodetalhe WHERE dt_datatransacao >= DATE '2000-01-01'",
+             "usa": "ix_mvw_acertodetalhe_dt_datatransacao"},
+        ],
+    },
+]
+
+def _versoes_aplicadas(cursor):
+    cursor.execute(_SQL_TABELA_CONTROLE)
+    cursor.execute("SELECT versao FROM schema_migracoes")
+    return {linha[0] for linha in cursor.fetchall()}
+
+def _remover_indices_invalidos(cursor, comandos):
+    """
+    Remove os índices inválidos citados nos comandos (sobra de um CREATE INDEX
+    CONCURRENTLY interrompido), que o IF NOT EXISTS manteria como estão.
+    """
+    cursor.execute("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid AND pg_table_is_visible(c.oid)
+    """)
+    for (nome,) in cursor.fetchall():
+        if any(re.search(rf"\b{re.escape(nome)}\b", comando) for comando in comandos):
+            logger.warning("Removendo o índice inválido '%s' antes de recriá-lo", nome)
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{nome}"')
+
+def _aplicar_sem_transacao(conn, cursor, migracao):
+    """Executa os comandos da migração em autocommit e a registra em seguida."""
+    conn.driver_connection.autocommit = True
+    try:
+        _remover_indices_invalidos(cursor, migracao["sql"])
+        for comando in migracao["sql"]:
+            cursor.execute(comando)
+    finally:
+        conn.driver_connection.autocommit = False
+    cursor.execute(
+        "INSERT INTO schema_migracoes (versao, descricao) VALUES (%s, %s)",
+        (migracao["versao"], migracao["descricao"]),
+    )
+    conn.commit()
+
+def listar_migracoes():
+    """Retorna [(versao, descricao, opcional, aplicada)] de todas as migrações conhecidas."""
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        aplicadas = _versoes_aplicadas(cursor)
+        conn.commit()
+        return [(m["versao"], m["descricao"], m.get("opcional", False), m["versao"] in aplicadas) for m in _MIGRACOES]
+
+    finally:
+        if conn: conn.close()
+
+def aplicar_migracoes(opcionais=()):
+    """
+    Aplica as migrações pendentes, cada uma na sua transação, e retorna as versões aplicadas.
+
+    As opcionais só entram se a versão estiver em `opcionais`. As não
+    transacionais rodam em autocommit: se forem interrompidas, não ficam
+    registradas e a próxima execução as refaz (o DDL é idempotente).
+
+    Um advisory lock serializa execuções concorrentes (ex.: duas réplicas do app
+    subindo juntas). Em caso de erro a migração corrente é desfeita e o erro é
+    propagado; as anteriores continuam registradas.
+    """
+    conn = None
+    aplicadas_agora = []
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_advisory_lock(%s)", (_CHAVE_LOCK_MIGRACOES,))
+        try:
+            aplicadas = _versoes_aplicadas(cursor)
+            conn.commit()
+
+            for migracao in _MIGRACOES:
+                if migracao["versao"] in aplicadas:
+                    continue
+                if migracao.get("opcional") and migracao["versao"] not in opcionais:
+                    continue
+                if not migracao.get("transacional", True):
+                    _aplicar_sem_transacao(conn, cursor, migracao)
+                    aplicadas_agora.append(migracao["versao"])
+                    logger.info("Migração %s aplicada: %s", migracao["versao"], migracao["descricao"])
+                    continue
+                for comando in migracao.get("sql", ()):
+                    cursor.execute(comando)
+                if "funcao" in migracao:
+                    migracao["funcao"](cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migracoes (versao, descricao) VALUES (%s, %s)",
+                    (migracao["versao"], migracao["descricao"]),
+                )
+                conn.commit()
+                aplicadas_agora.append(migracao["versao"])
+                logger.info("Migração %s aplicada: %s", migracao["versao"], migracao["descricao"])
+
+        finally:
+            # Uma falha aqui (ex.: conexão caída) não pode substituir o erro original.
+            # A conexão é descartada do pool: o servidor libera o lock ao encerrar a sessão.
+            try:
+                conn.rollback()
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (_CHAVE_LOCK_MIGRACOES,))
+                conn.commit()
+            except psycopg2.Error:
+                logger.exception("Erro ao liberar o lock das migrações")
+                conn.invalidate()
+
+        return aplicadas_agora
+
+    except psycopg2.Error:
+        logger.exception("Erro de banco ao aplicar migrações (aplicadas nesta execução: %s)", aplicadas_agora)
+        try:
+            if conn and conn.is_valid: conn.rollback()
+        except psycopg2.Error:
+            logger.exception("Erro ao desfazer a transação das migrações")
+        raise
+
+    finally:
+        if conn: conn.close()
+
+def _objetos_do_plano(no):
+    """Índices e tabelas lidos em um nó do EXPLAIN (FORMAT JSON) e em seus filhos."""
+    objetos = {no[chave] for chave in ("Index Name", "Relation Name") if chave in no}
+    for filho in no.get("Plans", ()):
+        objetos |= _objetos_do_plano(filho)
+    return objetos
+
+def _com_particoes(cursor, nome):
+    """O índice/tabela e suas partições (numa tabela particionada o plano cita as partições)."""
+    cursor.execute("""
+        WITH RECURSIVE arvore (oid) AS (
+            SELECT to_regclass(%s)
+            UNION
+            SELECT i.inhrelid FROM pg_inherits i JOIN arvore a ON i.inhparent = a.oid
+        )
+        SELECT c.relname FROM arvore a JOIN pg_class c ON c.oid = a.oid
+    """, (nome,))
+    return {nome} | {relname for (relname,) in cursor.fetchall()}
+
+def verificar_migracoes():
+    """
+    Confere, via EXPLAIN, as verificações das migrações aplicadas.
+
+    O seq scan é desligado durante o EXPLAIN (SET LOCAL enable_seqscan = off):
+    em tabelas pequenas o planejador prefere varrer a tabela, e o que se quer
+    saber aqui é se o índice existe e serve para o caminho de acesso. Índices
+    e tabelas particionados valem também pelas suas partições.
+    Retorna [{"versao", "consulta", "usa", "nao_usa", "ok", "objetos_no_plano"}].
+    """
+    conn = None
+    resultado = []
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        aplicadas = _versoes_aplicadas(cursor)
+        cursor.execute("SET LOCAL enable_seqscan = off")
+
+        for migracao in _MIGRACOES:
+            if migracao["versao"] not in aplicadas:
+                continue
+            for verificacao in migracao.get("verificacoes", ()):
+                valores = {"ano": datetime.date.today().year}
+                consulta = verificacao["consulta"].format(**valores)
+                usa = verificacao.get("usa", "").format(**valores)
+                nao_usa = verificacao.get("nao_usa", "").format(**valores)
+
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {consulta}")
+                plano = cursor.fetchone()[0]
+                plano = json.loads(plano) if isinstance(plano, str) else plano
+                objetos = _objetos_do_plano(plano[0]["Plan"])
+                ok = (not usa or bool(objetos & _com_particoes(cursor, usa))) and \
+                     (not nao_usa or not objetos & _com_particoes(cursor, nao_usa))
+                resultado.append({
+                    "versao": migracao["versao"],
+                    "consulta": consulta,
+                    "usa": usa or None,
+                    "nao_usa": nao_usa or None,
+                    "ok": ok,
+                    "objetos_no_plano": sorted(objetos),
+                })
+        return resultado
+
+    finally:
+        if conn:
+            conn.rollback()
+            conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrações de esquema do AppFinanceiro.")
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--listar", action="store_true", help="lista as migrações e se já foram aplicadas")
+    grupo.add_argument("--verificar", action="store_true", help="confere via EXPLAIN se os índices são usados")
+    parser.add_argument("--opcional", type=int, action="append", default=[], metavar="VERSAO",
+                        help="inclui a migração opcional informada (pode repetir)")
+    args = parser.parse_args()
+
+    if args.listar:
+        for versao, descricao, opcional, aplicada in listar_migracoes():
+            status = "aplicada" if aplicada else "opcional" if opcional else "pendente"
+            print(f"{versao:>4}  {status:<9} {descricao}")
+        return 0
+
+    if args.verificar:
+        falhas = 0
+        for item in verificar_migracoes():
+            esperado = " ".join(filter(None, [item["usa"] and f"usa {item['usa']}", item["nao_usa"] and f"sem {item['nao_usa']}"]))
+            print(f"{'OK' if item['ok'] else 'FALHOU':<7} v{item['versao']} {esperado} "
+                  f"(plano: {', '.join(item['objetos_no_plano'])})")
+            falhas += not item["ok"]
+        return 1 if falhas else 0
+
+    # Opcionais pedidas na linha de comando ou listadas no secrets.toml
+    opcionais = set(args.opcional) | set(st.secrets.get("migracoes", {}).get("opcionais", []))
+    versoes = aplicar_migracoes(opcionais=opcionais)
+    print(f"Migrações aplicadas: {', '.join(map(str, versoes))}" if versoes else "Nenhuma migração pendente.")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
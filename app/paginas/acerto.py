@@ -0,0 +1,4 @@
+"""Página Acerto & Correção (executada por st.navigation só quando selecionada)."""
+from forms import pagina_acerto_controle
+
+pagina_acerto_controle()
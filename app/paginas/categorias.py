@@ -0,0 +1,4 @@
+"""Página Categorias (executada por st.navigation só quando selecionada)."""
+from forms import formulario_categoria
+
+formulario_categoria()
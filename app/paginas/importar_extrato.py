@@ -0,0 +1,4 @@
+"""Página Importar Extrato (executada por st.navigation só quando selecionada)."""
+from importacao import pagina_importacao
+
+pagina_importacao()
@@ -0,0 +1,4 @@
+"""Página Dashboard (executada por st.navigation só quando selecionada)."""
+from dashboard import dashboard
+
+dashboard()
@@ -0,0 +1,4 @@
+"""Página Salário (executada por st.navigation só quando selecionada)."""
+from forms import formulario_salario
+
+formulario_salario()
@@ -0,0 +1,4 @@
+"""Página Subcategorias (executada por st.navigation só quando selecionada)."""
+from forms import formulario_subcategoria
+
+formulario_subcategoria()
@@ -0,0 +1,4 @@
+"""Página Tipos de Transação (executada por st.navigation só quando selecionada)."""
+from forms import formulario_tipo_transacao
+
+formulario_tipo_transacao()
@@ -0,0 +1,4 @@
+"""Página Transação (executada por st.navigation só quando selecionada)."""
+from forms import formulario_transacao
+
+formulario_transacao()
@@ -0,0 +1,4 @@
+"""Página Usuários (executada por st.navigation só quando selecionada)."""
+from forms import formulario_usuario
+
+formulario_usuario()
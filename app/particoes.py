@@ -0,0 +1,403 @@
+"""
+Particionamento de stg_transacoes por ano de dt_datatransacao (opcional).
+
+A conversão é a migração opcional 2 (migracoes.py). Depois dela a tabela tem:
+
+- uma partição por ano (`stg_transacoes_a<ano>`), onde ficam os anos "quentes";
+- uma partição de arquivo (`stg_transacoes_arquivo`, de MINVALUE até o primeiro
+  ano quente) com os anos antigos que estavam quitados ao serem arquivados
+  (manter_particoes confere). Uma transação reaberta depois (cd_foidividido
+  volta a 'N') continua no arquivo e segue editável normalmente;
+- uma partição DEFAULT (`stg_transacoes_padrao`) para anos ainda sem partição.
+
+Consultas com intervalo de datas são podadas pelo Postgres automaticamente. A
+manutenção (cria as partições dos próximos anos e arquiva os anos antigos já
+quitados) roda pela CLI:
+
+    uv run python app/particoes.py                   # manutenção
+    uv run python app/particoes.py --anos-quentes 3  # mantém 3 anos fora do arquivo
+    uv run python app/particoes.py --listar          # partições e linhas
+"""
+import argparse
+import datetime
+import re
+from psycopg2 import sql
+from db import get_connection
+from helpers import logger
+
+_TABELA = "stg_transacoes"
+_PARTICAO_ARQUIVO = "stg_transacoes_arquivo"
+_PARTICAO_PADRAO = "stg_transacoes_padrao"
+_RE_PARTICAO_ANO = re.compile(r"^stg_transacoes_a(\d{4})$")
+# Anos mais recentes que nunca vão para o arquivo (o atual e o anterior).
+_ANOS_QUENTES_PADRAO = 2
+# Anos futuros com partição criada antecipadamente.
+_ANOS_A_FRENTE = 1
+_COLUNA_PARTICAO = "dt_datatransacao"
+_TIPOS_SQL = {"r": "TABLE", "v": "VIEW", "m": "MATERIALIZED VIEW"}
+
+def _nome_particao_ano(ano):
+    return f"stg_transacoes_a{ano}"
+
+def _inicio_ano(ano):
+    return datetime.date(ano, 1, 1)
+
+def esta_particionada(cursor):
+    """Indica se stg_transacoes já é uma tabela particionada."""
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", (_TABELA,))
+    return cursor.fetchone()[0]
+
+def _anos_particionados(cursor):
+    """Anos com partição própria (pela convenção de nome), em ordem crescente."""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%s)",
+        (_TABELA,),
+    )
+    anos = (_RE_PARTICAO_ANO.match(nome) for (nome,) in cursor.fetchall())
+    return sorted(int(m.group(1)) for m in anos if m)
+
+def _dependentes(cursor):
+    """
+    Views e views materializadas que dependem (direta ou indiretamente) de stg_transacoes.
+
+    Retorna [(nome, tipo, definicao, [ddl_indices], [ddl_privilegios])] em ordem de criação.
+    """
+    cursor.execute("""
+        WITH RECURSIVE dependentes (oid, nivel) AS (
+            SELECT r.ev_class, 1
+            FROM pg_depend d JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE d.refobjid = to_regclass(%(tabela)s) AND r.ev_class <> d.refobjid
+            UNION
+            SELECT r.ev_class, dep.nivel + 1
+            FROM dependentes dep
+            JOIN pg_depend d ON d.refobjid = dep.oid
+            JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE r.ev_class <> dep.oid
+        )
+        SELECT c.oid::regclass::text, c.relkind, pg_get_viewdef(c.oid),
+               ARRAY(SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x WHERE x.indrelid = c.oid)
+        FROM dependentes dep JOIN pg_class c ON c.oid = dep.oid
+        GROUP BY c.oid
+        ORDER BY max(dep.nivel), c.oid
+    """, {"tabela": _TABELA})
+    return [(nome, tipo, definicao, indices, _ddl_privilegios(cursor, nome, _TIPOS_SQL[tipo]))
+            for nome, tipo, definicao, indices in cursor.fetchall()]
+
+def _remover_dependentes(cursor, dependentes):
+    """Remove as views dependentes, das mais externas para as mais internas (sem CASCADE)."""
+    for nome, tipo, *_ in reversed(dependentes):
+        cursor.execute(f"DROP {_TIPOS_SQL[tipo]} {nome}")
+
+def _recriar_dependentes(cursor, dependentes):
+    for nome, tipo, definicao, indices, privilegios in dependentes:
+        cursor.execute(f"CREATE {_TIPOS_SQL[tipo]} {nome} AS {definicao}")
+        for ddl in (*indices, *privilegios):
+            cursor.execute(ddl)
+
+def _ddl_privilegios(cursor, relacao, tipo_sql="TABLE"):
+    """Dono e GRANTs (da relação e das colunas) de `relacao`, como comandos para recriá-los."""
+    cursor.execute("""
+        WITH rel AS (SELECT oid, relowner, relacl FROM pg_class WHERE oid = to_regclass(%(relacao)s))
+        SELECT ddl FROM (
+            SELECT 1 AS ordem, format('GRANT %%s ON %%s TO %%s%%s', a.privilege_type, rel.oid::regclass,
+                                      CASE a.grantee WHEN 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(a.grantee)) END,
+                                      CASE WHEN a.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END) AS ddl
+            FROM rel CROSS JOIN LATERAL aclexplode(rel.relacl) a
+            WHERE a.grantee <> rel.relowner
+            UNION ALL
+            SELECT 2, format('GRANT %%s (%%I) ON %%s TO %%s%%s', a.privilege_type, att.attname, rel.oid::regclass,
+                             CASE a.grantee WHEN 0 THEN 'PUBLIC' ELSE quote_ident(pg_get_userbyid(a.grantee)) END,
+                             CASE WHEN a.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END)
+            FROM rel JOIN pg_attribute att ON att.attrelid = rel.oid AND att.attnum > 0
+            CROSS JOIN LATERAL aclexplode(att.attacl) a
+            WHERE a.grantee <> rel.relowner
+            UNION ALL
+            -- O dono por último: depois dele quem executa a migração pode não poder mais conceder.
+            SELECT 3, format('ALTER %%s %%s OWNER TO %%I', %(tipo)s, rel.oid::regclass, pg_get_userbyid(rel.relowner))
+            FROM rel WHERE pg_get_userbyid(rel.relowner) <> current_user
+        ) privilegios
+        ORDER BY ordem
+    """, {"relacao": relacao, "tipo": tipo_sql})
+    return [ddl for (ddl,) in cursor.fetchall()]
+
+def _criar_particao_ano(cursor, ano):
+    """Cria a partição do ano, trazendo da partição DEFAULT as linhas que já caíram lá."""
+    particao = sql.Identifier(_nome_particao_ano(ano))
+    limites = {"inicio": _inicio_ano(ano), "fim": _inicio_ano(ano + 1)}
+    cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)").format(
+        particao, sql.Identifier(_TABELA)
+    ))
+    cursor.execute(sql.SQL(
+        "WITH movidas AS (DELETE FROM {} WHERE dt_datatransacao >= %(inicio)s AND dt_datatransacao < %(fim)s RETURNING *) "
+        "INSERT INTO {} SELECT * FROM movidas"
+    ).format(sql.Identifier(_PARTICAO_PADRAO), particao), limites)
+    cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%(inicio)s) TO (%(fim)s)").format(
+        sql.Identifier(_TABELA), particao
+    ), limites)
+
+def _impedimentos(cursor):
+    """Objetos de stg_transacoes que a conversão não sabe levar para a tabela particionada."""
+    cursor.execute("""
+        SELECT format('FK %%s de %%s', conname, conrelid::regclass) FROM pg_constraint
+        WHERE confrelid = to_regclass(%(tabela)s) AND contype = 'f'
+        UNION ALL
+        SELECT format('EXCLUDE %%s', conname) FROM pg_constraint
+        WHERE conrelid = to_regclass(%(tabela)s) AND contype = 'x'
+        UNION ALL
+        SELECT format('política RLS %%s', polname) FROM pg_policy WHERE polrelid = to_regclass(%(tabela)s)
+    """, {"tabela": _TABELA})
+    impedimentos = [descricao for (descricao,) in cursor.fetchall()]
+    cursor.execute(sql.SQL("SELECT count(*) FROM {} WHERE {} IS NULL").format(
+        sql.Identifier(_TABELA), sql.Identifier(_COLUNA_PARTICAO)
+    ))
+    sem_data = cursor.fetchone()[0]
+    if sem_data:
+        impedimentos.append(f"{sem_data} transação(ões) sem {_COLUNA_PARTICAO} (a coluna entra na chave primária)")
+    return impedimentos
+
+def _ddl_indices(cursor):
+    """
+    Índices de stg_transacoes refeitos para a tabela particionada.
+
+    Numa tabela particionada toda chave única precisa conter a coluna de
+    partição: o PRIMARY KEY (id_transacao) vira PRIMARY KEY (id_transacao,
+    dt_datatransacao) e as demais constraints/índices únicos ganham a coluna
+    no fim. Os outros índices são recriados como estão.
+    """
+    cursor.execute("""
+        SELECT i.relname, x.indisunique, con.contype, pg_get_indexdef(x.indexrelid),
+               ARRAY(SELECT pg_get_indexdef(x.indexrelid, k, true) FROM generate_series(1, x.indnkeyatts) k),
+               pg_get_expr(x.indpred, x.indrelid)
+        FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        LEFT JOIN pg_constraint con ON con.conindid = x.indexrelid AND con.contype IN ('p', 'u')
+        WHERE x.indrelid = to_regclass(%s)
+    """, (_TABELA,))
+    tabela = sql.Identifier(_TABELA)
+    ddls = []
+    for nome, unico, tipo_constraint, ddl_indice, chaves, predicado in cursor.fetchall():
+        if not unico:
+            ddls.append(sql.SQL(ddl_indice))
+            continue
+        if _COLUNA_PARTICAO not in chaves:
+            chaves = [*chaves, _COLUNA_PARTICAO]
+        colunas = sql.SQL(", ").join(sql.SQL(chave) for chave in chaves)
+        if tipo_constraint:
+            ddls.append(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {} ({})").format(
+                tabela, sql.Identifier(nome), sql.SQL("PRIMARY KEY" if tipo_constraint == "p" else "UNIQUE"), colunas
+            ))
+        else:
+            ddls.append(sql.SQL("CREATE UNIQUE INDEX {} ON {} ({}){}").format(
+                sql.Identifier(nome), tabela, colunas,
+                sql.SQL(f" WHERE {predicado}" if predicado else ""),
+            ))
+    return ddls
+
+def _ddl_fks_e_gatilhos(cursor):
+    """FKs de saída, gatilhos de usuário e comentário de stg_transacoes, como comandos para recriá-los."""
+    cursor.execute("""
+        SELECT format('ALTER TABLE %%I ADD CONSTRAINT %%I %%s', %(tabela)s, conname, pg_get_constraintdef(oid))
+        FROM pg_constraint WHERE conrelid = to_regclass(%(tabela)s) AND contype = 'f'
+        UNION ALL
+        SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = to_regclass(%(tabela)s) AND NOT tgisinternal
+        UNION ALL
+        -- LIKE ... INCLUDING COMMENTS copia os comentários das colunas, não o da tabela
+        SELECT format('COMMENT ON TABLE %%I IS %%L', %(tabela)s, obj_description(to_regclass(%(tabela)s), 'pg_class'))
+        WHERE obj_description(to_regclass(%(tabela)s), 'pg_class') IS NOT NULL
+    """, {"tabela": _TABELA})
+    return [ddl for (ddl,) in cursor.fetchall()]
+
+def particionar_transacoes(cursor):
+    """
+    Converte stg_transacoes em tabela particionada por ano (migração opcional 2).
+
+    Roda dentro da transação da migração: cria a tabela particionada com a
+    mesma definição (LIKE ... INCLUDING ALL, exceto os índices), copia os
+    dados, troca as tabelas e recria índices, chaves (_ddl_indices), FKs,
+    gatilhos, privilégios, a sequência e as views (comuns e materializadas)
+    dependentes. Nada é removido em cascata: as views são removidas uma a uma
+    e a tabela antiga com DROP simples, que falha se ainda houver dependentes.
+    Se houver algo que a conversão não sabe recriar (FKs que apontam para a
+    tabela, EXCLUDE, políticas RLS, datas nulas), aborta antes de alterar o banco.
+    """
+    if esta_particionada(cursor):
+        return
+
+    impedimentos = _impedimentos(cursor)
+    if impedimentos:
+        raise RuntimeError(
+            f"Não é possível particionar {_TABELA} automaticamente; ajuste antes de aplicar a migração 2: "
+            + "; ".join(impedimentos)
+        )
+
+    cursor.execute(sql.SQL(
+        "SELECT extract(year FROM min({coluna}))::int, extract(year FROM max({coluna}))::int FROM {tabela}"
+    ).format(coluna=sql.Identifier(_COLUNA_PARTICAO), tabela=sql.Identifier(_TABELA)))
+    ano_atual = datetime.date.today().year
+    ano_min, ano_max = cursor.fetchone()
+    ano_min = min(ano_min or ano_atual, ano_atual)
+    ano_max = max(ano_max or ano_atual, ano_atual + _ANOS_A_FRENTE)
+
+    dependentes = _dependentes(cursor)
+    indices = _ddl_indices(cursor)
+    fks_e_gatilhos = _ddl_fks_e_gatilhos(cursor)
+    privilegios = _ddl_privilegios(cursor, _TABELA)
+    cursor.execute("""
+        SELECT pg_get_serial_sequence(%(tabela)s, 'id_transacao'),
+               (SELECT attidentity <> '' FROM pg_attribute
+                WHERE attrelid = to_regclass(%(tabela)s) AND attname = 'id_transacao')
+    """, {"tabela": _TABELA})
+    sequencia, identidade = cursor.fetchone()
+
+    # Os índices entram depois, já com as chaves únicas incluindo a coluna de partição.
+    nova = sql.Identifier(f"{_TABELA}_particionada")
+    cursor.execute(sql.SQL(
+        "CREATE TABLE {} (LIKE {} INCLUDING ALL EXCLUDING INDEXES) PARTITION BY RANGE ({})"
+    ).format(nova, sql.Identifier(_TABELA), sql.Identifier(_COLUNA_PARTICAO)))
+    cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (MINVALUE) TO (%s)").format(
+        sql.Identifier(_PARTICAO_ARQUIVO), nova
+    ), (_inicio_ano(ano_min),))
+    for ano in range(ano_min, ano_max + 1):
+        cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+            sql.Identifier(_nome_particao_ano(ano)), nova
+        ), (_inicio_ano(ano), _inicio_ano(ano + 1)))
+    cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} DEFAULT").format(sql.Identifier(_PARTICAO_PADRAO), nova))
+
+    cursor.execute(sql.SQL("INSERT INTO {} OVERRIDING SYSTEM VALUE SELECT * FROM {}").format(nova, sql.Identifier(_TABELA)))
+
+    # A sequência de um serial pertence à coluna antiga e seria removida junto com a tabela.
+    if sequencia and not identidade:
+        cursor.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY NONE").format(sql.SQL(sequencia)))
+    _remover_dependentes(cursor, dependentes)
+    cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(_TABELA)))
+    cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(nova, sql.Identifier(_TABELA)))
+    if sequencia and not identidade:
+        cursor.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.id_transacao").format(sql.SQL(sequencia), sql.Identifier(_TABELA)))
+    elif identidade:
+        cursor.execute(sql.SQL(
+            "SELECT setval(pg_get_serial_sequence(%(tabela)s, 'id_transacao'), coalesce(max(id_transacao), 0) + 1, false) FROM {}"
+        ).format(sql.Identifier(_TABELA)), {"tabela": _TABELA})
+
+    # Índices, chaves e gatilhos criados no parent valem para todas as partições (atuais e futuras).
+    for ddl in (*indices, *fks_e_gatilhos, *privilegios):
+        cursor.execute(ddl)
+
+    _recriar_dependentes(cursor, dependentes)
+    logger.info("stg_transacoes particionada por ano (%s a %s), %s view(s) recriada(s)", ano_min, ano_max, len(dependentes))
+
+def garantir_particoes(cursor, anos_a_frente=_ANOS_A_FRENTE):
+    """Cria as partições que faltam do ano atual até `anos_a_frente` anos adiante; retorna os anos criados."""
+    existentes = set(_anos_particionados(cursor))
+    ano_atual = datetime.date.today().year
+    criados = [ano for ano in range(ano_atual, ano_atual + anos_a_frente + 1) if ano not in existentes]
+    for ano in criados:
+        _criar_particao_ano(cursor, ano)
+    return criados
+
+def _arquivar_ano(cursor, ano):
+    """
+    Move o ano (o mais antigo fora do arquivo) para a partição de arquivo, estendendo o limite dela.
+
+    Retorna False, sem mover nada (a transação deve ser desfeita), se o ano
+    tiver transação pendente de acerto.
+    """
+    tabela, arquivo, particao = (sql.Identifier(n) for n in (_TABELA, _PARTICAO_ARQUIVO, _nome_particao_ano(ano)))
+    cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(tabela, arquivo))
+    cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(tabela, particao))
+    # Conferido com a partição já destacada (lock exclusivo): nenhuma edição entra no meio.
+    cursor.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {} WHERE cd_foidividido = 'N')").format(particao))
+    if cursor.fetchone()[0]:
+        return False
+    cursor.execute(sql.SQL("INSERT INTO {} SELECT * FROM {}").format(arquivo, particao))
+    cursor.execute(sql.SQL("DROP TABLE {}").format(particao))
+    cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (MINVALUE) TO (%s)").format(
+        tabela, arquivo
+    ), (_inicio_ano(ano + 1),))
+    return True
+
+def manter_particoes(anos_quentes=_ANOS_QUENTES_PADRAO, anos_a_frente=_ANOS_A_FRENTE):
+    """
+    Job de manutenção: cria as partições dos próximos anos e arquiva os anos antigos quitados.
+
+    Um ano vai para o arquivo quando está fora dos `anos_quentes` mais recentes
+    e não tem nenhuma transação pendente (cd_foidividido = 'N'). O arquivo cobre
+    um intervalo contínuo desde MINVALUE, então o processo para no primeiro ano
+    ainda com pendências. Cada ano arquivado é um commit próprio.
+
+    Retorna {"criados": [...], "arquivados": [...]} (None se a tabela não é particionada).
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        if not esta_particionada(cursor):
+            logger.info("stg_transacoes não é particionada; aplique a migração opcional 2 antes")
+            return None
+
+        criados = garantir_particoes(cursor, anos_a_frente)
+        conn.commit()
+
+        arquivados = []
+        ultimo_ano_frio = datetime.date.today().year - anos_quentes
+        for ano in _anos_particionados(cursor):
+            if ano > ultimo_ano_frio:
+                break
+            if not _arquivar_ano(cursor, ano):
+                conn.rollback()
+                logger.info("Arquivamento parou em %s: há transações pendentes de acerto", ano)
+                break
+            conn.commit()
+            arquivados.append(ano)
+            logger.info("Ano %s movido para a partição de arquivo", ano)
+
+        return {"criados": criados, "arquivados": arquivados}
+
+    except Exception:
+        logger.exception("Erro na manutenção das partições de stg_transacoes")
+        if conn: conn.rollback()
+        raise
+
+    finally:
+        if conn: conn.close()
+
+def listar_particoes():
+    """Retorna [(particao, limites, linhas)] de stg_transacoes ([] se não particionada)."""
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        if not esta_particionada(cursor):
+            return []
+        cursor.execute("""
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            ORDER BY c.relname
+        """, (_TABELA,))
+        return cursor.fetchall()
+
+    finally:
+        if conn:
+            conn.rollback()
+            conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Manutenção das partições anuais de stg_transacoes.")
+    parser.add_argument("--listar", action="store_true", help="lista as partições e as linhas estimadas")
+    parser.add_argument("--anos-quentes", type=int, default=_ANOS_QUENTES_PADRAO,
+                        help=f"anos mais recentes que ficam fora do arquivo (padrão: {_ANOS_QUENTES_PADRAO})")
+    args = parser.parse_args()
+
+    if args.listar:
+        for particao, limites, linhas in listar_particoes():
+            print(f"{particao:<28} {limites:<70} ~{max(linhas, 0)} linhas")
+        return 0
+
+    resultado = manter_particoes(anos_quentes=args.anos_quentes)
+    if resultado is None:
+        print("stg_transacoes não é particionada (migração opcional 2 não aplicada).")
+        return 1
+    print(f"Partições criadas: {resultado['criados'] or 'nenhuma'} · anos arquivados: {resultado['arquivados'] or 'nenhum'}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,311 @@
+"""
+Perfilador de renderização: onde vai o tempo de cada execução (rerun) da página.
+
+Ativado por query param (`?perfil=1`, só para administradores) ou para todos
+com `[perfilador].ativo = true` no secrets.toml. Registra numa linha do tempo:
+
+- as seções marcadas com `secao()` (main.py marca sidebar, diagnóstico e página);
+- cada st.plotly_chart / st.dataframe / st.data_editor (serialização do Streamlit),
+  envolvidos só enquanto há algum perfil em andamento;
+- cada consulta SQL medida em db.py (via registrar_ouvinte_consulta).
+
+O tempo de uma seção que não aparece nos itens internos é código Python da
+própria página (pandas, montagem das figuras Plotly). Com `?perfil=cprofile` ou
+`?perfil=pyinstrument` a página também roda sob o profiler correspondente
+(pyinstrument é o extra opcional "perfil"). Cada execução é gravada em
+`[perfilador].diretorio` (JSON da linha do tempo + .prof/.html do profiler) e a
+cascata aparece na sidebar.
+"""
+from contextlib import contextmanager
+import cProfile
+import datetime
+import functools
+import io
+import json
+from pathlib import Path
+import pstats
+import re
+import threading
+import time
+import pandas as pd
+import streamlit as st
+from streamlit.delta_generator import DeltaGenerator
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from db import registrar_ouvinte_consulta
+from diagnostico import usuario_eh_administrador
+from helpers import logger
+
+try:
+    import pyinstrument
+except ImportError:  # extra opcional "perfil"
+    pyinstrument = None
+
+_MODOS_PERFIL = ("secoes", "cprofile", "pyinstrument")
+_DIRETORIO_PADRAO = ".cache/perfis"
+# Elementos do Streamlit medidos individualmente (tempo de serialização)
+_ELEMENTOS_MEDIDOS = ("plotly_chart", "dataframe", "data_editor")
+_LINHAS_CPROFILE = 25
+
+class _Perfil:
+    """Linha do tempo de uma execução do script (thread-safe: consultas podem vir de outras threads)."""
+
+    def __init__(self, modo):
+        self.modo = modo
+        self.inicio = time.perf_counter()
+        self.criado_em = datetime.datetime.now()
+        self.lock = threading.Lock()
+        self.itens = []
+        self.pilha = []
+        self.pagina = None
+        self.arquivo_profiler = None
+        self.resumo_profiler = None
+
+    def agora_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def registrar(self, tipo, nome, inicio_ms, duracao_ms, **extras):
+        with self.lock:
+            self.itens.append({
+                "tipo": tipo, "nome": nome, "nivel": len(self.pilha),
+                "inicio_ms": round(inicio_ms, 2), "duracao_ms": round(duracao_ms, 2), **extras,
+            })
+
+    def resumo(self):
+        """Tempo total e tempo por tipo de item (seções só no primeiro nível, para não contar em dobro)."""
+        with self.lock:
+            itens = list(self.itens)
+        por_tipo = {}
+        for item in itens:
+            if item["tipo"] != "secao" or item["nivel"] == 0:
+                por_tipo[item["tipo"]] = por_tipo.get(item["tipo"], 0.0) + item["duracao_ms"]
+        return {"total_ms": round(self.agora_ms(), 2), "por_tipo_ms": {k: round(v, 2) for k, v in por_tipo.items()}}
+
+# Perfis em andamento, por sessão. As threads de consultar_varios carregam o
+# contexto da sessão, então as consultas delas caem no perfil certo.
+_perfis = {}
+
+def _id_sessao():
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else None
+
+def perfil_atual():
+    """Perfil da execução em andamento nesta sessão, ou None se o perfilador está desligado."""
+    return _perfis.get(_id_sessao())
+
+def _modo_solicitado():
+    """Modo pedido via query param (administradores) ou secrets; None se desligado."""
+    config = st.secrets.get("perfilador", {})
+    valor = st.query_params.get("perfil")
+    if valor is not None and usuario_eh_administrador():
+        modo = "secoes" if valor in ("", "1", "true") else valor
+    elif config.get("ativo", False):
+        modo = config.get("modo", "secoes")
+    else:
+        return None
+    if modo not in _MODOS_PERFIL:
+        logger.warning("Modo de perfil inválido: %r (use %s)", modo, ", ".join(_MODOS_PERFIL))
+        return "secoes"
+    if modo == "pyinstrument" and pyinstrument is None:
+        logger.warning("pyinstrument não está instalado (uv sync --extra perfil); usando só as seções")
+        return "secoes"
+    return modo
+
+@contextmanager
+def perfilar_execucao():
+    """Envolve uma execução inteira do script; ao final grava o perfil em disco."""
+    id_sessao = _id_sessao()
+    modo = _modo_solicitado() if id_sessao else None
+    if modo is None:
+        yield None
+        return
+
+    perfil = _Perfil(modo)
+    _perfis[id_sessao] = perfil
+    _instalar_medicao_elementos()
+    try:
+        yield perfil
+    finally:
+        _remover_medicao_elementos()
+        _perfis.pop(id_sessao, None)
+        _gravar_perfil(perfil)
+
+@contextmanager
+def secao(nome):
+    """Marca uma seção na linha do tempo (no-op sem perfil ativo)."""
+    perfil = perfil_atual()
+    if perfil is None:
+        yield
+        return
+
+    inicio_ms = perfil.agora_ms()
+    nivel = len(perfil.pilha)
+    perfil.pilha.append(nome)
+    try:
+        yield
+    finally:
+        perfil.pilha.pop()
+        with perfil.lock:
+            perfil.itens.append({
+                "tipo": "secao", "nome": nome, "nivel": nivel,
+                "inicio_ms": round(inicio_ms, 2), "duracao_ms": round(perfil.agora_ms() - inicio_ms, 2),
+            })
+
+@contextmanager
+def perfilar_pagina(nome):
+    """Seção da página selecionada; no modo cprofile/pyinstrument, roda sob o profiler."""
+    perfil = perfil_atual()
+    if perfil is None:
+        yield
+        return
+
+    perfil.pagina = nome
+    if perfil.modo == "cprofile":
+        profiler = cProfile.Profile()
+    elif perfil.modo == "pyinstrument":
+        profiler = pyinstrument.Profiler()
+    else:
+        profiler = None
+
+    with secao(f"Página: {nome}"):
+        if profiler is None:
+            yield
+            return
+        if perfil.modo == "pyinstrument":
+            profiler.start()
+        else:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if perfil.modo == "pyinstrument":
+                profiler.stop()
+                perfil.resumo_profiler = profiler.output_text(unicode=True, color=False)
+                perfil.arquivo_profiler = ("html", profiler.output_html())
+            else:
+                profiler.disable()
+                saida = io.StringIO()
+                pstats.Stats(profiler, stream=saida).sort_stats("cumulative").print_stats(_LINHAS_CPROFILE)
+                perfil.resumo_profiler = saida.getvalue()
+                perfil.arquivo_profiler = ("prof", profiler)
+
+def _medir_elemento(nome, funcao):
+    @functools.wraps(funcao)
+    def medido(*args, **kwargs):
+        perfil = perfil_atual()
+        if perfil is None:
+            return funcao(*args, **kwargs)
+        inicio_ms = perfil.agora_ms()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            perfil.registrar("streamlit", f"st.{nome}", inicio_ms, perfil.agora_ms() - inicio_ms)
+    return medido
+
+# Medição dos elementos: instalada no primeiro perfil em andamento e removida
+# quando o último termina (perfis de sessões diferentes podem se sobrepor).
+_medicao = {"lock": threading.Lock(), "perfis_ativos": 0, "originais": {}}
+
+def _instalar_medicao_elementos():
+    """Envolve st.plotly_chart/dataframe/data_editor (sessões sem perfil só repassam a chamada)."""
+    with _medicao["lock"]:
+        _medicao["perfis_ativos"] += 1
+        if _medicao["perfis_ativos"] > 1:
+            return
+        for nome in _ELEMENTOS_MEDIDOS:
+            # st.<elemento> é um método já vinculado ao container principal: envolve os dois
+            for alvo in (DeltaGenerator, st):
+                original = getattr(alvo, nome)
+                _medicao["originais"][(alvo, nome)] = original
+                setattr(alvo, nome, _medir_elemento(nome, original))
+
+def _remover_medicao_elementos():
+    """Restaura os elementos originais quando não há mais perfil em andamento."""
+    with _medicao["lock"]:
+        _medicao["perfis_ativos"] -= 1
+        if _medicao["perfis_ativos"] > 0:
+            return
+        for (alvo, nome), original in _medicao["originais"].items():
+            setattr(alvo, nome, original)
+        _medicao["originais"].clear()
+
+def _ao_registrar_consulta(fingerprint, sql, duracao_ms, linhas, bytes_):
+    perfil = perfil_atual()
+    if perfil is None:
+        return
+    perfil.registrar("sql", sql, perfil.agora_ms() - duracao_ms, duracao_ms,
+                     fingerprint=fingerprint, linhas=linhas, bytes=bytes_)
+
+registrar_ouvinte_consulta(_ao_registrar_consulta)
+
+def _gravar_perfil(perfil):
+    """Grava <diretorio>/<data>_<pagina>.json (e o .prof/.html do profiler, se houver)."""
+    diretorio = Path(st.secrets.get("perfilador", {}).get("diretorio", _DIRETORIO_PADRAO))
+    pagina = re.sub(r"\W+", "_", perfil.pagina or "sem_pagina").strip("_").lower()
+    base = diretorio / f"{perfil.criado_em:%Y%m%d_%H%M%S_%f}_{pagina}"
+    try:
+        diretorio.mkdir(parents=True, exist_ok=True)
+        with perfil.lock:
+            itens = sorted(perfil.itens, key=lambda item: item["inicio_ms"])
+        conteudo = {
+            "criado_em": perfil.criado_em.isoformat(timespec="seconds"),
+            "pagina": perfil.pagina,
+            "modo": perfil.modo,
+            **perfil.resumo(),
+            "itens": itens,
+        }
+        base.with_suffix(".json").write_text(json.dumps(conteudo, ensure_ascii=False, indent=2), encoding="utf-8")
+        if perfil.arquivo_profiler:
+            extensao, dados = perfil.arquivo_profiler
+            if extensao == "prof":
+                dados.dump_stats(base.with_suffix(".prof"))
+            else:
+                base.with_suffix(".html").write_text(dados, encoding="utf-8")
+    except OSError:
+        logger.exception("Não foi possível gravar o perfil em %s", diretorio)
+
+_CORES_TIPO = {"secao": "#9aa5b1", "sql": "#e4572e", "streamlit": "#4c78a8"}
+
+def _figura_cascata(df):
+    import plotly.graph_objects as go  # só quando o perfil é exibido
+
+    fig = go.Figure(go.Bar(
+        y=[f"{'  ' * nivel}{nome[:40]}" for nome, nivel in zip(df["nome"], df["nivel"])],
+        x=df["duracao_ms"],
+        base=df["inicio_ms"],
+        orientation="h",
+        marker_color=[_CORES_TIPO.get(tipo, "#999") for tipo in df["tipo"]],
+        hovertext=df["nome"],
+        hovertemplate="%{hovertext}<br>início %{base:.1f} ms · %{x:.1f} ms<extra></extra>",
+    ))
+    fig.update_yaxes(autorange="reversed", tickfont={"size": 9})
+    fig.update_layout(height=max(200, 18 * len(df) + 60), margin={"l": 0, "r": 0, "t": 10, "b": 0},
+                      xaxis_title="ms desde o início da execução")
+    return fig
+
+def painel_perfil():
+    """Exibe na sidebar a cascata da execução atual (chamar ao final do script)."""
+    perfil = perfil_atual()
+    if perfil is None:
+        return
+
+    with st.expander("⏱️ Perfil desta execução", expanded=True):
+        resumo = perfil.resumo()
+        por_tipo = resumo["por_tipo_ms"]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total", f"{resumo['total_ms']:.0f} ms")
+        col2.metric("SQL", f"{por_tipo.get('sql', 0):.0f} ms")
+        col3.metric("Streamlit", f"{por_tipo.get('streamlit', 0):.0f} ms",
+                    help="st.plotly_chart / st.dataframe / st.data_editor")
+
+        with perfil.lock:
+            df = pd.DataFrame(perfil.itens)
+        if df.empty:
+            st.caption("Nenhuma seção registrada.")
+            return
+        df = df.sort_values("inicio_ms", kind="stable").reset_index(drop=True)
+        st.plotly_chart(_figura_cascata(df), use_container_width=True, config={"displayModeBar": False})
+        st.caption("Cinza: seções · vermelho: SQL · azul: elementos Streamlit. "
+                   "O restante do tempo de uma seção é Python da página (pandas, figuras).")
+        if perfil.resumo_profiler:
+            st.caption(f"Saída do {perfil.modo} (página):")
+            st.code(perfil.resumo_profiler, language=None)
@@ -0,0 +1,56 @@
+"""
+Fixtures da suíte de benchmarks (pytest-benchmark).
+
+Os benchmarks rodam sobre dados sintéticos (dados_sinteticos.py), sem banco e
+sem servidor Streamlit: fora de `streamlit run` as chamadas st.* não têm
+sessão e não renderizam nada, mas as figuras Plotly e os DataFrames são
+montados normalmente. As escalas (linhas de stg_transacoes) vêm de
+--escalas, ex.: `uv run pytest benchmarks --escalas 10000,100000,1000000`.
+"""
+import datetime
+from pathlib import Path
+import sys
+import pytest
+from streamlit import logger as st_logger
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+import analitico
+import db
+from dados_sinteticos import gerar_dados
+
+_ESCALAS_PADRAO = "10000,100000"
+
+def pytest_addoption(parser):
+    parser.addoption("--escalas", default=_ESCALAS_PADRAO,
+                     help=f"linhas de stg_transacoes, separadas por vírgula (padrão: {_ESCALAS_PADRAO})")
+
+def pytest_generate_tests(metafunc):
+    if "escala" in metafunc.fixturenames:
+        escalas = [int(valor) for valor in metafunc.config.getoption("escalas").split(",")]
+        metafunc.parametrize("escala", escalas, scope="session", ids=lambda n: f"{n:_}")
+
+@pytest.fixture(scope="session", autouse=True)
+def _silenciar_streamlit():
+    # Sem sessão, cada st.* loga um aviso de "missing ScriptRunContext"
+    st_logger.set_log_level("error")
+
+@pytest.fixture(scope="session")
+def hoje():
+    return datetime.date.today()
+
+@pytest.fixture(scope="session")
+def dados(escala, hoje):
+    """Tabelas sintéticas com os tipos aplicados pelo app na leitura (db._aplicar_esquema)."""
+    return {
+        relacao: db._aplicar_esquema(df, relacao)
+        for relacao, df in gerar_dados(escala, semente=42, hoje=hoje).items()
+    }
+
+@pytest.fixture(scope="session")
+def cubo(dados):
+    return analitico.cubo_mensal(dados["stg_transacoes"], "pandas")
+
+@pytest.fixture(scope="session")
+def salario(dados):
+    return analitico.salario_mensal(dados["fact_salario"], "pandas")
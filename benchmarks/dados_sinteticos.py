@@ -0,0 +1,212 @@
+"""
+Gerador de dados sintéticos do AppFinanceiro (dim_*, stg_transacoes, fact_salario).
+
+Os dados imitam o uso real de um casal: despesas fixas mensais (aluguel,
+contas, assinaturas) lançadas também nos meses futuros, como agendamentos;
+despesas variáveis com frequência e valor típicos de cada subcategoria, só
+até a data de referência; receitas avulsas; e dois salários por mês. A mesma
+semente e a mesma data de referência geram sempre os mesmos dados.
+
+As colunas e tipos são os das tabelas no banco, antes do esquema de
+db._aplicar_esquema. Para gravar em Parquet, no layout que
+`python app/analitico.py <dir>` lê:
+
+    uv run python benchmarks/dados_sinteticos.py --transacoes 100000 --saida .cache/sinteticos
+"""
+import argparse
+import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+USUARIOS = ("Ana", "Beto")
+
+# Tipo -> categoria -> subcategoria -> (modo, frequência, valor mediano).
+# "fixa": um lançamento por mês, no dia indicado pela frequência, também nos
+#         meses futuros (agendado); o valor varia pouco.
+# "variavel": peso relativo no sorteio das transações avulsas; valor log-normal.
+TAXONOMIA = {
+    "Receita": {
+        "Trabalho": {"Freela": ("variavel", 1, 450.0), "Bônus": ("variavel", 0.2, 900.0)},
+        "Investimentos": {"Dividendos": ("fixa", 15, 60.0), "Juros": ("fixa", 1, 25.0)},
+    },
+    "Despesas": {
+        "Alimentação": {
+            "Mercado": ("variavel", 30, 55.0),
+            "Restaurante": ("variavel", 12, 38.0),
+            "Padaria": ("variavel", 18, 7.5),
+        },
+        "Residência": {
+            "Aluguel": ("fixa", 5, 1250.0),
+            "Condomínio": ("fixa", 10, 95.0),
+            "Luz": ("fixa", 12, 70.0),
+            "Água": ("fixa", 12, 35.0),
+            "Internet": ("fixa", 8, 45.0),
+            "Manutenção": ("variavel", 1, 80.0),
+        },
+        "Transporte": {
+            "Combustível": ("variavel", 6, 60.0),
+            "Transporte público": ("variavel", 10, 4.0),
+            "Oficina": ("variavel", 0.3, 250.0),
+        },
+        "Saúde": {
+            "Plano de saúde": ("fixa", 1, 180.0),
+            "Farmácia": ("variavel", 3, 22.0),
+            "Consultas": ("variavel", 0.6, 90.0),
+        },
+        "Lazer": {
+            "Assinaturas": ("fixa", 20, 28.0),
+            "Cinema": ("variavel", 1.5, 24.0),
+            "Viagem": ("variavel", 0.4, 420.0),
+        },
+        "Educação": {"Cursos": ("variavel", 0.3, 150.0), "Livros": ("variavel", 0.8, 20.0)},
+        "Vestuário": {"Roupas": ("variavel", 1.2, 45.0), "Calçados": ("variavel", 0.4, 70.0)},
+    },
+}
+
+def _dimensoes():
+    tipos, categorias, subcategorias = [], [], []
+    for tipo, cats in TAXONOMIA.items():
+        tipos.append({"id_tipotransacao": len(tipos) + 1, "dsc_tipotransacao": tipo})
+        for categoria, subs in cats.items():
+            categorias.append({
+                "id_categoria": len(categorias) + 1,
+                "id_tipotransacao": len(tipos),
+                "dsc_categoriatransacao": categoria,
+            })
+            for subcategoria, (modo, frequencia, valor) in subs.items():
+                subcategorias.append({
+                    "id_subcategoria": len(subcategorias) + 1,
+                    "id_categoria": len(categorias),
+                    "dsc_subcategoriatransacao": subcategoria,
+                    "id_tipotransacao": len(tipos),
+                    "dsc_tipotransacao": tipo,
+                    "dsc_categoriatransacao": categoria,
+                    "modo": modo,
+                    "frequencia": frequencia,
+                    "valor": valor,
+                })
+    return pd.DataFrame(tipos), pd.DataFrame(categorias), pd.DataFrame(subcategorias)
+
+def _inicio_mes(data, meses):
+    """Primeiro dia do mês `meses` meses depois (ou antes) de `data`."""
+    indice = data.year * 12 + data.month - 1 + meses
+    return datetime.date(indice // 12, indice % 12 + 1, 1)
+
+def gerar_dados(n_transacoes=10_000, semente=42, hoje=None, anos=3, meses_futuros=12):
+    """
+    Gera um conjunto de dados completo e consistente entre as tabelas.
+
+    `n_transacoes` é o total de linhas de stg_transacoes: os lançamentos fixos
+    (um por mês e subcategoria, de `anos` anos atrás até `meses_futuros`
+    meses à frente) e o restante em transações variáveis até `hoje`.
+    Retorna {relacao: DataFrame} com dim_tipotransacao, dim_categoria,
+    dim_subcategoria, dim_usuario, stg_transacoes e fact_salario.
+    """
+    rng = np.random.default_rng(semente)
+    hoje = hoje or datetime.date.today()
+    df_tipos, df_categorias, df_subs = _dimensoes()
+
+    inicio = _inicio_mes(hoje, -12 * anos)
+    meses = pd.date_range(inicio, _inicio_mes(hoje, meses_futuros), freq="MS")
+    df_usuarios = pd.DataFrame({
+        "id_usuario": np.arange(1, len(USUARIOS) + 1),
+        "dsc_nome": list(USUARIOS),
+        "login": [nome.lower() for nome in USUARIOS],
+        "senha": "!",  # sem hash válido: os usuários sintéticos não fazem login
+    })
+
+    # Fixas: subcategoria x mês, no dia da "frequência", com reajuste lento do valor
+    df_fixas_sub = df_subs[df_subs["modo"] == "fixa"]
+    n_fixas = min(len(df_fixas_sub) * len(meses), n_transacoes)
+    fixas = df_fixas_sub.loc[df_fixas_sub.index.repeat(len(meses))].head(n_fixas).reset_index(drop=True)
+    posicao_mes = np.tile(np.arange(len(meses)), len(df_fixas_sub))[:n_fixas]
+    dias = np.minimum(fixas["frequencia"].to_numpy().astype(int), 28) - 1
+    fixas["dt_datatransacao"] = meses[posicao_mes] + pd.to_timedelta(dias, unit="D")
+    reajuste = 1 + 0.04 * posicao_mes / 12
+    fixas["vl_transacao"] = fixas["valor"] * reajuste * rng.normal(1, 0.05, n_fixas)
+
+    # Variáveis: subcategoria sorteada pelo peso, data uniforme até hoje, valor log-normal
+    df_var_sub = df_subs[df_subs["modo"] == "variavel"]
+    n_variaveis = n_transacoes - n_fixas
+    pesos = df_var_sub["frequencia"].to_numpy(float)
+    escolhidas = rng.choice(len(df_var_sub), size=n_variaveis, p=pesos / pesos.sum())
+    variaveis = df_var_sub.iloc[escolhidas].reset_index(drop=True)
+    dias_historico = (hoje - inicio).days + 1
+    variaveis["dt_datatransacao"] = pd.Timestamp(inicio) + pd.to_timedelta(
+        rng.integers(0, dias_historico, n_variaveis), unit="D")
+    variaveis["vl_transacao"] = variaveis["valor"] * rng.lognormal(0, 0.6, n_variaveis)
+
+    df = pd.concat([fixas, variaveis], ignore_index=True)
+    df = df.sort_values("dt_datatransacao", kind="stable").reset_index(drop=True)
+    n = len(df)
+
+    usuario = rng.integers(0, len(USUARIOS), n)
+    pagador = np.where(rng.random(n) < 0.8, usuario, 1 - usuario)
+    despesa = (df["dsc_tipotransacao"] == "Despesas").to_numpy()
+    dividida = despesa & (rng.random(n) < 0.6)
+    # Divididas ficam pendentes de acerto nos últimos ~2 meses; antes disso, acertadas
+    recente = (df["dt_datatransacao"] >= pd.Timestamp(_inicio_mes(hoje, -1))).to_numpy()
+    acertada = ~dividida | (~recente & (rng.random(n) < 0.98))
+
+    df_transacoes = pd.DataFrame({
+        "id_transacao": np.arange(1, n + 1),
+        "dt_datatransacao": df["dt_datatransacao"].dt.date,
+        "id_tipotransacao": df["id_tipotransacao"],
+        "dsc_tipotransacao": df["dsc_tipotransacao"],
+        "id_categoria": df["id_categoria"],
+        "dsc_categoriatransacao": df["dsc_categoriatransacao"],
+        "id_subcategoria": df["id_subcategoria"],
+        "dsc_subcategoriatransacao": df["dsc_subcategoriatransacao"],
+        "id_usuario": usuario + 1,
+        "dsc_nomeusuario": np.array(USUARIOS)[usuario],
+        "dsc_transacao": df["dsc_subcategoriatransacao"] + " #" + pd.Series(np.arange(1, n + 1)).astype(str),
+        "vl_transacao": df["vl_transacao"].round(2),
+        "cd_quempagou": np.array(USUARIOS)[pagador],
+        "cd_edividido": np.where(dividida, "S", "N"),
+        "cd_foidividido": np.where(acertada, "S", "N"),
+    })
+
+    # Salários: um por usuário e mês passado, no 5º dia, com reajuste anual
+    meses_passados = meses[meses <= pd.Timestamp(hoje)]
+    base = np.array([2600.0, 2300.0])[: len(USUARIOS)]
+    df_salario = pd.DataFrame([
+        {
+            "id_usuario": i + 1,
+            "vl_salario": round(base[i] * 1.03 ** (mes.year - inicio.year), 2),
+            "dt_recebimento": (mes + pd.Timedelta(days=4)).date(),
+            "dsc_observacao": "Salário",
+        }
+        for mes in meses_passados for i in range(len(USUARIOS))
+    ])
+    df_salario.insert(0, "id_salario", np.arange(1, len(df_salario) + 1))
+
+    return {
+        "dim_tipotransacao": df_tipos,
+        "dim_categoria": df_categorias.assign(dt_criacao=pd.Timestamp(inicio)),
+        "dim_subcategoria": df_subs[["id_subcategoria", "id_categoria", "dsc_subcategoriatransacao"]]
+            .assign(dt_criacao=pd.Timestamp(inicio)),
+        "dim_usuario": df_usuarios,
+        "stg_transacoes": df_transacoes,
+        "fact_salario": df_salario,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos do AppFinanceiro em Parquet.")
+    parser.add_argument("--transacoes", type=int, default=10_000, help="linhas de stg_transacoes")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--hoje", type=datetime.date.fromisoformat, default=None,
+                        help="data de referência (AAAA-MM-DD); padrão: hoje")
+    parser.add_argument("--anos", type=int, default=3, help="anos de histórico")
+    parser.add_argument("--saida", type=Path, required=True, help="diretório dos arquivos <relacao>.parquet")
+    args = parser.parse_args()
+
+    dados = gerar_dados(args.transacoes, semente=args.semente, hoje=args.hoje, anos=args.anos)
+    args.saida.mkdir(parents=True, exist_ok=True)
+    for relacao, df in dados.items():
+        df.to_parquet(args.saida / f"{relacao}.parquet", index=False)
+        print(f"{relacao}: {len(df)} linhas")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,78 @@
+"""
+Benchmarks dos caminhos de processamento do dashboard.
+
+    uv run pytest benchmarks                          # roda e salva em .benchmarks/
+    uv run pytest benchmarks --benchmark-compare      # compara com a última execução salva
+    uv run pytest benchmarks --benchmark-compare --benchmark-compare-fail=median:15%
+
+Cada execução é salva em JSON (--benchmark-autosave, ver pyproject.toml),
+identificada pelo commit, então regressões aparecem entre versões.
+"""
+import plotly.express as px
+import pytest
+import analitico
+import dashboard
+
+def _meses(hoje, inicio, n):
+    """Chaves de n meses a partir de `inicio` meses em relação ao mês de `hoje`."""
+    mes_atual = analitico.chave_mes(hoje)
+    return range(mes_atual + inicio, mes_atual + inicio + n)
+
+@pytest.fixture(params=["pandas", "duckdb"])
+def backend(request):
+    if request.param == "duckdb" and not analitico.duckdb_disponivel():
+        pytest.skip("duckdb não instalado (uv sync --extra analitico)")
+    return request.param
+
+def test_cubo_mensal(benchmark, dados, backend):
+    benchmark.group = "cubo_mensal"
+    df_cubo = benchmark(analitico.cubo_mensal, dados["stg_transacoes"], backend)
+    assert df_cubo["qt_transacoes"].sum() == len(dados["stg_transacoes"])
+
+def test_salario_mensal(benchmark, dados, backend):
+    benchmark.group = "salario_mensal"
+    df_mensal = benchmark(analitico.salario_mensal, dados["fact_salario"], backend)
+    assert not df_mensal.empty
+
+def test_preparar_dados_mensais(benchmark, cubo, salario):
+    df_dados_mensais = benchmark(dashboard.preparar_dados_mensais, cubo, salario)
+    assert set(df_dados_mensais["Tipo"]) == {"Receita", "Receita (Salário)", "Despesa"}
+
+def test_projecao_futuro(benchmark, cubo, salario, hoje):
+    df_dados_mensais = dashboard.preparar_dados_mensais(cubo, salario)
+    meses_passado, meses_futuro = _meses(hoje, -12, 13), _meses(hoje, 1, 12)
+    df_passado = df_dados_mensais[df_dados_mensais["mes"].between(meses_passado[0], meses_passado[-1])]
+    df_futuro = df_dados_mensais[df_dados_mensais["mes"].between(meses_futuro[0], meses_futuro[-1])]
+
+    df_projecao = benchmark(dashboard.projetar_dados_futuro, df_passado, df_futuro, meses_futuro)
+    assert len(df_projecao) == 3 * len(meses_futuro)
+
+def test_graficos_categoria(benchmark, cubo, hoje, backend):
+    """Recortes e figuras das duas linhas de gráficos por categoria/subcategoria."""
+    benchmark.group = "graficos_categoria"
+    meses_passado, meses_futuro = _meses(hoje, -12, 13), _meses(hoje, 1, 12)
+
+    def montar():
+        figuras = []
+        for dimensao in ("dsc_categoriatransacao", "dsc_subcategoriatransacao"):
+            for meses in (meses_passado, meses_futuro):
+                df = analitico.somar_por_mes(cubo, dimensao, meses[0], meses[-1], backend=backend)
+                figuras.append(px.bar(df, x="ano_mes", y="vl_transacao", color=dimensao))
+            df = analitico.somar_por_ano(cubo, dimensao, tipo="Despesas", backend=backend)
+            figuras.append(px.bar(df, x="Ano", y="vl_transacao", color=dimensao, barmode="stack"))
+        return figuras
+
+    assert len(benchmark(montar)) == 6
+
+def test_graficos_periodo(benchmark, cubo, salario, hoje):
+    """O que um slider do período reexecuta (fragmento graficos_periodo): saldo, projeção e quatro figuras."""
+    df_dados_mensais = dashboard.preparar_dados_mensais(cubo, salario)
+    # Fora de `streamlit run` o st.fragment não executa a função: mede a função original
+    benchmark(dashboard.graficos_periodo.__wrapped__, cubo, df_dados_mensais, "pandas", hoje)
+
+def test_dashboard_completo(benchmark, cubo, salario, monkeypatch):
+    """dashboard() inteiro sem banco: pré-processamento, projeção e as oito figuras."""
+    monkeypatch.setattr(dashboard, "consultar_varios", lambda consultas: [cubo, salario])
+    monkeypatch.setattr(dashboard, "backend_analitico", lambda: "pandas")
+    monkeypatch.setattr(dashboard, "graficos_periodo", dashboard.graficos_periodo.__wrapped__)
+    benchmark(dashboard.dashboard)
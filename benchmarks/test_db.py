@@ -0,0 +1,100 @@
+"""
+Testes de db.py que não precisam de banco (esquema, cache em disco, importação).
+
+    uv run pytest benchmarks/test_db.py
+"""
+import datetime
+import re
+import threading
+import pandas as pd
+import pytest
+import db
+from dados_sinteticos import gerar_dados
+
+_RELACAO = "stg_transacoes"
+
+@pytest.fixture
+def transacoes():
+    return db._aplicar_esquema(gerar_dados(300, semente=1)[_RELACAO], _RELACAO)
+
+@pytest.fixture
+def cache_disco(tmp_path):
+    return db._CacheDisco(
+        tmp_path,
+        {"lock": threading.Lock(), "versoes": {}, "escritas": {}},
+        "pandas",
+        {"lock": threading.Lock(), "tabelas": {}},
+        {"lock": threading.Lock(), "consultas": {}, "limite_ms": db._LIMITE_CONSULTA_LENTA_MS},
+    )
+
+def _revalidar_contra(cache_disco, monkeypatch, df_banco):
+    """Lê o snapshot do disco e o revalida contra `df_banco` (no lugar da leitura do banco)."""
+    df_disco = cache_disco._ler(_RELACAO, None)
+    monkeypatch.setattr(db, "_ler_do_banco", lambda *args, **kwargs: df_banco)
+    cache_disco._revalidar(_RELACAO, None, None, df_disco)
+    return cache_disco._versoes["versoes"].get(_RELACAO, 0)
+
+def test_revalidacao_sem_mudanca_nao_renova_cache(cache_disco, transacoes, monkeypatch):
+    cache_disco.salvar(_RELACAO, None, transacoes)
+    # Mesmos dados com outra representação: categorias em outra ordem e inteiro anulável
+    df_banco = transacoes.assign(
+        cd_quempagou=transacoes["cd_quempagou"].cat.reorder_categories(
+            transacoes["cd_quempagou"].cat.categories[::-1]),
+        id_transacao=transacoes["id_transacao"].astype("Int32"),
+    )
+    assert _revalidar_contra(cache_disco, monkeypatch, df_banco) == 0
+
+def test_revalidacao_com_mudanca_renova_cache(cache_disco, transacoes, monkeypatch):
+    cache_disco.salvar(_RELACAO, None, transacoes)
+    df_banco = transacoes.copy()
+    df_banco.loc[0, "vl_transacao"] += 0.01
+    assert _revalidar_contra(cache_disco, monkeypatch, df_banco) == 1
+
+def _ler_como_copy_csv(conteudo, colunas, opcoes):
+    """
+    Lê o CSV como o COPY (FORMAT csv) lê: campo vazio sem aspas é NULL, exceto
+    nas colunas de FORCE_NOT_NULL. Basta para os dados do teste (sem vírgulas
+    nem aspas dentro dos valores).
+    """
+    forcadas = set(re.search(r"FORCE_NOT_NULL \(([^)]*)\)", opcoes).group(1).replace(" ", "").split(","))
+    linhas = []
+    for linha in conteudo.decode("utf-8").splitlines():
+        valores = []
+        for coluna, campo in zip(colunas, linha.split(",")):
+            if campo == "":
+                valores.append("" if coluna in forcadas else None)
+            else:
+                valores.append(campo.strip('"'))
+        linhas.append(valores)
+    return linhas
+
+def test_importacao_descricao_vazia_igual_no_copy_e_no_execute_values():
+    lote = db._lote_transacoes(pd.DataFrame([
+        {"dt_datatransacao": datetime.date(2024, 1, 5), "id_tipotransacao": 2, "dsc_tipotransacao": "Despesas",
+         "id_categoria": 2, "dsc_categoriatransacao": "Alimentação", "id_subcategoria": 2,
+         "dsc_subcategoriatransacao": "Mercado", "id_usuario": 1, "dsc_nomeusuario": "Ana",
+         "dsc_transacao": descricao, "vl_transacao": 10.5, "cd_quempagou": "Ana",
+         "cd_edividido": "N", "cd_foidividido": "N"}
+        for descricao in ("", None)
+    ]))
+    indice = db._CAMPOS_TRANSACAO.index("dsc_transacao")
+
+    pelo_copy = _ler_como_copy_csv(db._csv_copy(lote), db._CAMPOS_TRANSACAO, db._OPCOES_COPY_TRANSACOES)
+    pelo_insert = db._linhas_insert(lote)
+
+    assert [linha[indice] for linha in pelo_copy] == ["", ""]
+    assert [linha[indice] for linha in pelo_insert] == ["", ""]
+
+def test_esquema_aplicado_a_dataframe_vazio():
+    bruto = gerar_dados(300, semente=1)[_RELACAO]
+    cheio = db._aplicar_esquema(bruto, _RELACAO)
+    vazio = db._aplicar_esquema(bruto.head(0), _RELACAO)
+    assert vazio.dtypes.astype(str).to_dict() == cheio.dtypes.astype(str).to_dict()
+
+@pytest.mark.parametrize("relacao", ["stg_transacoes", "fact_salario"])
+def test_esquema_igual_nos_dois_motores(relacao):
+    bruto = gerar_dados(300, semente=1)[relacao]
+    # O motor "arrow" entrega as colunas com dtypes Arrow (int64/double/string[pyarrow])
+    pelo_arrow = db._aplicar_esquema(bruto.convert_dtypes(dtype_backend="pyarrow"), relacao)
+    pelo_pandas = db._aplicar_esquema(bruto, relacao)
+    assert db._dtypes_esquema(pelo_arrow, relacao) == db._dtypes_esquema(pelo_pandas, relacao)
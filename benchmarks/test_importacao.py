@@ -0,0 +1,58 @@
+"""
+Orçamento de importação da tela de login.
+
+Sem login, main.py só monta o menu com a página de login: os módulos das
+páginas (dashboard, forms, importacao), o acesso a dados (db, e com ele pandas,
+pyarrow e SQLAlchemy) e o que só as páginas usam (plotly.express, duckdb) não
+podem ser importados. Cada verificação roda num processo novo,
+para que imports de outros testes não contem.
+
+    uv run pytest benchmarks/test_importacao.py
+"""
+import json
+from pathlib import Path
+import re
+import subprocess
+import sys
+
+_DIR_APP = Path(__file__).resolve().parents[1] / "app"
+
+# Módulos que a tela de login não pode carregar. (O próprio Streamlit já importa
+# plotly.graph_objects para registrar o tema; o que as páginas somam é o plotly.express.)
+_PROIBIDOS_NO_LOGIN = (
+    "plotly.express", "dashboard", "forms", "importacao", "duckdb",
+    "db", "diagnostico", "perfilador", "pandas", "pyarrow", "sqlalchemy",
+)
+
+# Tempo acumulado de `import main` (python -X importtime). Hoje fica em ~0,6 s,
+# quase tudo Streamlit; a folga cobre máquinas mais lentas.
+_ORCAMENTO_IMPORTACAO_MS = 1500
+
+def _rodar(codigo, *opcoes):
+    return subprocess.run(
+        [sys.executable, *opcoes, "-c", codigo],
+        cwd=_DIR_APP, capture_output=True, text=True, timeout=300, check=True,
+    )
+
+def test_login_nao_importa_paginas():
+    saida = _rodar(
+        "import json, sys\n"
+        "from streamlit.testing.v1 import AppTest\n"
+        "at = AppTest.from_file('main.py', default_timeout=60)\n"
+        "at.run()\n"
+        "print(json.dumps({'titulos': [t.value for t in at.title], 'modulos': sorted(sys.modules)}))\n"
+    )
+    resultado = json.loads(saida.stdout.strip().splitlines()[-1])
+
+    assert resultado["titulos"] == ["Acesso ao Sistema"]
+    carregados = [m for m in _PROIBIDOS_NO_LOGIN if m in resultado["modulos"]]
+    assert not carregados, f"a tela de login importou {carregados}"
+
+def test_orcamento_importacao_main():
+    saida = _rodar("import main", "-X", "importtime")
+    # Linha do módulo de nível 0: "import time: <self us> | <cumulativo us> | main"
+    cumulativo_us = next(
+        int(m.group(1)) for m in re.finditer(r"^import time:\s+\d+ \|\s+(\d+) \| main$", saida.stderr, re.M)
+    )
+    assert cumulativo_us / 1000 <= _ORCAMENTO_IMPORTACAO_MS, \
+        f"import main levou {cumulativo_us / 1000:.0f} ms (orçamento: {_ORCAMENTO_IMPORTACAO_MS} ms)"